@@ -3,6 +3,7 @@ import json
 from collections import defaultdict
 from models.database import DatabaseManager
 from models.knowledge_base import KnowledgeBase
+from models.tables import USER_INTERACTIONS_LOG
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,8 @@ class RuleSuggester:
         Trả về danh sách các quy tắc được đề xuất (chưa được thêm vào KB).
         """
         logger.info("Bắt đầu đề xuất quy tắc...")
-        interactions = self.db.execute_query("SELECT action_type, facts FROM user_interactions_log ORDER BY timestamp DESC LIMIT 100")
+        # Đọc theo lô, facts được giải mã khi duyệt
+        interactions = self.db.iter_records(USER_INTERACTIONS_LOG, "ORDER BY timestamp DESC LIMIT 100")
         
         # Bỏ qua các tương tác cũ hơn 7 ngày
         # TODO: Thêm logic lọc theo thời gian vào query SQL để hiệu quả hơn
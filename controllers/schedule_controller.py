@@ -1,6 +1,6 @@
 import os
 import logging
-from models.schedule import Schedule
+from models.schedule import Schedule, ScheduleStore, parse_time_range, set_schedule_store
 from services.update_optimizer_service import UpdateOptimizerService
 
 logger = logging.getLogger(__name__)
@@ -49,12 +49,19 @@ class ScheduleController:
     def save_schedule_to_db(self, df):
         #xoa toan bo du lieu cu
         with self.db.transaction() as conn:
+            conn.execute("DELETE FROM schedule")
             #cot dau la thoi gian, cac cot sau la cac ngay
             for i, row in df.iterrows():
-                time_slot = row['Thời gian']
+                time_range = parse_time_range(row['Thời gian'])
+                if time_range is None:
+                    logger.warning(f"Bỏ qua khung giờ không hợp lệ: {row['Thời gian']}")
+                    continue
+                start_time, end_time = (f"{minute // 60:02d}:{minute % 60:02d}" for minute in time_range)
                 for day in df.columns[1:]:
                     subject = row[day]
                     conn.execute(
                         "INSERT INTO schedule (day_of_week, start_time, end_time, subject, location) VALUES (?, ?, ?, ?, ?)",
-                        (day, time_slot.split('-')[0].strip(), time_slot.split('-')[1].strip(), subject, "")
-                    )
\ No newline at end of file
+                        (day, start_time, end_time, subject, "")
+                    )
+        # Dựng lại index lịch trình dùng chung cho FactCollector
+        set_schedule_store(ScheduleStore.from_dataframe(df))
@@ -0,0 +1,115 @@
+import json
+import logging
+import sqlite3
+import struct
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'EV'
+VERSION = 1
+# magic, version, dtype code, dim, scale, độ dài tên model
+HEADER_FORMAT = '<2sBBHfB'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+DTYPES = {
+    'float32': (1, np.float32),
+    'float16': (2, np.float16),
+    'int8': (3, np.int8),
+}
+DTYPE_NAMES = {code: name for name, (code, _) in DTYPES.items()}
+
+class EmbeddingHeader(NamedTuple):
+    dtype: str
+    dim: int
+    scale: float
+    model_name: str
+    offset: int
+
+class EmbeddingCodec:
+    """Mã hóa embedding thành BLOB nhị phân có header (model, số chiều, kiểu dữ liệu).
+
+    float32 giữ nguyên độ chính xác; float16 và int8 lượng tử hóa để giảm thêm 2-4 lần dung lượng.
+    Đường đọc float32 dùng np.frombuffer nên không sao chép dữ liệu.
+    """
+
+    def __init__(self, model_name: str = '', dtype: str = 'float32'):
+        if dtype not in DTYPES:
+            raise ValueError(f"Kiểu embedding không hỗ trợ: {dtype}")
+        self.model_name = model_name
+        self.dtype = dtype
+        self._model_bytes = model_name.encode('utf-8')[:255]
+
+    def encode(self, vector: np.ndarray) -> bytes:
+        """Chuyển vector thành BLOB"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        code, np_dtype = DTYPES[self.dtype]
+        scale = 1.0
+        if self.dtype == 'int8':
+            max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+            scale = max_abs / 127.0 if max_abs else 1.0
+            data = np.round(vector / scale).astype(np.int8)
+        else:
+            data = vector.astype(np_dtype, copy=False)
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, code, vector.shape[0], scale, len(self._model_bytes))
+        return header + self._model_bytes + data.tobytes()
+
+    @staticmethod
+    def read_header(blob: Union[bytes, memoryview]) -> Optional[EmbeddingHeader]:
+        """Đọc header của BLOB, trả về None nếu không đúng định dạng"""
+        if len(blob) < HEADER_SIZE:
+            return None
+        magic, version, code, dim, scale, name_length = struct.unpack_from(HEADER_FORMAT, blob)
+        if magic != MAGIC or version != VERSION or code not in DTYPE_NAMES:
+            return None
+        model_name = bytes(blob[HEADER_SIZE:HEADER_SIZE + name_length]).decode('utf-8', errors='replace')
+        return EmbeddingHeader(DTYPE_NAMES[code], dim, scale, model_name, HEADER_SIZE + name_length)
+
+    @classmethod
+    def decode(cls, value: Union[bytes, str, None]) -> Optional[np.ndarray]:
+        """Giải mã BLOB (hoặc chuỗi JSON kiểu cũ) thành vector float32"""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return np.asarray(json.loads(value), dtype=np.float32)
+        header = cls.read_header(value)
+        if header is None:
+            logger.warning("Bỏ qua embedding không đúng định dạng")
+            return None
+        data = np.frombuffer(value, dtype=DTYPES[header.dtype][1], count=header.dim, offset=header.offset)
+        if header.dtype == 'float32':
+            return data
+        if header.dtype == 'int8':
+            return data.astype(np.float32) * np.float32(header.scale)
+        return data.astype(np.float32)
+
+    def migrate_json_columns(self, conn: sqlite3.Connection, table: str, columns: Sequence[str],
+                             batch_size: int = 500, commit: bool = True) -> int:
+        """Chuyển các embedding JSON TEXT sẵn có sang BLOB, trả về số giá trị đã chuyển.
+
+        commit=False khi được gọi bên trong một transaction (ví dụ từ migration).
+        """
+        migrated = 0
+        for column in columns:
+            while True:
+                rows = conn.execute(
+                    f"SELECT id, {column} FROM {table} WHERE typeof({column}) = 'text' LIMIT ?", (batch_size,)
+                ).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for row_id, value in rows:
+                    try:
+                        updates.append((self.encode(json.loads(value)), row_id))
+                    except (ValueError, TypeError) as e:
+                        logger.warning(f"Embedding JSON hỏng ở {table}.{column} id={row_id}: {str(e)}")
+                        updates.append((None, row_id))
+                conn.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+                if commit:
+                    conn.commit()
+                migrated += len(updates)
+        if migrated:
+            logger.info(f"Đã chuyển {migrated} embedding JSON sang BLOB trong bảng {table}")
+        return migrated
@@ -0,0 +1,131 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (khóa công việc, các đoạn văn bản cần embedding; None nếu không có)
+EmbeddingJob = Tuple[Any, Tuple[Optional[str], ...]]
+EmbeddingResult = Tuple[Any, List[Optional[np.ndarray]]]
+
+class EmbeddingWorker:
+    """Luồng nền gom các yêu cầu embedding thành lô và gọi encode một lần cho cả lô.
+
+    Một lô được xử lý khi đủ batch_size công việc hoặc khi công việc đầu tiên đã chờ
+    quá max_latency giây. Văn bản trùng nhau (trong lô hoặc đã gặp gần đây) dùng lại
+    vector trong cache LRU thay vì encode lại.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray],
+                 on_results: Callable[[List[EmbeddingResult]], None],
+                 batch_size: int = 32, max_latency: float = 0.5, cache_size: int = 2048):
+        self.encode_batch = encode_batch
+        self.on_results = on_results
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._queue: 'queue.Queue[Optional[EmbeddingJob]]' = queue.Queue()
+        self._thread = None
+        self._pending = 0
+        self._pending_lock = threading.Condition()
+        self.stats = {'jobs': 0, 'batches': 0, 'encoded': 0, 'cache_hits': 0}
+
+    def start(self) -> None:
+        """Khởi động luồng nền"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='EmbeddingWorker', daemon=True)
+        self._thread.start()
+
+    def submit(self, key: Any, texts: Sequence[Optional[str]]) -> None:
+        """Đưa một công việc vào hàng đợi, không chặn luồng gọi"""
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put((key, tuple(texts)))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Chờ đến khi mọi công việc đã gửi được xử lý xong"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_lock:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._pending_lock.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Xử lý nốt hàng đợi rồi dừng luồng nền"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._process(batch)
+
+    def _process(self, batch: List[EmbeddingJob]) -> None:
+        try:
+            missing = []
+            for _, texts in batch:
+                for text in texts:
+                    if text and text not in self._cache and text not in missing:
+                        missing.append(text)
+            if missing:
+                vectors = np.asarray(self.encode_batch(missing), dtype=np.float32)
+                for text, vector in zip(missing, vectors):
+                    self._remember(text, vector)
+                self.stats['encoded'] += len(missing)
+
+            results = []
+            for key, texts in batch:
+                vectors = []
+                for text in texts:
+                    vector = self._cache.get(text) if text else None
+                    if vector is not None:
+                        self._cache.move_to_end(text)
+                    vectors.append(vector)
+                results.append((key, vectors))
+            total_texts = sum(1 for _, texts in batch for text in texts if text)
+            self.stats['cache_hits'] += total_texts - len(missing)
+            self.stats['jobs'] += len(batch)
+            self.stats['batches'] += 1
+            self.on_results(results)
+        except Exception as e:
+            logger.error(f"Lỗi khi tính embedding theo lô: {str(e)}", exc_info=True)
+        finally:
+            with self._pending_lock:
+                self._pending -= len(batch)
+                self._pending_lock.notify_all()
+
+    def _remember(self, text: str, vector: np.ndarray) -> None:
+        self._cache[text] = vector
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -1,31 +1,50 @@
+import hashlib
 import logging
 import sqlite3
+import threading
 from datetime import datetime
-import json
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
+from controllers.services.embedding_codec import EmbeddingCodec
+from controllers.services.embedding_worker import EmbeddingWorker
+from controllers.services.model_registry import ModelRegistry
+from controllers.services.vector_index import VectorIndex
+from models.migrations import Migration, SchemaMigrator
+
+# Số lỗi mới được thêm vào chỉ mục trước khi ghi lại file chỉ mục xuống đĩa
+INDEX_SAVE_EVERY = 100
+
+def message_hash(message: str):
+    """Băm nội dung lỗi để đếm các lỗi trùng nhau"""
+    if message is None:
+        return None
+    return hashlib.sha1(message.strip().encode('utf-8')).hexdigest()
+
 class ErrorCorrectionService:
-    def __init__(self, db_path='data/app_data.db', model_name='all-MiniLM-L6-v2'):
+    def __init__(self, db_path='data/app_data.db', model_name='all-MiniLM-L6-v2',
+                 index_path='data/error_embeddings', ivf_threshold=20000, embedding_dtype='float32',
+                 embed_batch_size=32, embed_max_latency=0.5, model_in_process=False):
         self.db_path = db_path
+        self.codec = EmbeddingCodec(model_name, embedding_dtype)
+        self.index_path = index_path
+        self.ivf_threshold = ivf_threshold
+        self.index = None
+        self._unsaved_vectors = 0
+        # Bảo vệ chỉ mục và việc ghi embedding giữa luồng UI và luồng embedding
+        self._index_lock = threading.RLock()
         self.logger = logging.getLogger(self.__class__.__name__)
-        try:
-            self.model = SentenceTransformer(model_name)
-            self.logger.info(f"Đã tải mô hình SentenceTransformer: {model_name}")
-        except Exception as e:
-            self.logger.error(f"Không thể tải mô hình SentenceTransformer {model_name}: {e}")
-            self.model = None # Set to None if model loading fails
+        # Model dùng chung cả tiến trình, chỉ được tải ở nền khi cần đến lần đầu
+        self.model_handle = ModelRegistry.get(model_name, use_process=model_in_process)
         self._init_database()
+        self.embedding_worker = EmbeddingWorker(self._encode_batch, self._store_embeddings,
+                                                batch_size=embed_batch_size, max_latency=embed_max_latency)
+        self.embedding_worker.start()
+        self._requeue_missing_embeddings()
 
-    def _init_database(self):
-        """Khởi tạo bảng error_log trong cơ sở dữ liệu."""
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Xóa bảng cũ nếu tồn tại để đảm bảo schema mới nhất
-            cursor.execute('DROP TABLE IF EXISTS error_log')
-            cursor.execute('''
+    def _migrations(self):
+        """Các phiên bản schema của bảng error_log."""
+        return [
+            Migration(1, 'tạo bảng error_log', ['''
                 CREATE TABLE IF NOT EXISTS error_log (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     timestamp TEXT NOT NULL,
@@ -33,44 +52,201 @@ class ErrorCorrectionService:
                     error_type TEXT,
                     error_message TEXT,
                     context TEXT,
-                    error_message_embedding TEXT,
-                    context_embedding TEXT
+                    error_message_embedding BLOB,
+                    context_embedding BLOB
                 )
-            ''')
-            conn.commit()
-            self.logger.info("Bảng 'error_log' đã được khởi tạo hoặc đã tồn tại.")
+            ''']),
+            Migration(2, 'chuyển embedding JSON sang BLOB', [
+                lambda conn: self.codec.migrate_json_columns(
+                    conn, 'error_log', ['error_message_embedding', 'context_embedding'], commit=False
+                )
+            ]),
+            Migration(3, 'thêm cột message_hash', [
+                "ALTER TABLE error_log ADD COLUMN message_hash TEXT",
+                self._backfill_message_hashes
+            ]),
+            Migration(4, 'thêm index theo service, thời gian và message_hash', [
+                "CREATE INDEX IF NOT EXISTS idx_error_log_service_time ON error_log(service, timestamp)",
+                "CREATE INDEX IF NOT EXISTS idx_error_log_timestamp ON error_log(timestamp)",
+                "CREATE INDEX IF NOT EXISTS idx_error_log_message_hash ON error_log(message_hash)"
+            ]),
+        ]
+
+    @staticmethod
+    def _backfill_message_hashes(conn):
+        conn.create_function('message_hash', 1, message_hash, deterministic=True)
+        conn.execute("UPDATE error_log SET message_hash = message_hash(error_message) WHERE message_hash IS NULL")
+
+    def _init_database(self):
+        """Khởi tạo hoặc nâng cấp schema của bảng error_log (không xóa dữ liệu cũ)."""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            version = SchemaMigrator(self._migrations(), component='error_log').migrate(conn)
+            self.logger.info(f"Bảng 'error_log' đã sẵn sàng (schema v{version}).")
         except sqlite3.Error as e:
             self.logger.error(f"Lỗi khi khởi tạo cơ sở dữ liệu cho error_log: {e}")
         finally:
             if conn:
                 conn.close()
 
-    def _get_embedding(self, text: str):
-        """Tạo vector embedding cho một chuỗi văn bản."""
-        if self.model is None:
-            self.logger.warning("Mô hình embedding chưa được tải. Không thể tạo embedding.")
-            return None
+    def _encode(self, text: str, timeout: float = None):
+        """Tạo vector embedding float32 cho một chuỗi văn bản."""
         try:
-            embedding = self.model.encode(text, convert_to_numpy=True)
-            return json.dumps(embedding.tolist()) # Lưu dưới dạng chuỗi JSON
+            embedding = self.model_handle.encode(text, timeout=timeout)
+            if embedding is None:
+                self.logger.warning("Mô hình embedding chưa được tải. Không thể tạo embedding.")
+            return embedding
         except Exception as e:
             self.logger.error(f"Lỗi khi tạo embedding: {e}")
             return None
 
+    def _encode_batch(self, texts):
+        """Tạo embedding cho cả lô văn bản bằng một lần gọi encode (chờ model tải xong)."""
+        embeddings = self.model_handle.encode(texts, batch_size=len(texts))
+        if embeddings is None:
+            raise RuntimeError(f"Mô hình embedding không khả dụng: {self.model_handle.error}")
+        return embeddings
+
+    def _store_embeddings(self, results):
+        """Ghi bù embedding do luồng nền tính xong vào error_log và chỉ mục."""
+        updates, ids, vectors, services = [], [], [], []
+        for (row_id, service), (error_vector, context_vector) in results:
+            updates.append((
+                self.codec.encode(error_vector) if error_vector is not None else None,
+                self.codec.encode(context_vector) if context_vector is not None else None,
+                row_id
+            ))
+            if error_vector is not None:
+                ids.append(row_id)
+                vectors.append(error_vector)
+                services.append(service)
+
+        conn = None
+        with self._index_lock:
+            # Nạp chỉ mục trước khi ghi để các vector mới không bị thêm hai lần
+            index = self._get_index()
+            try:
+                conn = sqlite3.connect(self.db_path)
+                conn.executemany(
+                    "UPDATE error_log SET error_message_embedding = ?, context_embedding = ? WHERE id = ?", updates
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                self.logger.error(f"Lỗi khi ghi embedding: {e}")
+                return
+            finally:
+                if conn:
+                    conn.close()
+            if vectors:
+                index.add(ids, np.stack(vectors), services)
+                self._unsaved_vectors += len(vectors)
+                if self._unsaved_vectors >= INDEX_SAVE_EVERY:
+                    self._save_index()
+
+    def _requeue_missing_embeddings(self, limit: int = 1000):
+        """Đưa các lỗi chưa có embedding (ví dụ do tắt ứng dụng giữa chừng) vào hàng đợi."""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute(
+                "SELECT id, service, error_message, context FROM error_log "
+                "WHERE error_message_embedding IS NULL AND error_message IS NOT NULL ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+            for row_id, service, error_message, context in rows:
+                self.embedding_worker.submit((row_id, service), (error_message, context))
+        except sqlite3.Error as e:
+            self.logger.error(f"Lỗi khi tìm lỗi chưa có embedding: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _get_embedding(self, text: str):
+        """Tạo vector embedding cho một chuỗi văn bản."""
+        embedding = self._encode(text)
+        if embedding is None:
+            return None
+        return self.codec.encode(embedding) # Lưu dưới dạng BLOB nhị phân
+
+    def _get_index(self):
+        """Nạp chỉ mục vector từ đĩa và đồng bộ với error_log (chỉ thêm các dòng còn thiếu)."""
+        with self._index_lock:
+            if self.index is None:
+                self._load_index()
+            return self.index
+
+    def _load_index(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            count, max_id = conn.execute(
+                "SELECT COUNT(*), MAX(id) FROM error_log WHERE error_message_embedding IS NOT NULL"
+            ).fetchone()
+            index = VectorIndex.load(self.index_path, ivf_threshold=self.ivf_threshold)
+            # Chỉ mục cũ hơn database đã bị tạo lại thì dựng lại từ đầu
+            if index is None or len(index) > count or index.max_id() > (max_id or 0):
+                index = VectorIndex(ivf_threshold=self.ivf_threshold)
+            added = self._index_rows(conn, index, index.max_id())
+            self.index = index
+            if added:
+                self._save_index()
+            self.logger.info(f"Chỉ mục lỗi sẵn sàng: {len(index)} vector ({added} vector mới)")
+        except (sqlite3.Error, OSError, ValueError) as e:
+            self.logger.error(f"Lỗi khi nạp chỉ mục embedding: {e}")
+            self.index = VectorIndex(ivf_threshold=self.ivf_threshold)
+        finally:
+            if conn:
+                conn.close()
+
+    def _index_rows(self, conn, index, after_id: int, batch_size: int = 1000) -> int:
+        """Thêm các embedding có id > after_id vào chỉ mục theo lô."""
+        cursor = conn.execute(
+            "SELECT id, service, error_message_embedding FROM error_log "
+            "WHERE id > ? AND error_message_embedding IS NOT NULL ORDER BY id", (after_id,)
+        )
+        added = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            ids, vectors, services = [], [], []
+            for row_id, service, blob in rows:
+                header = EmbeddingCodec.read_header(blob) if isinstance(blob, bytes) else None
+                # Embedding của model khác không so sánh được với truy vấn hiện tại
+                if header is not None and header.model_name != self.codec.model_name:
+                    continue
+                vector = EmbeddingCodec.decode(blob)
+                if vector is not None:
+                    ids.append(row_id)
+                    vectors.append(vector)
+                    services.append(service)
+            if vectors:
+                index.add(ids, np.stack(vectors), services)
+                added += len(vectors)
+        return added
+
+    def _save_index(self):
+        """Ghi chỉ mục xuống đĩa để lần khởi động sau có thể memory-map."""
+        try:
+            self.index.save(self.index_path)
+            self._unsaved_vectors = 0
+        except OSError as e:
+            self.logger.error(f"Lỗi khi lưu chỉ mục embedding: {e}")
+
     def log_error(self, service: str, error_type: str, error_message: str, context: str = None):
-        """Ghi lại một lỗi vào cơ sở dữ liệu."""
+        """Ghi lại một lỗi vào cơ sở dữ liệu; embedding được tính bù trên luồng nền."""
         conn = None
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             timestamp = datetime.now().isoformat()
 
-            error_msg_embedding = self._get_embedding(error_message)
-            context_embedding = self._get_embedding(context) if context else None
-
-            cursor.execute("INSERT INTO error_log (timestamp, service, error_type, error_message, context, error_message_embedding, context_embedding) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                           (timestamp, service, error_type, error_message, context, error_msg_embedding, context_embedding))
+            cursor.execute("INSERT INTO error_log (timestamp, service, error_type, error_message, context, message_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                           (timestamp, service, error_type, error_message, context, message_hash(error_message)))
             conn.commit()
+            if not self.model_handle.failed:
+                self.embedding_worker.submit((cursor.lastrowid, service), (error_message, context))
             self.logger.info(f"Đã ghi log lỗi cho dịch vụ '{service}': {error_message}")
         except sqlite3.Error as e:
             self.logger.error(f"Lỗi khi ghi log lỗi: {e}")
@@ -96,40 +272,86 @@ class ErrorCorrectionService:
             if conn:
                 conn.close()
 
-    def analyze_errors(self, service: str = None):
-        """Phân tích đơn giản các loại lỗi."""
-        error_history = self.get_error_history(service=service)
-        error_counts = {}
-        for error in error_history:
-            error_type = error[3] # error_type là cột thứ 4 (index 3)
-            if error_type in error_counts:
-                error_counts[error_type] += 1
-            else:
-                error_counts[error_type] = 1
-        return error_counts
+    def analyze_errors(self, service: str = None, since: str = None):
+        """Đếm số lỗi theo loại bằng GROUP BY trong SQL."""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conditions, params = [], []
+            if service:
+                conditions.append("service = ?")
+                params.append(service)
+            if since:
+                conditions.append("timestamp >= ?")
+                params.append(since)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = conn.execute(
+                f"SELECT error_type, COUNT(*) FROM error_log {where} GROUP BY error_type ORDER BY COUNT(*) DESC",
+                params
+            ).fetchall()
+            return dict(rows)
+        except sqlite3.Error as e:
+            self.logger.error(f"Lỗi khi phân tích lỗi: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
+    def get_duplicate_errors(self, service: str = None, limit: int = 10):
+        """Các lỗi lặp lại nhiều nhất: (error_message, số lần, lần cuối)."""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            where = "WHERE service = ?" if service else ""
+            params = [service] if service else []
+            return conn.execute(f'''
+                SELECT MAX(error_message), COUNT(*) AS occurrences, MAX(timestamp)
+                FROM error_log {where}
+                GROUP BY message_hash
+                HAVING occurrences > 1
+                ORDER BY occurrences DESC
+                LIMIT ?
+            ''', params + [limit]).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Lỗi khi đếm lỗi trùng lặp: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
 
     def find_similar_errors(self, new_error_message: str, service: str = None, top_k: int = 5):
         """Tìm kiếm các lỗi tương tự dựa trên embedding."""
-        if self.model is None:
-            self.logger.warning("Mô hình embedding chưa được tải. Không thể tìm kiếm lỗi tương tự.")
+        # Không chặn luồng gọi khi model còn đang tải
+        new_embedding = self._encode(new_error_message, timeout=0) if self.model_handle.is_ready else None
+        if new_embedding is None:
+            self.model_handle.load_async()
+            self.logger.warning("Mô hình embedding chưa sẵn sàng. Không thể tìm kiếm lỗi tương tự.")
             return []
 
-        new_embedding_str = self._get_embedding(new_error_message)
-        if not new_embedding_str:
+        index = self._get_index()
+        with self._index_lock:
+            matches = index.search(new_embedding, top_k=top_k, label=service)
+        if not matches:
             return []
-        new_embedding = json.loads(new_embedding_str)
-
-        all_errors = self.get_error_history(service=service)
-        similarities = []
-
-        for error in all_errors:
-            # error_message_embedding là cột thứ 7 (index 6)
-            existing_embedding_str = error[6]
-            if existing_embedding_str:
-                existing_embedding = json.loads(existing_embedding_str)
-                # Tính toán độ tương đồng (ví dụ: cosine similarity)
-                sim = np.dot(new_embedding, existing_embedding) / (np.linalg.norm(new_embedding) * np.linalg.norm(existing_embedding))
-                similarities.append((sim, error))
-        
-        similarities.sort(key=lambda x: x[0], reverse=True)
-        return [error for sim, error in similarities[:top_k]] 
\ No newline at end of file
+
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            ids = [error_id for error_id, _ in matches]
+            placeholders = ','.join('?' * len(ids))
+            rows = conn.execute(f"SELECT * FROM error_log WHERE id IN ({placeholders})", ids).fetchall()
+            by_id = {row[0]: row for row in rows}
+            return [by_id[error_id] for error_id in ids if error_id in by_id]
+        except sqlite3.Error as e:
+            self.logger.error(f"Lỗi khi tìm lỗi tương tự: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def close(self):
+        """Tính nốt các embedding đang chờ và lưu các vector chưa được ghi xuống đĩa."""
+        self.embedding_worker.stop()
+        with self._index_lock:
+            if self.index is not None and self._unsaved_vectors:
+                self._save_index()
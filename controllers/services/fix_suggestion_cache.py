@@ -0,0 +1,198 @@
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from controllers.services.embedding_codec import EmbeddingCodec
+from controllers.services.embedding_worker import EmbeddingWorker
+from controllers.services.error_correction_service import message_hash
+from controllers.services.model_registry import ModelRegistry
+from controllers.services.vector_index import VectorIndex
+from models.migrations import Migration, SchemaMigrator
+
+logger = logging.getLogger(__name__)
+
+# Độ tương đồng cosine tối thiểu để dùng lại gợi ý của một lỗi đã gặp
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+
+MIGRATIONS = [
+    Migration(1, 'tạo bảng gemini_fix_cache', [
+        '''
+        CREATE TABLE IF NOT EXISTS gemini_fix_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            message_hash TEXT NOT NULL,
+            error_message TEXT NOT NULL,
+            error_context TEXT,
+            suggestion TEXT NOT NULL,
+            embedding BLOB,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_hit_at TEXT
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_gemini_fix_cache_hash ON gemini_fix_cache(message_hash)"
+    ]),
+]
+
+class FixSuggestionCache:
+    """Cache gợi ý sửa lỗi của Gemini, tra cứu theo nội dung lỗi trùng khớp hoặc tương tự.
+
+    Lỗi trùng nguyên văn được tìm bằng message_hash (không cần model). Lỗi gần giống
+    được tìm trên chỉ mục embedding khi model đã sẵn sàng; embedding của các gợi ý
+    mới được tính bù trên luồng nền.
+    """
+
+    def __init__(self, db_path: str = 'data/app_data.db', model_name: str = 'all-MiniLM-L6-v2',
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.codec = EmbeddingCodec(model_name)
+        self.model_handle = ModelRegistry.get(model_name)
+        self.index = None
+        self.stats = Counter()
+        self._lock = threading.RLock()
+        self._init_database()
+        self.embedding_worker = EmbeddingWorker(self._encode_batch, self._store_embeddings)
+        self.embedding_worker.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_database(self) -> None:
+        conn = None
+        try:
+            conn = self._connect()
+            SchemaMigrator(MIGRATIONS, component='gemini_fix_cache').migrate(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi khởi tạo gemini_fix_cache: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+    def _encode_batch(self, texts):
+        embeddings = self.model_handle.encode(texts, batch_size=len(texts))
+        if embeddings is None:
+            raise RuntimeError(f"Mô hình embedding không khả dụng: {self.model_handle.error}")
+        return embeddings
+
+    def _store_embeddings(self, results) -> None:
+        """Ghi embedding tính xong vào bảng và chỉ mục"""
+        # Nội dung lỗi rỗng không có embedding; bỏ qua để không làm hỏng cả lô
+        results = [(row_id, vectors[0]) for row_id, vectors in results if vectors and vectors[0] is not None]
+        if not results:
+            return
+        with self._lock:
+            index = self._get_index()
+            conn = None
+            try:
+                conn = self._connect()
+                conn.executemany("UPDATE gemini_fix_cache SET embedding = ? WHERE id = ?",
+                                 [(self.codec.encode(vector), row_id) for row_id, vector in results])
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Lỗi khi ghi embedding gợi ý: {str(e)}")
+                return
+            finally:
+                if conn:
+                    conn.close()
+            index.add([row_id for row_id, _ in results], np.stack([vector for _, vector in results]))
+
+    def _get_index(self) -> VectorIndex:
+        """Dựng chỉ mục từ các gợi ý đã có embedding (bảng nhỏ nên không cần lưu ra file)"""
+        with self._lock:
+            if self.index is not None:
+                return self.index
+            index = VectorIndex()
+            conn = None
+            try:
+                conn = self._connect()
+                rows = conn.execute("SELECT id, embedding FROM gemini_fix_cache WHERE embedding IS NOT NULL").fetchall()
+                vectors = [(row_id, EmbeddingCodec.decode(blob)) for row_id, blob in rows]
+                vectors = [(row_id, vector) for row_id, vector in vectors if vector is not None]
+                if vectors:
+                    index.add([row_id for row_id, _ in vectors], np.stack([vector for _, vector in vectors]))
+            except (sqlite3.Error, ValueError) as e:
+                logger.error(f"Lỗi khi nạp chỉ mục gợi ý: {str(e)}")
+            finally:
+                if conn:
+                    conn.close()
+            self.index = index
+            return index
+
+    def lookup(self, error_message: str) -> Optional[str]:
+        """Tìm gợi ý đã lưu cho lỗi trùng hoặc tương tự; None nếu không có"""
+        conn = None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id, suggestion FROM gemini_fix_cache WHERE message_hash = ? ORDER BY id DESC LIMIT 1",
+                (message_hash(error_message),)
+            ).fetchone()
+            if row:
+                self._record_hit(conn, row[0], 'exact_hits')
+                return row[1]
+
+            # Không chặn luồng gọi khi model còn đang tải; lần sau sẽ tra cứu được
+            if not self.model_handle.is_ready:
+                self.model_handle.load_async()
+                self.stats['misses'] += 1
+                return None
+            query = self.model_handle.encode(error_message, timeout=0)
+            with self._lock:
+                matches = self._get_index().search(query, top_k=1) if query is not None else []
+            if matches and matches[0][1] >= self.threshold:
+                row = conn.execute("SELECT id, suggestion FROM gemini_fix_cache WHERE id = ?",
+                                   (matches[0][0],)).fetchone()
+                if row:
+                    self._record_hit(conn, row[0], 'semantic_hits')
+                    return row[1]
+            self.stats['misses'] += 1
+            return None
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi tra cứu cache gợi ý: {str(e)}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def _record_hit(self, conn: sqlite3.Connection, row_id: int, kind: str) -> None:
+        self.stats[kind] += 1
+        conn.execute("UPDATE gemini_fix_cache SET hits = hits + 1, last_hit_at = ? WHERE id = ?",
+                     (datetime.now().isoformat(), row_id))
+        conn.commit()
+
+    def store(self, error_message: str, error_context: Optional[str], suggestion: str) -> None:
+        """Lưu gợi ý mới; embedding được tính ở nền"""
+        conn = None
+        try:
+            conn = self._connect()
+            cursor = conn.execute('''
+                INSERT INTO gemini_fix_cache (created_at, message_hash, error_message, error_context, suggestion)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (datetime.now().isoformat(), message_hash(error_message), error_message, error_context, suggestion))
+            conn.commit()
+            if not self.model_handle.failed:
+                self.embedding_worker.submit(cursor.lastrowid, (error_message,))
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi lưu gợi ý sửa lỗi: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Số lần trúng cache (trùng khớp / tương tự), trượt và tỉ lệ trúng"""
+        hits = self.stats['exact_hits'] + self.stats['semantic_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            'exact_hits': self.stats['exact_hits'],
+            'semantic_hits': self.stats['semantic_hits'],
+            'misses': self.stats['misses'],
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        self.embedding_worker.stop()
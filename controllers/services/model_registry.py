@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+import threading
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IDLE = 'idle'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+def _serve_model(model_name: str, conn) -> None:
+    """Chạy trong tiến trình con: tải model rồi trả lời các yêu cầu encode qua pipe"""
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+        conn.send(('ready', None))
+    except Exception as e:
+        conn.send(('failed', str(e)))
+        return
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        texts, kwargs = request
+        try:
+            conn.send(('ok', np.asarray(model.encode(texts, **kwargs), dtype=np.float32)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+class _ProcessModel:
+    """Đại diện cho model chạy ở tiến trình riêng, để luồng UI không tranh GIL với suy luận"""
+
+    def __init__(self, model_name: str):
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_serve_model, args=(model_name, child_conn),
+                                        name=f'model-{model_name}', daemon=True)
+        self._process.start()
+        self._lock = threading.Lock()
+        status, error = self._conn.recv()
+        if status != 'ready':
+            self._process.join(1)
+            raise RuntimeError(error)
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        with self._lock:
+            self._conn.send((texts, kwargs))
+            status, payload = self._conn.recv()
+        if status != 'ok':
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self) -> None:
+        try:
+            self._conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self._process.join(2)
+        if self._process.is_alive():
+            self._process.terminate()
+
+class ModelHandle:
+    """Một SentenceTransformer dùng chung, được tải lười trên luồng nền"""
+
+    def __init__(self, model_name: str, use_process: bool = False):
+        self.model_name = model_name
+        self.use_process = use_process
+        self.state = IDLE
+        self.error: Optional[str] = None
+        self._model = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def failed(self) -> bool:
+        return self.state == FAILED
+
+    def load_async(self) -> None:
+        """Bắt đầu tải model trên luồng nền nếu chưa tải"""
+        with self._lock:
+            if self.state != IDLE:
+                return
+            self.state = LOADING
+        threading.Thread(target=self._load, name=f'ModelLoader-{self.model_name}', daemon=True).start()
+
+    def _load(self) -> None:
+        try:
+            if self.use_process:
+                self._model = _ProcessModel(self.model_name)
+            else:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            # Chạy thử một lần để khởi tạo các buffer trước khi có yêu cầu thật
+            self._model.encode(['warm up'])
+            self.state = READY
+            logger.info(f"Đã tải mô hình SentenceTransformer: {self.model_name}")
+        except Exception as e:
+            self.error = str(e)
+            self.state = FAILED
+            logger.error(f"Không thể tải mô hình SentenceTransformer {self.model_name}: {str(e)}")
+        finally:
+            self._ready.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Chờ model sẵn sàng (bắt đầu tải nếu cần); trả về False nếu hết giờ hoặc tải lỗi"""
+        self.load_async()
+        self._ready.wait(timeout)
+        return self.is_ready
+
+    def encode(self, texts: Union[str, List[str]], timeout: Optional[float] = None, **kwargs) -> Optional[np.ndarray]:
+        """Tạo embedding; trả về None nếu model chưa sẵn sàng trong thời gian chờ"""
+        if not self.wait(timeout):
+            return None
+        # convert_to_numpy chỉ được thêm ở đây; _ProcessModel chuyển nguyên kwargs sang tiến trình con
+        kwargs['convert_to_numpy'] = True
+        return np.asarray(self._model.encode(texts, **kwargs), dtype=np.float32)
+
+    def close(self) -> None:
+        if isinstance(self._model, _ProcessModel):
+            self._model.close()
+
+class ModelRegistry:
+    """Sổ đăng ký model dùng chung cho cả tiến trình"""
+
+    _handles: Dict[str, ModelHandle] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, model_name: str, use_process: Optional[bool] = None) -> ModelHandle:
+        """Lấy handle dùng chung cho model (không tải ngay).
+
+        use_process=None dùng handle đã có bất kể chế độ (mặc định chạy cùng tiến trình nếu chưa có).
+        """
+        with cls._lock:
+            handle = cls._handles.get(model_name)
+            if handle is None:
+                handle = cls._handles[model_name] = ModelHandle(model_name, bool(use_process))
+            elif use_process is not None and use_process != handle.use_process:
+                # Mỗi model chỉ tải một lần; không lặng lẽ đổi chế độ người gọi yêu cầu
+                logger.warning(
+                    f"Mô hình {model_name} đã được đăng ký với use_process={handle.use_process}, "
+                    f"bỏ qua yêu cầu use_process={use_process}"
+                )
+            return handle
+
+    @classmethod
+    def warm_up(cls, model_name: str, use_process: Optional[bool] = None) -> ModelHandle:
+        """Bắt đầu tải model ở nền, ví dụ khi ứng dụng đã rảnh sau khởi động"""
+        handle = cls.get(model_name, use_process)
+        handle.load_async()
+        return handle
+
+    @classmethod
+    def status(cls) -> Dict[str, str]:
+        """Trạng thái của từng model đã đăng ký"""
+        with cls._lock:
+            return {name: handle.state for name, handle in cls._handles.items()}
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Đóng các tiến trình model"""
+        with cls._lock:
+            for handle in cls._handles.values():
+                handle.close()
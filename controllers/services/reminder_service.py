@@ -19,7 +19,8 @@ class ReminderService:
     def get_reminders(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """Lấy danh sách reminders"""
         try:
-            return self.db.get_reminders(status)
+            # Bản ghi Reminder -> dict, cùng kiểu với các hàm khác của service
+            return [reminder.to_dict() for reminder in self.db.get_reminders(status)]
         except Exception as e:
             self.logger.error(f"Error getting reminders: {str(e)}")
             return []
@@ -41,7 +42,7 @@ class ReminderService:
                 AND due_date <= datetime('now', '+1 day')
                 ORDER BY due_date
             '''
-            return self.db.execute_query(query)
+            return self.db.decode_rows('reminders', self.db.execute_query(query))
         except Exception as e:
             self.logger.error(f"Error getting due reminders: {str(e)}")
             return []
@@ -59,7 +60,7 @@ class ReminderService:
         """Lấy thông tin chi tiết của một reminder"""
         try:
             query = 'SELECT * FROM reminders WHERE id = ?'
-            result = self.db.execute_query(query, (reminder_id,))
+            result = self.db.decode_rows('reminders', self.db.execute_query(query, (reminder_id,)))
             return result[0] if result else None
         except Exception as e:
             self.logger.error(f"Error getting reminder by id: {str(e)}")
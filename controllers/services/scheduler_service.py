@@ -4,7 +4,7 @@ from collections import Counter
 import os
 import sys
 import win32com.client # Import for Task Scheduler interaction
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from models.database import DatabaseManager
 
@@ -13,8 +13,8 @@ class SchedulerService:
         self.db = DatabaseManager()
         self.logger = logging.getLogger('SchedulerService')
 
-    def get_app_launch_history(self, days: int = 30) -> list:
-        """Lấy lịch sử khởi chạy ứng dụng từ database trong N ngày gần đây nhất"""
+    def iter_app_launch_history(self, days: int = 30) -> Iterator[str]:
+        """Duyệt lịch sử khởi chạy trong N ngày gần đây theo từng lô, không nạp hết vào bộ nhớ"""
         query = """
             SELECT launch_time
             FROM app_launches
@@ -23,17 +23,17 @@ class SchedulerService:
         """
         params = (f'-{days} days',)
         try:
-            results = self.db.execute_query(query, params)
-            return [row['launch_time'] for row in results]
+            for row in self.db.iter_query(query, params):
+                yield row['launch_time']
         except Exception as e:
             self.logger.error(f"Error getting app launch history: {str(e)}")
-            return []
 
-    def analyze_launch_times(self, history: list) -> dict:
-        """Phân tích lịch sử khởi chạy để tìm ra các thời điểm phổ biến"""
-        if not history:
-            return {}
+    def get_app_launch_history(self, days: int = 30) -> list:
+        """Lấy lịch sử khởi chạy ứng dụng từ database trong N ngày gần đây nhất"""
+        return list(self.iter_app_launch_history(days))
 
+    def analyze_launch_times(self, history: Iterable[str]) -> dict:
+        """Phân tích lịch sử khởi chạy để tìm ra các thời điểm phổ biến"""
         hourly_counts = Counter()
         daily_counts = Counter()
 
@@ -48,6 +48,9 @@ class SchedulerService:
                 self.logger.warning(f"Invalid datetime format in database: {launch_time_str} - {e}")
                 continue
 
+        if not hourly_counts:
+            return {}
+
         # Tìm giờ phổ biến nhất
         most_common_hour = None
         if hourly_counts:
@@ -67,8 +70,7 @@ class SchedulerService:
 
     def suggest_optimal_launch_time(self) -> Optional[datetime]:
         """Gợi ý thời gian khởi chạy tối ưu dựa trên phân tích"""
-        history = self.get_app_launch_history()
-        analysis = self.analyze_launch_times(history)
+        analysis = self.analyze_launch_times(self.iter_app_launch_history())
 
         if analysis.get("most_common_hour") is not None:
             # Giả định chúng ta chỉ quan tâm đến giờ phổ biến nhất hiện tại
@@ -1,54 +1,178 @@
+import atexit
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 import sqlite3
 from collections import defaultdict
 import numpy as np
 from models.database import DatabaseManager
 
+class ServiceIntervalModel:
+    """Mô hình online cho một service: EWMA khoảng cách giữa các lần cập nhật,
+    tỷ lệ thay đổi dữ liệu và tỷ lệ tương tác, cập nhật O(1) mỗi lần log_update."""
+
+    def __init__(self, service_type: str, alpha: float):
+        self.service_type = service_type
+        self.alpha = alpha
+        self.last_update = None
+        self.ewma_gap = None
+        self.gap_variance = 0.0
+        self.change_rate = 0.0
+        self.interaction_rate = 0.0
+        self.response_time = 0.0
+        self.samples = 0
+
+    def observe(self, timestamp: float, data_changed: bool, user_interaction: bool, response_time: float) -> None:
+        """Cập nhật mô hình với một lần cập nhật mới"""
+        alpha = self.alpha if self.samples else 1.0
+        self.change_rate += alpha * (float(data_changed) - self.change_rate)
+        self.interaction_rate += alpha * (float(user_interaction) - self.interaction_rate)
+        self.response_time += alpha * ((response_time or 0.0) - self.response_time)
+
+        if self.last_update is not None:
+            gap = max(timestamp - self.last_update, 0.0)
+            if self.ewma_gap is None:
+                self.ewma_gap = gap
+            else:
+                diff = gap - self.ewma_gap
+                self.ewma_gap += self.alpha * diff
+                self.gap_variance = (1 - self.alpha) * (self.gap_variance + self.alpha * diff * diff)
+        self.last_update = timestamp
+        self.samples += 1
+
+    def optimal_interval(self, min_interval: int, max_interval: int) -> int:
+        """Khoảng thời gian tối ưu, cùng quy tắc điều chỉnh với analyze_update_patterns"""
+        if self.ewma_gap is None:
+            return max_interval
+        interval = self.ewma_gap
+        if self.change_rate > 0.5:
+            interval *= 0.8
+        elif self.change_rate < 0.2:
+            interval *= 1.2
+        if self.interaction_rate > 0.7:
+            interval *= 0.9
+        elif self.interaction_rate < 0.3:
+            interval *= 1.1
+        return max(min(int(interval), max_interval), min_interval)
+
+    def confidence(self, max_interval: int) -> float:
+        """Độ tin cậy tăng theo số mẫu, giảm theo độ dao động của khoảng cách"""
+        confidence = min(self.samples / 100, 1.0)
+        return confidence * (1 - min(self.gap_variance ** 0.5 / max_interval, 0.5))
+
+
 class UpdateOptimizerService:
     def __init__(self):
         self.db = DatabaseManager()
         self.logger = logging.getLogger('UpdateOptimizerService')
-        
-        # Khởi tạo database cho việc theo dõi cập nhật
-        self._init_database()
+        # Các bảng theo dõi cập nhật được tạo bởi migration của DatabaseManager (models/database_migrations.py)
         
         # Các tham số cho thuật toán học
         self.min_update_interval = 300  # 5 phút
         self.max_update_interval = 3600  # 1 giờ
-        self.learning_rate = 0.1  # Tốc độ học
+        self.learning_rate = 0.1  # Tốc độ học (hệ số alpha của EWMA)
         self.decay_factor = 0.95  # Hệ số suy giảm cho dữ liệu cũ
         
-    def _init_database(self):
-        """Khởi tạo các bảng cần thiết cho việc theo dõi cập nhật"""
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Bảng lưu lịch sử cập nhật
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS update_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    service_type TEXT NOT NULL,
-                    update_time TEXT NOT NULL,
-                    data_changed BOOLEAN NOT NULL,
-                    user_interaction BOOLEAN NOT NULL,
-                    response_time REAL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Bảng lưu thời gian cập nhật tối ưu
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS optimal_update_intervals (
-                    service_type TEXT PRIMARY KEY,
-                    interval INTEGER NOT NULL,
-                    last_updated TEXT NOT NULL,
-                    confidence REAL DEFAULT 0.0
-                )
-            ''')
-            
-            conn.commit()
+        # Mô hình trong bộ nhớ, lưu checkpoint định kỳ xuống database
+        self.checkpoint_every = 20  # số lần cập nhật
+        self.checkpoint_interval = 300  # giây
+        self.models: Dict[str, ServiceIntervalModel] = {}
+        self.optimal_intervals: Dict[str, int] = {}
+        # Service có mô hình thay đổi từ checkpoint trước; chỉ các dòng này được ghi,
+        # để không ghi đè mô hình mà một instance khác vừa cập nhật
+        self._dirty = set()
+        self._pending_updates = 0
+        self._last_checkpoint = time.time()
+        self._load_models()
+        # Lưu nốt các cập nhật chưa checkpoint khi thoát
+        atexit.register(self.close)
+        
+    def _load_models(self):
+        """Nạp checkpoint mô hình; service chưa có checkpoint được khởi tạo từ lịch sử một lần"""
+        try:
+            rows = self.db.execute_query('SELECT * FROM update_interval_models', use_cache=False)
+            for row in rows:
+                model = ServiceIntervalModel(row['service_type'], self.learning_rate)
+                model.last_update = row['last_update']
+                model.ewma_gap = row['ewma_gap']
+                model.gap_variance = row['gap_variance'] or 0.0
+                model.change_rate = row['change_rate'] or 0.0
+                model.interaction_rate = row['interaction_rate'] or 0.0
+                model.response_time = row['response_time'] or 0.0
+                model.samples = row['samples'] or 0
+                self._set_model(model)
+
+            analysis = self.analyze_all_patterns()
+            missing = [service for service in analysis if service not in self.models]
+            if missing:
+                self._bootstrap_models(missing, analysis)
+        except Exception as e:
+            self.logger.error(f"Error loading interval models: {str(e)}")
+    
+    def _bootstrap_models(self, service_types: list, analysis: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Dựng mô hình ban đầu từ update_history (chỉ chạy khi chưa có checkpoint)"""
+        if analysis is None:
+            analysis = self.analyze_all_patterns()
+        for service_type in service_types:
+            stats = analysis.get(service_type)
+            model = ServiceIntervalModel(service_type, self.learning_rate)
+            if stats:
+                model.last_update = stats['last_update']
+                model.ewma_gap = stats['mean_gap']
+                model.gap_variance = stats['gap_std'] ** 2
+                model.change_rate = stats['data_change_rate']
+                model.interaction_rate = stats['user_interaction_rate']
+                model.samples = stats['samples']
+            self._set_model(model)
+            self._dirty.add(service_type)
+            self._pending_updates += 1
+    
+    def _set_model(self, model: ServiceIntervalModel):
+        self.models[model.service_type] = model
+        self.optimal_intervals[model.service_type] = model.optimal_interval(
+            self.min_update_interval, self.max_update_interval
+        )
+    
+    def checkpoint(self):
+        """Lưu trạng thái các mô hình đã thay đổi và interval hiện tại xuống database"""
+        now = datetime.now().isoformat()
+        dirty = [self.models[service_type] for service_type in sorted(self._dirty)]
+        try:
+            with self.db.transaction() as conn:
+                for model in dirty:
+                    conn.execute('''
+                        INSERT OR REPLACE INTO update_interval_models
+                        (service_type, last_update, ewma_gap, gap_variance, change_rate,
+                         interaction_rate, response_time, samples, checkpoint_time)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        model.service_type, model.last_update, model.ewma_gap, model.gap_variance,
+                        model.change_rate, model.interaction_rate, model.response_time,
+                        model.samples, now
+                    ))
+                    conn.execute('''
+                        INSERT OR REPLACE INTO optimal_update_intervals
+                        (service_type, interval, last_updated, confidence)
+                        VALUES (?, ?, ?, ?)
+                    ''', (
+                        model.service_type,
+                        self.optimal_intervals[model.service_type],
+                        now,
+                        model.confidence(self.max_update_interval)
+                    ))
+            self._dirty.difference_update(model.service_type for model in dirty)
+            self._pending_updates = 0
+            self._last_checkpoint = time.time()
+            self.logger.debug(f"Checkpointed {len(dirty)} interval models")
+        except Exception as e:
+            self.logger.error(f"Error checkpointing interval models: {str(e)}")
+    
+    def close(self):
+        """Lưu checkpoint cuối cùng"""
+        atexit.unregister(self.close)
+        if self._dirty:
+            self.checkpoint()
     
     def log_update(self, service_type: str, data_changed: bool, user_interaction: bool, response_time: float):
         """Ghi lại thông tin về một lần cập nhật"""
@@ -57,17 +181,32 @@ class UpdateOptimizerService:
             (service_type, update_time, data_changed, user_interaction, response_time)
             VALUES (?, ?, ?, ?, ?)
         '''
+        now = datetime.now()
         try:
-            self.db.execute_query(query, (
-                service_type,
-                datetime.now().isoformat(),
-                data_changed,
-                user_interaction,
-                response_time
-            ))
+            with self.db.transaction() as conn:
+                conn.execute(query, (
+                    service_type,
+                    now.isoformat(),
+                    data_changed,
+                    user_interaction,
+                    response_time
+                ))
             self.logger.debug(f"Logged update for {service_type}")
         except Exception as e:
             self.logger.error(f"Error logging update: {str(e)}")
+        
+        # Cập nhật mô hình trong bộ nhớ (O(1))
+        model = self.models.get(service_type)
+        if model is None:
+            model = ServiceIntervalModel(service_type, self.learning_rate)
+        model.observe(now.timestamp(), data_changed, user_interaction, response_time)
+        self._set_model(model)
+        self._dirty.add(service_type)
+        
+        self._pending_updates += 1
+        if (self._pending_updates >= self.checkpoint_every
+                or time.time() - self._last_checkpoint >= self.checkpoint_interval):
+            self.checkpoint()
     
     def get_update_history(self, service_type: str, days: int = 7) -> list:
         """Lấy lịch sử cập nhật của một service"""
@@ -83,33 +222,86 @@ class UpdateOptimizerService:
             self.logger.error(f"Error getting update history: {str(e)}")
             return []
     
-    def analyze_update_patterns(self, service_type: str) -> Dict[str, Any]:
-        """Phân tích mẫu cập nhật để tìm thời gian tối ưu"""
-        history = self.get_update_history(service_type)
-        if not history:
-            return {
-                'interval': self.max_update_interval,
-                'confidence': 0.0
-            }
-        
-        # Tính toán các chỉ số
-        data_change_rate = sum(1 for h in history if h['data_changed']) / len(history)
-        user_interaction_rate = sum(1 for h in history if h['user_interaction']) / len(history)
-        
-        # Tính toán thời gian giữa các lần cập nhật
-        update_times = [datetime.fromisoformat(h['update_time']) for h in history]
-        update_intervals = [(update_times[i] - update_times[i+1]).total_seconds() 
-                          for i in range(len(update_times)-1)]
-        
-        if not update_intervals:
-            return {
+    def _load_history_arrays(self, days: int = 7, service_type: Optional[str] = None) -> np.ndarray:
+        """Nạp lịch sử cập nhật dạng mảng cột: service, ts (epoch giây), changed, interaction"""
+        query = '''
+            SELECT service_type,
+                   CAST(strftime('%s', update_time) AS INTEGER),
+                   data_changed,
+                   user_interaction
+            FROM update_history
+            WHERE update_time >= ?
+        '''
+        params = [(datetime.now() - timedelta(days=days)).isoformat()]
+        if service_type:
+            query += ' AND service_type = ?'
+            params.append(service_type)
+        query += ' ORDER BY service_type, update_time'
+
+        dtype = [('service', 'U64'), ('ts', 'i8'), ('changed', '?'), ('interaction', '?')]
+        try:
+            history = self.db.fetch_arrays(query, params, dtype=dtype)
+        except Exception as e:
+            self.logger.error(f"Error loading update history arrays: {str(e)}")
+            return np.empty(0, dtype=dtype)
+
+        # update_time lưu giờ địa phương, strftime('%s') coi như UTC -> đổi về epoch thật
+        utc_offset = round(datetime.now().replace(tzinfo=timezone.utc).timestamp() - time.time())
+        history['ts'] -= utc_offset
+        return history
+    
+    def analyze_all_patterns(self, days: int = 7, service_type: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Phân tích mẫu cập nhật của mọi service trong một lần quét, tính toán vector hóa"""
+        history = self._load_history_arrays(days, service_type)
+        if history.size == 0:
+            return {}
+
+        services = history['service']
+        ts = history['ts'].astype(np.float64)
+        changed = history['changed'].astype(np.float64)
+        interaction = history['interaction'].astype(np.float64)
+
+        # Trọng số suy giảm theo tuổi dữ liệu (ngày)
+        age_days = np.maximum(time.time() - ts, 0.0) / 86400
+        weights = np.power(self.decay_factor, age_days)
+
+        starts = np.flatnonzero(np.r_[True, services[1:] != services[:-1]])
+        ends = np.r_[starts[1:], services.size]
+        weight_sums = np.add.reduceat(weights, starts)
+        change_rates = np.add.reduceat(weights * changed, starts) / weight_sums
+        interaction_rates = np.add.reduceat(weights * interaction, starts) / weight_sums
+
+        results = {}
+        for index, (start, end) in enumerate(zip(starts, ends)):
+            gaps = np.diff(ts[start:end])
+            gap_weights = weights[start + 1:end]
+            stats = {
+                'samples': int(end - start),
+                'last_update': float(ts[end - 1]),
+                'data_change_rate': float(change_rates[index]),
+                'user_interaction_rate': float(interaction_rates[index]),
+                'mean_gap': None,
+                'gap_std': 0.0,
                 'interval': self.max_update_interval,
                 'confidence': 0.0
             }
-        
-        # Tính toán thời gian cập nhật tối ưu dựa trên các yếu tố
-        base_interval = np.median(update_intervals)
-        
+            if gaps.size:
+                order = np.argsort(gaps)
+                cumulative = np.cumsum(gap_weights[order])
+                median_gap = gaps[order][np.searchsorted(cumulative, cumulative[-1] / 2)]
+                mean_gap = np.average(gaps, weights=gap_weights)
+                gap_std = np.sqrt(np.average((gaps - mean_gap) ** 2, weights=gap_weights))
+                stats.update(
+                    mean_gap=float(mean_gap),
+                    gap_std=float(gap_std),
+                    interval=self._adjust_interval(median_gap, stats['data_change_rate'], stats['user_interaction_rate']),
+                    confidence=float(min(stats['samples'] / 100, 1.0) * (1 - min(gap_std / self.max_update_interval, 0.5)))
+                )
+            results[str(services[start])] = stats
+        return results
+    
+    def _adjust_interval(self, base_interval: float, data_change_rate: float, user_interaction_rate: float) -> int:
+        """Điều chỉnh khoảng thời gian theo tỷ lệ thay đổi dữ liệu và tương tác người dùng"""
         # Điều chỉnh dựa trên tỷ lệ thay đổi dữ liệu
         if data_change_rate > 0.5:  # Nếu dữ liệu thay đổi thường xuyên
             base_interval *= 0.8
@@ -123,62 +315,27 @@ class UpdateOptimizerService:
             base_interval *= 1.1
             
         # Giới hạn trong khoảng cho phép
-        optimal_interval = max(min(int(base_interval), self.max_update_interval), 
-                             self.min_update_interval)
-        
-        # Tính độ tin cậy dựa trên số lượng dữ liệu và độ ổn định
-        confidence = min(len(history) / 100, 1.0)  # Tăng độ tin cậy theo số lượng dữ liệu
-        if update_intervals:
-            std_dev = np.std(update_intervals)
-            confidence *= (1 - min(std_dev / self.max_update_interval, 0.5))
-        
+        return max(min(int(base_interval), self.max_update_interval), self.min_update_interval)
+    
+    def analyze_update_patterns(self, service_type: str) -> Dict[str, Any]:
+        """Phân tích mẫu cập nhật để tìm thời gian tối ưu"""
+        stats = self.analyze_all_patterns(service_type=service_type).get(service_type)
+        if not stats:
+            return {
+                'interval': self.max_update_interval,
+                'confidence': 0.0
+            }
         return {
-            'interval': optimal_interval,
-            'confidence': confidence
+            'interval': stats['interval'],
+            'confidence': stats['confidence']
         }
     
     def update_optimal_interval(self, service_type: str):
-        """Cập nhật thời gian tối ưu cho một service"""
-        analysis = self.analyze_update_patterns(service_type)
-        
-        query = '''
-            INSERT OR REPLACE INTO optimal_update_intervals
-            (service_type, interval, last_updated, confidence)
-            VALUES (?, ?, ?, ?)
-        '''
-        try:
-            self.db.execute_query(query, (
-                service_type,
-                analysis['interval'],
-                datetime.now().isoformat(),
-                analysis['confidence']
-            ))
-            self.logger.info(f"Updated optimal interval for {service_type}: {analysis['interval']}s")
-        except Exception as e:
-            self.logger.error(f"Error updating optimal interval: {str(e)}")
+        """Dựng lại mô hình của một service từ lịch sử và lưu checkpoint"""
+        self._bootstrap_models([service_type])
+        self.checkpoint()
+        self.logger.info(f"Updated optimal interval for {service_type}: {self.optimal_intervals[service_type]}s")
     
     def get_optimal_interval(self, service_type: str) -> int:
-        """Lấy thời gian cập nhật tối ưu cho một service"""
-        query = '''
-            SELECT interval, confidence, last_updated
-            FROM optimal_update_intervals
-            WHERE service_type = ?
-        '''
-        try:
-            result = self.db.execute_query(query, (service_type,))
-            if result:
-                # Kiểm tra xem dữ liệu có quá cũ không (hơn 1 ngày)
-                last_updated = datetime.fromisoformat(result[0]['last_updated'])
-                if (datetime.now() - last_updated).days > 1:
-                    # Cập nhật lại nếu dữ liệu quá cũ
-                    self.update_optimal_interval(service_type)
-                    return self.get_optimal_interval(service_type)
-                return result[0]['interval']
-            
-            # Nếu chưa có dữ liệu, phân tích và lưu
-            self.update_optimal_interval(service_type)
-            return self.get_optimal_interval(service_type)
-            
-        except Exception as e:
-            self.logger.error(f"Error getting optimal interval: {str(e)}")
-            return self.max_update_interval  # Trả về giá trị mặc định nếu có lỗi 
\ No newline at end of file
+        """Lấy thời gian cập nhật tối ưu cho một service (đọc từ bộ nhớ)"""
+        return self.optimal_intervals.get(service_type, self.max_update_interval)
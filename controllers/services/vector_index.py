@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class VectorIndex:
+    """Chỉ mục cosine similarity trên ma trận float32 liên tục, các vector được chuẩn hóa sẵn.
+
+    Tìm kiếm mặc định là một phép nhân ma trận-vector cộng argpartition để lấy top-k.
+    Khi số vector vượt quá ivf_threshold, một chỉ mục IVF (k-means thô) được dựng để
+    chỉ chấm điểm các cụm gần truy vấn nhất.
+    """
+
+    def __init__(self, dim: Optional[int] = None, ivf_threshold: int = 20000, n_probe: int = 8):
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.n_probe = n_probe
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._labels = np.empty(0, dtype=np.int32)
+        self._label_codes: Dict[Optional[str], int] = {}
+        self._size = 0
+        self._centroids = None
+        self._assignments = None
+        self._list_order = None
+        self._list_offsets = None
+        self._ivf_built_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Chuẩn hóa L2 theo hàng, trả về float32"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray, labels: Optional[Sequence[str]] = None) -> None:
+        """Thêm các vector (một hoặc nhiều hàng) vào chỉ mục"""
+        vectors = self.normalize(np.atleast_2d(vectors))
+        count = vectors.shape[0]
+        if count == 0:
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Sai số chiều vector: {vectors.shape[1]} != {self.dim}")
+
+        self._reserve(self._size + count)
+        self._matrix[self._size:self._size + count] = vectors
+        self._ids[self._size:self._size + count] = ids
+        self._labels[self._size:self._size + count] = [self._label_code(label) for label in labels] \
+            if labels is not None else self._label_code(None)
+        if self._centroids is not None:
+            self._assignments[self._size:self._size + count] = np.argmax(vectors @ self._centroids.T, axis=1)
+        self._size += count
+
+        if self._size >= self.ivf_threshold and self._size >= 2 * max(self._ivf_built_size, 1):
+            self._build_ivf()
+
+    def _reserve(self, capacity: int) -> None:
+        """Tăng dung lượng theo cấp số nhân; chuyển dữ liệu memmap sang bộ nhớ khi cần ghi"""
+        if capacity <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+        new_capacity = max(capacity, 2 * self._matrix.shape[0], 64)
+        matrix = np.empty((new_capacity, self.dim), dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        labels = np.empty(new_capacity, dtype=np.int32)
+        assignments = np.empty(new_capacity, dtype=np.int32) if self._assignments is not None else None
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            labels[:self._size] = self._labels[:self._size]
+            if assignments is not None:
+                assignments[:self._size] = self._assignments[:self._size]
+        self._matrix, self._ids, self._labels = matrix, ids, labels
+        self._assignments = assignments
+
+    def _build_ivf(self, iterations: int = 8, sample_size: int = 20000) -> None:
+        """Dựng chỉ mục IVF bằng vài vòng k-means (spherical) trên một mẫu dữ liệu"""
+        vectors = self._matrix[:self._size]
+        n_lists = max(int(np.sqrt(self._size)), 1)
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(self._size, min(sample_size, self._size), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(n_lists):
+                members = sample[nearest == cluster]
+                if members.size:
+                    centroids[cluster] = members.sum(axis=0)
+            centroids = self.normalize(centroids)
+
+        self._centroids = centroids
+        self._assignments = np.empty(self._matrix.shape[0], dtype=np.int32)
+        self._assignments[:self._size] = np.argmax(vectors @ centroids.T, axis=1)
+        # Danh sách đảo: các dòng được sắp theo cụm, offsets[c]:offsets[c+1] là dòng của cụm c
+        self._list_order = np.argsort(self._assignments[:self._size], kind='stable')
+        self._list_offsets = np.searchsorted(self._assignments[:self._size][self._list_order], np.arange(n_lists + 1))
+        self._ivf_built_size = self._size
+        logger.info(f"Đã dựng chỉ mục IVF: {n_lists} cụm cho {self._size} vector")
+
+    def search(self, query: np.ndarray, top_k: int = 5, label: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Tìm top_k vector gần nhất, trả về [(id, score)] theo score giảm dần"""
+        if self._size == 0 or top_k <= 0:
+            return []
+        query = self.normalize(query).reshape(-1)
+
+        if self._centroids is not None:
+            probes = min(self.n_probe, self._centroids.shape[0])
+            centroid_scores = self._centroids @ query
+            nearest = np.argpartition(-centroid_scores, probes - 1)[:probes]
+            candidates = np.concatenate(
+                [self._list_order[self._list_offsets[c]:self._list_offsets[c + 1]] for c in nearest]
+            )
+            # Các vector thêm sau lần dựng IVF gần nhất chưa có trong danh sách đảo
+            if self._size > self._ivf_built_size:
+                tail = np.arange(self._ivf_built_size, self._size)
+                tail = tail[np.isin(self._assignments[tail], nearest)]
+                candidates = np.concatenate([candidates, tail])
+        else:
+            candidates = None
+
+        if label is not None:
+            code = self._label_codes.get(label)
+            if code is None:
+                return []
+            if candidates is None:
+                candidates = np.flatnonzero(self._labels[:self._size] == code)
+            else:
+                candidates = candidates[self._labels[candidates] == code]
+
+        if candidates is None:
+            scores = self._matrix[:self._size] @ query
+            positions = None
+        else:
+            if candidates.size == 0:
+                return []
+            scores = self._matrix[candidates] @ query
+            positions = candidates
+
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if positions is None else positions[top]
+        return [(int(self._ids[row]), float(scores[index])) for row, index in zip(rows, top)]
+
+    def save(self, path: str) -> None:
+        """Lưu ma trận, id và nhãn xuống đĩa (path là tiền tố file).
+
+        Mỗi file được ghi ra file tạm rồi os.replace; manifest ghi sau cùng đánh dấu bộ file hoàn chỉnh.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        names = {code: label for label, code in self._label_codes.items()}
+        arrays = {
+            'vectors': self._matrix[:self._size],
+            'ids': self._ids[:self._size],
+            'labels': np.array([names[code] or '' for code in range(len(names))], dtype=str),
+            'label_codes': self._labels[:self._size],
+        }
+        manifest_file = f"{path}.manifest.json"
+        if os.path.exists(manifest_file):
+            # Bộ file cũ không còn hợp lệ từ lúc bắt đầu ghi đè
+            os.remove(manifest_file)
+        for name, array in arrays.items():
+            target = f"{path}.{name}.npy"
+            with open(f"{target}.tmp", 'wb') as f:
+                np.save(f, array)
+            os.replace(f"{target}.tmp", target)
+        with open(f"{manifest_file}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'size': self._size, 'dim': self.dim}, f)
+        os.replace(f"{manifest_file}.tmp", manifest_file)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, **kwargs) -> Optional['VectorIndex']:
+        """Nạp chỉ mục đã lưu; ma trận được memory-map thay vì đọc toàn bộ vào RAM.
+
+        Trả về None nếu chưa có bộ file hoàn chỉnh hoặc các mảng không khớp số dòng.
+        """
+        manifest_file = f"{path}.manifest.json"
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file, encoding='utf-8') as f:
+            size = json.load(f)['size']
+        matrix = np.load(f"{path}.vectors.npy", mmap_mode='r' if mmap else None)
+        ids = np.load(f"{path}.ids.npy")
+        labels = np.load(f"{path}.labels.npy")
+        label_codes = np.load(f"{path}.label_codes.npy")
+        if not (matrix.ndim == 2 and len(ids) == len(label_codes) == matrix.shape[0] == size):
+            logger.warning(f"Chỉ mục vector {path} không nhất quán, bỏ qua để dựng lại")
+            return None
+        if size and label_codes.max() >= len(labels):
+            logger.warning(f"Chỉ mục vector {path} có mã nhãn không hợp lệ, bỏ qua để dựng lại")
+            return None
+        index = cls(dim=matrix.shape[1], **kwargs)
+        index._matrix = matrix
+        index._ids = ids
+        index._label_codes = {(label or None): code for code, label in enumerate(labels.tolist())}
+        index._labels = label_codes
+        index._size = size
+        if index._size >= index.ivf_threshold:
+            index._build_ivf()
+        return index
+
+    def _label_code(self, label: Optional[str]) -> int:
+        """Mã số nguyên của nhãn (so sánh mảng int32 nhanh hơn mảng chuỗi)"""
+        code = self._label_codes.get(label)
+        if code is None:
+            code = self._label_codes[label] = len(self._label_codes)
+        return code
+
+    def max_id(self) -> int:
+        """Id lớn nhất đã có trong chỉ mục"""
+        return int(self._ids[:self._size].max()) if self._size else 0
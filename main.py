@@ -9,6 +9,7 @@ from datetime import datetime
 import pandas as pd
 from models.config import Config
 from models.database import DatabaseManager
+from models.async_database import AsyncDatabase
 from models.knowledge_base import KnowledgeBase
 from views.components.schedule_frame import ScheduleFrame
 from views.components.vscode_frame import VSCodeFrame
@@ -16,6 +17,7 @@ from views.components.greeting_frame import GreetingFrame
 from views.components.weather_frame import WeatherFrame
 from views.components.knowledge_editor_frame import KnowledgeEditorFrame
 from views.components.knowledge_suggestion_frame import KnowledgeSuggestionFrame
+from views.components.diagnostics_frame import DiagnosticsFrame
 from controllers.schedule_controller import ScheduleController
 from controllers.vscode_controller import VSCodeController
 from controllers.inference_engine import InferenceEngine
@@ -25,6 +27,11 @@ from services.weather_service import WeatherService
 from services.gemini_error_correction_service import GeminiErrorCorrectionService
 from services.error_correction_service import ErrorCorrectionService
 from services.fact_collector import FactCollector
+from services.refresh_scheduler import RefreshScheduler
+from services.retention_service import RetentionService
+from services.maintenance_service import MaintenanceService
+from services.metrics_registry import get_metrics_registry
+from controllers.services.model_registry import ModelRegistry
 import tkinter as tk
 
 # Thiết lập logging
@@ -105,6 +112,11 @@ class MainWindow(ctk.CTk):
         try:
             # Khởi tạo database
             self.db = DatabaseManager(os.path.join('data', 'database', 'database.db'))
+            profiling = Config().get_profiling_config()
+            if profiling.get('enabled'):
+                self.db.enable_profiling(profiling.get('slow_query_ms', 100), profiling.get('trace', False))
+            # Truy vấn từ UI chạy trên luồng database riêng, kết quả trả về qua after()
+            self.async_db = AsyncDatabase(self.db, tk_root=self)
             
             # Khởi tạo các dịch vụ cơ bản
             self.weather_service = WeatherService(self.db)
@@ -113,6 +125,9 @@ class MainWindow(ctk.CTk):
             # Khởi tạo knowledge base
             self.knowledge_base = KnowledgeBase()
             
+            # Bộ hẹn giờ dùng chung cho mọi cập nhật định kỳ của UI
+            self.refresh_scheduler = RefreshScheduler(self)
+            
             # Khởi tạo giao diện chính
             self._initialize_main_window()
             
@@ -135,14 +150,32 @@ class MainWindow(ctk.CTk):
             self.logger.info("Đang đóng ứng dụng...")
             
             # Dừng tất cả các timer và cập nhật
-            try:
-                self.after_cancel("all")
-            except:
-                pass
+            if hasattr(self, 'refresh_scheduler'):
+                self.refresh_scheduler.stop()
                 
+            # Dừng dịch vụ dọn dữ liệu nền trước khi đóng database
+            if hasattr(self, 'retention_service') and self.retention_service:
+                self.retention_service.stop()
+            if hasattr(self, 'maintenance_service') and self.maintenance_service:
+                self.maintenance_service.stop()
+            get_metrics_registry().stop_rollup(getattr(self, 'db', None))
+            
+            # Hủy yêu cầu Gemini đang chờ, dừng luồng embedding rồi đóng tiến trình model
+            if hasattr(self, 'gemini_service') and self.gemini_service:
+                try:
+                    self.gemini_service.close()
+                except Exception as e:
+                    self.logger.warning(f"Lỗi khi đóng Gemini service: {e}")
+            ModelRegistry.shutdown()
+            
+            if hasattr(self, 'async_db') and self.async_db:
+                self.async_db.close()
+            
             # Đóng các kết nối database
             if hasattr(self, 'db') and self.db:
                 try:
+                    if self.db.profiler is not None:
+                        self.db.profiler.dump(Config().get_profiling_config().get('dump_path', 'logs/query_profile.json'))
                     self.db.close()
                 except Exception as e:
                     self.logger.warning(f"Lỗi khi đóng database: {e}")
@@ -174,7 +207,11 @@ class MainWindow(ctk.CTk):
         KnowledgeEditorFrame(self.scrollable_frame, self.db, self.knowledge_base, self.error_correction_service)
 
     def _open_knowledge_suggestion(self):
-        KnowledgeSuggestionFrame(self.scrollable_frame, self.db, self.rule_suggester)
+        KnowledgeSuggestionFrame(self.scrollable_frame, self.rule_suggester, self.knowledge_base, None,
+                                 async_db=self.async_db)
+
+    def _open_diagnostics(self):
+        DiagnosticsFrame(self, get_metrics_registry(), getattr(self, 'gemini_service', None), self.refresh_scheduler)
 
     def _run_expert_system_inference(self):
         """Chạy suy luận hệ chuyên gia"""
@@ -204,22 +241,12 @@ class MainWindow(ctk.CTk):
             self.logger.error(f"Lỗi khi chạy suy luận hệ chuyên gia: {e}", exc_info=True)
             self.recommendation_label.configure(text="Lỗi khi tạo đề xuất.")
 
-    def _update_time(self):
-        if self.greeting_frame.winfo_exists():
-            try:
-                self.greeting_frame.update_time()
-                # Only log time if minute changes
-                current_minute = datetime.now().minute
-                if not hasattr(self, '_last_logged_minute') or self._last_logged_minute != current_minute:
-                    self.logger.info(f"Cập nhật thời gian: {datetime.now().strftime('%H:%M:%S')}")
-                    self._last_logged_minute = current_minute
-                self.after(1000, self._update_time) # Update every second
-            except TclError as e:
-                self.logger.warning(f"TclError during _update_time: {e} - widget might have been destroyed.")
-            except Exception as e:
-                self.logger.error(f"Error in _update_time: {e}", exc_info=True)
-        else:
-            self.logger.warning("greeting_frame không tồn tại khi gọi _update_time.")
+    def _start_refresh_jobs(self):
+        """Đăng ký các cập nhật định kỳ của frame con và khởi động bộ hẹn giờ dùng chung"""
+        for frame in (self.greeting_frame, self.weather_frame):
+            if frame is not None and frame.winfo_exists():
+                frame.register_jobs(self.refresh_scheduler)
+        self.refresh_scheduler.start()
 
     def show_gemini_suggestion(self):
         try:
@@ -371,6 +398,17 @@ class MainWindow(ctk.CTk):
             )
             self.suggest_rules_button.grid(row=8, column=0, sticky="ew", padx=10, pady=10)
             
+            # Nút chẩn đoán hiệu năng
+            self.diagnostics_button = ctk.CTkButton(
+                self.scrollable_frame,
+                text="Chẩn Đoán Hiệu Năng",
+                command=self._open_diagnostics,
+                font=("Montserrat", 14, "bold"),
+                fg_color="#6C757D",
+                hover_color="#5A6268"
+            )
+            self.diagnostics_button.grid(row=9, column=0, sticky="ew", padx=10, pady=10)
+            
         except Exception as e:
             self.logger.error(f"Lỗi khởi tạo các frame: {e}", exc_info=True)
             raise
@@ -398,6 +436,17 @@ class MainWindow(ctk.CTk):
             # Khởi tạo VSCode Controller
             self.vscode_controller = VSCodeController(self.db, self.fact_collector)
             
+            # Gộp và dọn dữ liệu lịch sử trên luồng nền
+            self.retention_service = RetentionService(self.db)
+            self.retention_service.start()
+            
+            # Bảo trì database: optimize, checkpoint WAL, ANALYZE sau khi nhập hàng loạt, quick_check khi rảnh
+            self.maintenance_service = MaintenanceService(self.db)
+            self.maintenance_service.start()
+            
+            # Gộp metrics (độ trễ, token của Gemini...) vào SQLite định kỳ
+            get_metrics_registry().start_rollup(self.db)
+            
             self.logger.info("Đã khởi tạo tất cả các dịch vụ và bộ điều khiển")
             
         except Exception as e:
@@ -446,8 +495,8 @@ def main():
             # Cập nhật màu sắc
             app.update_colors()
             
-            # Bắt đầu cập nhật thời gian
-            app._update_time()
+            # Bắt đầu các cập nhật định kỳ (đồng hồ, lời chào, thời tiết)
+            app._start_refresh_jobs()
             
             logger.info("Ứng dụng đã sẵn sàng!")
             
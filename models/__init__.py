@@ -1,11 +1,12 @@
 from .config import Config
 from .database import DatabaseManager
-from .schedule import Schedule
+from .schedule import Schedule, ScheduleStore
 from .vscode import VSCode
 
 __all__ = [
     'Config',
     'DatabaseManager',
     'Schedule',
+    'ScheduleStore',
     'VSCode'
 ] 
\ No newline at end of file
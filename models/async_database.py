@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from models.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Chu kỳ kiểm tra future đã xong trên Tk event loop (ms)
+TK_POLL_INTERVAL = 50
+
+class _Job:
+    __slots__ = ('fn', 'args', 'kwargs', 'future', 'owner')
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, owner: Any):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.owner = owner
+
+class AsyncTransaction:
+    """Transaction chạy trên luồng database; dùng qua `async with adb.transaction() as tx`"""
+
+    def __init__(self, adb: 'AsyncDatabase'):
+        self._adb = adb
+        self._context = None
+        self.conn = None
+
+    def _begin(self) -> None:
+        self._context = self._adb.db.transaction()
+        self.conn = self._context.__enter__()
+        self._adb._active = self
+
+    def _end(self, exc_type, exc, tb) -> None:
+        if self.conn is None:
+            # _begin lỗi hoặc transaction đã kết thúc
+            return
+        try:
+            self._context.__exit__(exc_type, exc, tb)
+        finally:
+            self._adb._active = None
+            self._context = None
+            self.conn = None
+
+    async def __aenter__(self) -> 'AsyncTransaction':
+        future = self._adb.submit(self._begin)
+        try:
+            await asyncio.wrap_future(future)
+        except asyncio.CancelledError as e:
+            # __aexit__ sẽ không chạy: nếu _begin đã chạy thì phải kết thúc transaction ở đây,
+            # nếu không luồng database chỉ phục vụ transaction này và giữ khóa ghi mãi
+            if not future.cancel():
+                self._adb._submit(self._end, (type(e), e, e.__traceback__), {}, owner=self)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        await asyncio.wrap_future(self._adb._submit(self._end, (exc_type, exc, tb), {}, owner=self))
+        return False
+
+    async def fetch(self, query: str, params: Sequence[Any] = ()) -> List[Any]:
+        return await asyncio.wrap_future(
+            self._adb._submit(lambda: self.conn.execute(query, params).fetchall(), (), {}, owner=self)
+        )
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        return await asyncio.wrap_future(
+            self._adb._submit(lambda: self.conn.execute(query, params).rowcount, (), {}, owner=self)
+        )
+
+    async def execute_many(self, query: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        return await asyncio.wrap_future(
+            self._adb._submit(lambda: self.conn.executemany(query, seq_of_params).rowcount, (), {}, owner=self)
+        )
+
+class AsyncDatabase:
+    """Mặt tiền bất đồng bộ cho DatabaseManager.
+
+    Mọi thao tác chạy trên một luồng database riêng (sở hữu kết nối của nó), kết quả
+    trả về dưới dạng Future: `await` được từ asyncio, hoặc nhận callback trên Tk
+    event loop qua then(). Khi một transaction đang mở, các job khác được giữ lại
+    cho đến khi transaction kết thúc, nên chúng không lẫn vào transaction đó.
+    """
+
+    def __init__(self, db: Optional[DatabaseManager] = None, tk_root=None, poll_interval: int = TK_POLL_INTERVAL):
+        self.db = db or DatabaseManager()
+        self.tk_root = tk_root
+        self.poll_interval = poll_interval
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._active = None
+        self._closed = False
+        self._callbacks = []
+        self._after_id = None
+        self._thread = threading.Thread(target=self._run, name='AsyncDatabase', daemon=True)
+        self._thread.start()
+
+    def _submit(self, fn: Callable, args: tuple, kwargs: dict, owner: Any = None) -> Future:
+        job = _Job(fn, args, kwargs, owner)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("AsyncDatabase đã đóng")
+            self._jobs.append(job)
+            self._cond.notify()
+        return job.future
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Chạy một hàm bất kỳ (ví dụ db.get_reminders) trên luồng database"""
+        return self._submit(fn, args, kwargs)
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                if self._active is None:
+                    if self._jobs:
+                        return self._jobs.popleft()
+                    if self._closed:
+                        return None
+                else:
+                    for index, job in enumerate(self._jobs):
+                        if job.owner is self._active:
+                            del self._jobs[index]
+                            return job
+                self._cond.wait()
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                job.future.set_result(job.fn(*job.args, **job.kwargs))
+            except BaseException as e:
+                job.future.set_exception(e)
+
+    def _fetch(self, query: str, params: Sequence[Any]) -> List[Any]:
+        return self.db.get_connection().execute(query, params).fetchall()
+
+    def _execute(self, query: str, params: Sequence[Any]) -> int:
+        with self.db.transaction() as conn:
+            return conn.execute(query, params).rowcount
+
+    def _execute_many(self, query: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        with self.db.transaction() as conn:
+            return conn.executemany(query, seq_of_params).rowcount
+
+    async def fetch(self, query: str, params: Sequence[Any] = ()) -> List[Any]:
+        """Đọc các dòng của một truy vấn"""
+        return await asyncio.wrap_future(self.submit(self._fetch, query, params))
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[Any]:
+        rows = await self.fetch(query, params)
+        return rows[0] if rows else None
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        """Thực thi một câu lệnh ghi trong transaction riêng, trả về số dòng bị ảnh hưởng"""
+        return await asyncio.wrap_future(self.submit(self._execute, query, params))
+
+    async def execute_many(self, query: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """Thực thi một câu lệnh với nhiều bộ tham số trong một transaction"""
+        return await asyncio.wrap_future(self.submit(self._execute_many, query, list(seq_of_params)))
+
+    async def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """await một phương thức đồng bộ của DatabaseManager mà không chặn event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def transaction(self) -> AsyncTransaction:
+        """Transaction bất đồng bộ; bên trong chỉ dùng các phương thức của đối tượng tx"""
+        return AsyncTransaction(self)
+
+    def then(self, future: Future, on_done: Callable[[Any], None],
+             on_error: Optional[Callable[[BaseException], None]] = None) -> None:
+        """Gọi on_done/on_error trên luồng Tk khi future xong (kiểm tra bằng after())"""
+        if self.tk_root is None:
+            raise RuntimeError("AsyncDatabase chưa được gắn với Tk root")
+        self._callbacks.append((future, on_done, on_error))
+        if self._after_id is None:
+            self._after_id = self.tk_root.after(self.poll_interval, self._poll)
+
+    def _poll(self) -> None:
+        self._after_id = None
+        pending = []
+        for future, on_done, on_error in self._callbacks:
+            if not future.done():
+                pending.append((future, on_done, on_error))
+                continue
+            try:
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                if error is None:
+                    on_done(future.result())
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    logger.error(f"Lỗi thao tác database bất đồng bộ: {str(error)}")
+            except Exception as e:
+                logger.error(f"Lỗi trong callback database: {str(e)}")
+        self._callbacks = pending
+        if pending:
+            try:
+                self._after_id = self.tk_root.after(self.poll_interval, self._poll)
+            except Exception as e:
+                # Cửa sổ đã bị hủy
+                logger.debug(f"Dừng kiểm tra future database: {str(e)}")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Chạy nốt các job đã gửi rồi dừng luồng database"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._after_id is not None and self.tk_root is not None:
+            try:
+                self.tk_root.after_cancel(self._after_id)
+            except Exception as e:
+                logger.debug(f"Không hủy được lịch kiểm tra future: {str(e)}")
+            self._after_id = None
@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger(__name__)
+
+# Các cột được mã hóa khi lưu xuống SQLite
+ENCRYPTED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'user_interactions_log': ('facts',),
+    'reminders': ('description',)
+}
+
+# Giá trị mã hóa: prefix + nonce + ciphertext (kèm tag). Giá trị không có prefix là dữ liệu cũ chưa mã hóa
+ENCRYPTED_VALUE_PREFIX = b"EC1"
+NONCE_SIZE = 12
+DECRYPTED_CACHE_SIZE = 2048
+COLUMN_KEY_INFO = b"myai-column-codec-v1"
+
+class EncryptedColumnCodec:
+    """Mã hóa/giải mã từng giá trị cột bằng AES-GCM, kèm LRU các giá trị đã giải mã.
+
+    Tên bảng và cột nằm trong dữ liệu xác thực nên không thể chép giá trị mã hóa
+    sang cột khác. Vì mỗi giá trị có nonce riêng, chính ciphertext được dùng làm
+    khóa cache: đọc lại cùng một dòng không phải giải mã lại.
+    """
+
+    def __init__(self, key: bytes, columns: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 cache_size: int = DECRYPTED_CACHE_SIZE):
+        self._aead = AESGCM(key)
+        self.columns = dict(ENCRYPTED_COLUMNS if columns is None else columns)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'encrypted': 0, 'decrypted': 0, 'cache_hits': 0}
+
+    @classmethod
+    def from_security_manager(cls, security_manager=None, **kwargs) -> 'EncryptedColumnCodec':
+        """Tạo codec với khóa dẫn xuất từ khóa của SecurityManager"""
+        if security_manager is None:
+            from utils.security import SecurityManager
+            security_manager = SecurityManager()
+        return cls(security_manager.derive_key(COLUMN_KEY_INFO), **kwargs)
+
+    def is_encrypted(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, ())
+
+    def _aad(self, table: str, column: str) -> bytes:
+        return f"{table}.{column}".encode()
+
+    def _remember(self, token: bytes, value: str) -> None:
+        with self._lock:
+            self._cache[token] = value
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def encrypt(self, table: str, column: str, value: Optional[str]) -> Optional[bytes]:
+        """Mã hóa một giá trị (None giữ nguyên)"""
+        return self.encrypt_many(table, column, [value])[0]
+
+    def encrypt_many(self, table: str, column: str, values: Iterable[Optional[str]]) -> List[Optional[bytes]]:
+        """Mã hóa nhiều giá trị của cùng một cột cho ghi hàng loạt"""
+        values = list(values)
+        # Lấy nonce cho cả lô trong một lần gọi os.urandom
+        nonces = os.urandom(NONCE_SIZE * len(values))
+        aad = self._aad(table, column)
+        tokens = []
+        for index, value in enumerate(values):
+            if value is None:
+                tokens.append(None)
+                continue
+            nonce = nonces[index * NONCE_SIZE:(index + 1) * NONCE_SIZE]
+            token = ENCRYPTED_VALUE_PREFIX + nonce + self._aead.encrypt(nonce, value.encode('utf-8'), aad)
+            tokens.append(token)
+        with self._lock:
+            self.stats['encrypted'] += len(values)
+        # Dòng vừa ghi thường được đọc lại ngay (danh sách reminders, log gần đây)
+        for token, value in zip(tokens, values):
+            if token is not None:
+                self._remember(token, value)
+        return tokens
+
+    def decrypt(self, table: str, column: str, value: Any) -> Any:
+        """Giải mã một giá trị; giá trị chưa mã hóa được trả về nguyên vẹn"""
+        if not isinstance(value, (bytes, memoryview)):
+            return value
+        token = bytes(value)
+        if not token.startswith(ENCRYPTED_VALUE_PREFIX):
+            return value
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                self._cache.move_to_end(token)
+                self.stats['cache_hits'] += 1
+                return cached
+        start = len(ENCRYPTED_VALUE_PREFIX)
+        nonce = token[start:start + NONCE_SIZE]
+        plaintext = self._aead.decrypt(nonce, token[start + NONCE_SIZE:], self._aad(table, column)).decode('utf-8')
+        with self._lock:
+            self.stats['decrypted'] += 1
+        self._remember(token, plaintext)
+        return plaintext
+
+    def decode_row(self, table: str, row: Any) -> Dict[str, Any]:
+        """Chuyển một dòng (sqlite3.Row hoặc dict) thành dict với các cột đã giải mã"""
+        record = dict(row)
+        for column in self.columns.get(table, ()):
+            if column in record:
+                record[column] = self.decrypt(table, column, record[column])
+        return record
+
+    def clear_cache(self) -> None:
+        """Xóa cache giá trị đã giải mã"""
+        with self._lock:
+            self._cache.clear()
+
+    def encrypt_plaintext(self, conn, batch_size: int = 500) -> Dict[str, int]:
+        """Mã hóa theo lô các giá trị cũ còn lưu dạng rõ; người gọi quản lý transaction của conn"""
+        encrypted = {}
+        for table, column in find_plaintext_columns(conn, self.columns):
+            count = 0
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT id, {column} FROM {table} WHERE id > ? AND typeof({column}) = 'text' "
+                    f"ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                tokens = self.encrypt_many(table, column, [row[1] for row in rows])
+                conn.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                    [(token, row[0]) for token, row in zip(tokens, rows)]
+                )
+                count += len(rows)
+                last_id = rows[-1][0]
+            encrypted[f"{table}.{column}"] = count
+        return encrypted
+
+def find_plaintext_columns(conn, columns: Optional[Dict[str, Tuple[str, ...]]] = None) -> List[Tuple[str, str]]:
+    """Các cột cần mã hóa (có trong database) còn ít nhất một giá trị dạng rõ"""
+    columns = ENCRYPTED_COLUMNS if columns is None else columns
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    found = []
+    for table, table_encrypted in columns.items():
+        if table not in existing:
+            continue
+        table_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column in table_encrypted:
+            if column in table_columns and conn.execute(
+                f"SELECT 1 FROM {table} WHERE typeof({column}) = 'text' LIMIT 1"
+            ).fetchone():
+                found.append((table, column))
+    return found
@@ -28,7 +28,34 @@ class Config:
         },
         'database': {
             'path': 'data/database/greeting.db',
-            'max_connections': 5
+            'max_connections': 5,
+            'retention': {
+                # Số ngày giữ dữ liệu thô trước khi xóa (đã được gộp vào bảng rollup)
+                'raw_ttl_days': {
+                    'update_history': 14,
+                    'user_interactions_log': 90,
+                    'weather_data': 30,
+                    'app_launches': 365
+                },
+                'hourly_rollup_ttl_days': 90,
+                'compaction_interval': 3600,  # 1 giờ
+                'incremental_vacuum_pages': 1000
+            },
+            'maintenance': {
+                'check_interval': 60,            # 1 phút
+                'optimize_interval': 3600,       # 1 giờ
+                'wal_checkpoint_mb': 64,         # checkpoint(TRUNCATE) khi file -wal vượt ngưỡng
+                'analyze_min_rows': 500,         # ANALYZE khi các transaction đã thay đổi từng ấy dòng
+                'idle_seconds': 300,             # quick_check chỉ chạy khi không có ghi trong 5 phút
+                'quick_check_interval': 86400    # 1 ngày
+            },
+            'profiling': {
+                # Đo thời gian truy vấn; kết quả được ghi ra dump_path khi đóng ứng dụng
+                'enabled': False,
+                'slow_query_ms': 100,
+                'trace': False,
+                'dump_path': 'logs/query_profile.json'
+            }
         },
         'logging': {
             'level': 'INFO',
@@ -125,6 +152,18 @@ class Config:
             return os.getenv('GEMINI_API_KEY', '')
         return ''
     
+    def get_retention_config(self) -> Dict[str, Any]:
+        """Lấy cấu hình lưu giữ và gộp dữ liệu"""
+        return self.get('database.retention', {})
+    
+    def get_maintenance_config(self) -> Dict[str, Any]:
+        """Lấy cấu hình bảo trì database"""
+        return self.get('database.maintenance', {})
+    
+    def get_profiling_config(self) -> Dict[str, Any]:
+        """Lấy cấu hình đo truy vấn database"""
+        return self.get('database.profiling', {})
+    
     def get_update_interval(self, service: str) -> int:
         """Lấy thời gian cập nhật cho service"""
         return self.get(f'app_settings.update_interval.{service}', 3600)
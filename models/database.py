@@ -1,12 +1,19 @@
 import sqlite3
 from contextlib import contextmanager
 import threading
-from typing import Optional, List, Dict, Any
+from typing import Optional, Iterator, List, Dict, Any
 import logging
 import os
 from datetime import datetime, timedelta
 import json
 import time
+import numpy as np
+from models.column_codec import EncryptedColumnCodec
+from models.database_migrations import ENCRYPT_COLUMNS_TASK, MIGRATIONS
+from models.migrations import SchemaMigrator
+from models.query_profiler import SLOW_QUERY_MS, QueryProfiler
+from models.statements import STATEMENT_CACHE_SIZE, STATEMENTS
+from models.tables import REMINDERS, USER_INTERACTIONS_LOG, Record, Table
 from utils.error_handler import DatabaseError
 
 logger = logging.getLogger(__name__)
@@ -39,36 +46,46 @@ class DatabaseManager:
                 # Đảm bảo thư mục tồn tại
                 os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
                 
-                # Tạo kết nối ban đầu
+                # Mỗi luồng dùng kết nối riêng; ghi được tuần tự hóa bằng một khóa,
+                # đọc ở chế độ WAL không cần khóa
+                self._local = threading.local()
+                self._connections = {}
+                self._connections_lock = threading.Lock()
+                self._write_lock = threading.RLock()
+                # Sau close() không mở thêm kết nối (ví dụ từ luồng nền còn chạy lúc tắt ứng dụng)
+                self._closed = False
+                self.timeout = 30
+                # Bộ đo truy vấn, chỉ bật khi cần (enable_profiling)
+                self.profiler = None
+                # Theo dõi cho MaintenanceService: lần ghi cuối và số dòng đã thay đổi chưa ANALYZE
+                self.last_write_at = time.monotonic()
+                self._changed_rows = 0
+                
+                # Tạo kết nối ban đầu (kết nối của luồng khởi tạo)
                 logger.debug("Tạo kết nối ban đầu...")
-                self.conn = sqlite3.connect(self.db_path)
-                self.conn.row_factory = sqlite3.Row
+                self.conn = self.get_connection()
                 
-                # Thiết lập các tùy chọn SQLite
-                logger.debug("Thiết lập các tùy chọn SQLite...")
-                self.conn.execute("PRAGMA journal_mode=WAL")
-                self.conn.execute("PRAGMA synchronous=NORMAL")
-                self.conn.execute("PRAGMA temp_store=MEMORY")
-                self.conn.execute("PRAGMA mmap_size=30000000000")
-                self.conn.execute("PRAGMA page_size=4096")
-                self.conn.execute("PRAGMA cache_size=10000")
-                self.conn.execute("PRAGMA locking_mode=NORMAL")
-                self.conn.execute("PRAGMA busy_timeout=5000")
+                # Tạo/cập nhật các bảng theo phiên bản schema
+                logger.debug("Kiểm tra phiên bản schema...")
+                with self._write_lock:
+                    self._migrate_schema()
                 
-                # Tạo các bảng cần thiết
-                logger.debug("Tạo các bảng...")
-                self._create_tables()
-                
-                # Khởi tạo connection pool
-                logger.debug("Khởi tạo connection pool...")
-                self.pool = []
-                self.max_connections = 5
-                self.timeout = 30
+                # Các câu lệnh có tên được biên dịch thử một lần để lỗi SQL lộ ra ngay khi khởi động
+                self.statements = STATEMENTS
+                self.statements.validate(self.conn)
                 
                 # Khởi tạo cache
                 logger.debug("Khởi tạo cache...")
                 self.cache = {}
                 self.cache_timeout = 300  # 5 phút
+                # Đọc chạy song song trên nhiều luồng: cache có khóa riêng, và thế hệ tăng sau mỗi lần ghi
+                # để kết quả đọc bắt đầu trước lần ghi không bị lưu lại vào cache
+                self._cache_lock = threading.Lock()
+                self._cache_generation = 0
+                
+                # Codec mã hóa các cột nhạy cảm, tạo khi cần lần đầu
+                self.column_codec = None
+                self._column_codec_lock = threading.Lock()
                 
                 self._initialized = True
                 logger.info("DatabaseManager đã được khởi tạo thành công")
@@ -77,231 +94,50 @@ class DatabaseManager:
                 logger.error(f"Lỗi khởi tạo DatabaseManager: {str(e)}", exc_info=True)
                 raise DatabaseError(f"Không thể khởi tạo DatabaseManager: {str(e)}")
     
-    def _create_tables(self):
-        """Tạo các bảng cần thiết nếu chưa tồn tại"""
-        try:
-            logger.debug("Bắt đầu tạo các bảng...")
-            
-            # Bảng reminders
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS reminders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    due_date TEXT NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Bảng weather_data
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS weather_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    city TEXT NOT NULL,
-                    temperature REAL,
-                    description TEXT,
-                    humidity INTEGER,
-                    wind_speed REAL,
-                    timestamp TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Bảng user_interactions_log
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS user_interactions_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    interaction_type TEXT NOT NULL,
-                    details TEXT,
-                    timestamp TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Bảng api_cache
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS api_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    endpoint TEXT NOT NULL,
-                    response TEXT NOT NULL,
-                    timestamp TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Bảng app_launches
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS app_launches (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    launch_time TEXT DEFAULT CURRENT_TIMESTAMP,
-                    version TEXT,
-                    status TEXT DEFAULT 'success'
-                )
-            ''')
-            
-            # Bảng schedule
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS schedule (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    day_of_week TEXT NOT NULL,
-                    start_time TEXT NOT NULL,
-                    end_time TEXT NOT NULL,
-                    subject TEXT NOT NULL,
-                    location TEXT
-                )
-            ''')
-            
-            # Cập nhật schema cho tất cả các bảng nếu cần
-            self._update_all_table_schemas()
-            
-            # Tạo các index
-            logger.debug("Tạo các index...")
-            self._create_indexes_safely()
-            
-            # Commit các thay đổi
-            self.conn.commit()
-            logger.info("Đã tạo các bảng và index thành công")
-            
-        except Exception as e:
-            logger.error(f"Lỗi tạo bảng: {str(e)}", exc_info=True)
-            raise DatabaseError(f"Không thể tạo các bảng: {str(e)}")
-    
-    def _update_all_table_schemas(self):
-        """Cập nhật schema cho tất cả các bảng nếu cần thiết"""
-        try:
-            # Định nghĩa schema mong muốn cho từng bảng
-            expected_schemas = {
-                'weather_data': {
-                    'city': 'TEXT DEFAULT "Unknown"',
-                    'temperature': 'REAL',
-                    'description': 'TEXT',
-                    'humidity': 'INTEGER',
-                    'wind_speed': 'REAL',
-                    'pressure': 'REAL',
-                    'visibility': 'INTEGER',
-                    'dew_point': 'REAL',
-                    'feels_like': 'REAL',
-                    'temp_min': 'REAL',
-                    'temp_max': 'REAL',
-                    'timestamp': 'TEXT DEFAULT CURRENT_TIMESTAMP'
-                },
-                'api_cache': {
-                    'endpoint': 'TEXT NOT NULL',
-                    'response': 'TEXT NOT NULL',
-                    'timestamp': 'TEXT DEFAULT CURRENT_TIMESTAMP'
-                },
-                'user_interactions_log': {
-                    'interaction_type': 'TEXT NOT NULL',
-                    'details': 'TEXT',
-                    'timestamp': 'TEXT DEFAULT CURRENT_TIMESTAMP'
-                }
-            }
-            
-            for table_name, expected_columns in expected_schemas.items():
-                self._update_table_schema(table_name, expected_columns)
-                
-        except Exception as e:
-            logger.warning(f"Không thể cập nhật schema cho tất cả bảng: {str(e)}")
-    
-    def _update_table_schema(self, table_name, expected_columns):
-        """Cập nhật schema cho một bảng cụ thể"""
-        try:
-            # Kiểm tra xem bảng có tồn tại không
-            cursor = self.conn.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
-            if cursor.fetchone():
-                # Bảng đã tồn tại, kiểm tra các cột
-                cursor = self.conn.execute(f"PRAGMA table_info({table_name})")
-                existing_columns = {column[1]: column[2] for column in cursor.fetchall()}
-                
-                # Thêm các cột thiếu
-                for column_name, column_def in expected_columns.items():
-                    if column_name not in existing_columns:
-                        logger.info(f"Cập nhật schema bảng {table_name}: thêm cột {column_name}")
-                        try:
-                            self.conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_def}")
-                        except Exception as e:
-                            logger.warning(f"Không thể thêm cột {column_name} vào bảng {table_name}: {str(e)}")
-                
-                self.conn.commit()
-                logger.info(f"Đã cập nhật schema cho bảng {table_name}")
-        except Exception as e:
-            logger.warning(f"Không thể cập nhật schema cho bảng {table_name}: {str(e)}")
-    
-    def _create_indexes_safely(self):
-        """Tạo các index một cách an toàn, bỏ qua nếu có lỗi"""
-        try:
-            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reminders_due_date ON reminders(due_date)')
-        except Exception as e:
-            logger.warning(f"Không thể tạo index idx_reminders_due_date: {str(e)}")
-        
-        try:
-            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reminders_status ON reminders(status)')
-        except Exception as e:
-            logger.warning(f"Không thể tạo index idx_reminders_status: {str(e)}")
-        
-        try:
-            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_weather_city ON weather_data(city)')
-        except Exception as e:
-            logger.warning(f"Không thể tạo index idx_weather_city: {str(e)}")
-        
-        try:
-            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_weather_timestamp ON weather_data(timestamp)')
-        except Exception as e:
-            logger.warning(f"Không thể tạo index idx_weather_timestamp: {str(e)}")
-        
-        try:
-            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_endpoint ON api_cache(endpoint)')
-        except Exception as e:
-            logger.warning(f"Không thể tạo index idx_api_cache_endpoint: {str(e)}")
-        
+    def _migrate_schema(self):
+        """Áp dụng các migration còn thiếu; database đã cập nhật chỉ tốn một lần đọc user_version"""
         try:
-            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_timestamp ON api_cache(timestamp)')
+            version = SchemaMigrator(MIGRATIONS).migrate(self.conn)
+            logger.debug(f"Schema database ở phiên bản {version}")
         except Exception as e:
-            logger.warning(f"Không thể tạo index idx_api_cache_timestamp: {str(e)}")
-    
-    def _update_weather_data_schema(self):
-        """Cập nhật schema của bảng weather_data nếu cần thiết"""
-        try:
-            # Kiểm tra xem bảng weather_data có tồn tại không
-            cursor = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='weather_data'")
-            if cursor.fetchone():
-                # Bảng đã tồn tại, kiểm tra xem có cột city không
-                cursor = self.conn.execute("PRAGMA table_info(weather_data)")
-                columns = [column[1] for column in cursor.fetchall()]
-                
-                if 'city' not in columns:
-                    logger.info("Cập nhật schema bảng weather_data: thêm cột city")
-                    # Thêm cột city vào bảng hiện tại
-                    self.conn.execute("ALTER TABLE weather_data ADD COLUMN city TEXT DEFAULT 'Unknown'")
-                    self.conn.commit()
-                    logger.info("Đã thêm cột city vào bảng weather_data")
-        except Exception as e:
-            logger.warning(f"Không thể cập nhật schema weather_data: {str(e)}")
-            # Không raise exception vì đây không phải lỗi nghiêm trọng
+            logger.error(f"Lỗi migrate schema: {str(e)}", exc_info=True)
+            raise DatabaseError(f"Không thể cập nhật schema database: {str(e)}")
     
     def get_connection(self):
-        """Lấy một kết nối từ pool"""
-        try:
-            if len(self.pool) < self.max_connections:
-                conn = self._create_connection()
-                self.pool.append(conn)
-                return conn
-            else:
-                # Đợi cho đến khi có kết nối khả dụng
-                start_time = time.time()
-                while time.time() - start_time < self.timeout:
-                    for conn in self.pool:
-                        if not conn.in_transaction:
-                            return conn
-                    time.sleep(0.1)
-                raise DatabaseError("Timeout khi chờ kết nối")
+        """Kết nối của luồng hiện tại (tạo khi luồng dùng lần đầu)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        if self._closed:
+            raise DatabaseError("Database đã đóng")
+        try:
+            conn = self._create_connection()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._prune_dead_connections()
+                self._connections[threading.current_thread()] = conn
+            return conn
         except Exception as e:
             logger.error(f"Lỗi lấy kết nối: {str(e)}", exc_info=True)
             raise DatabaseError(f"Không thể lấy kết nối: {str(e)}")
     
+    def _prune_dead_connections(self):
+        """Đóng kết nối của các luồng đã kết thúc (gọi khi đang giữ _connections_lock)"""
+        for thread in [thread for thread in self._connections if not thread.is_alive()]:
+            try:
+                self._connections.pop(thread).close()
+            except Exception as e:
+                logger.warning(f"Không thể đóng kết nối của luồng {thread.name}: {str(e)}")
+    
     def _create_connection(self):
         """Tạo một kết nối mới với các tùy chọn tối ưu"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            # Mỗi kết nối chỉ được dùng bởi một luồng; check_same_thread=False để close() đóng được từ luồng khác
+            conn = sqlite3.connect(
+                self.db_path, timeout=self.timeout, check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE
+            )
             conn.row_factory = sqlite3.Row
             
             # Thiết lập các tùy chọn SQLite
@@ -314,76 +150,205 @@ class DatabaseManager:
             conn.execute("PRAGMA locking_mode=NORMAL")
             conn.execute("PRAGMA busy_timeout=5000")
             
+            if self.profiler is not None:
+                self.profiler.attach(conn)
             return conn
         except Exception as e:
             logger.error(f"Lỗi tạo kết nối mới: {str(e)}", exc_info=True)
             raise DatabaseError(f"Không thể tạo kết nối mới: {str(e)}")
     
     def release_connection(self, conn):
-        """Trả kết nối về pool"""
+        """Giữ lại để tương thích: kết nối thuộc về luồng nên không đóng, chỉ hủy transaction dở dang"""
         try:
-            if conn in self.pool:
-                if conn.in_transaction:
-                    conn.rollback()
-                self.pool.remove(conn)
-                conn.close()
+            if conn.in_transaction and not getattr(self._local, 'depth', 0):
+                conn.rollback()
         except Exception as e:
             logger.error(f"Lỗi trả kết nối: {str(e)}", exc_info=True)
     
+    @staticmethod
+    def _is_read_query(query: str) -> bool:
+        return query.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH', 'EXPLAIN', 'VALUES') if query.strip() else True
+    
     def execute_query(self, query, params=None, use_cache=True):
-        """Thực thi một truy vấn với caching"""
-        try:
+        """Thực thi một truy vấn với caching; câu lệnh ghi chạy trong transaction của luồng ghi"""
+        start = time.perf_counter()
+        try:
+            if not self._is_read_query(query):
+                with self.transaction() as conn:
+                    cursor = conn.execute(query, params or ())
+                    result = cursor.fetchall()
+                    self._profile('execute_query', query, start, max(cursor.rowcount, 0), conn=conn, params=params)
+                    return result
+            
             # Tạo cache key
             cache_key = f"{query}:{str(params)}"
             
             # Kiểm tra cache
-            if use_cache and cache_key in self.cache:
-                cache_time, result = self.cache[cache_key]
-                if time.time() - cache_time < self.cache_timeout:
-                    return result
+            with self._cache_lock:
+                cached = self.cache.get(cache_key) if use_cache else None
+                generation = self._cache_generation
+            if cached is not None and time.time() - cached[0] < self.cache_timeout:
+                self._profile('execute_query', query, start, len(cached[1]), cache_hit=True)
+                return cached[1]
             
-            # Thực thi truy vấn
+            # Đọc không cần khóa: ở chế độ WAL, đọc không chặn ghi và ngược lại
             conn = self.get_connection()
-            try:
-                cursor = conn.execute(query, params or ())
-                result = cursor.fetchall()
-                
-                # Cập nhật cache
-                if use_cache:
-                    self.cache[cache_key] = (time.time(), result)
-                
-                return result
-            finally:
-                self.release_connection(conn)
+            result = conn.execute(query, params or ()).fetchall()
+            self._profile('execute_query', query, start, len(result), conn=conn, params=params)
+            
+            # Cập nhật cache, trừ khi đã có lần ghi xen vào trong lúc đọc
+            if use_cache:
+                with self._cache_lock:
+                    if generation == self._cache_generation:
+                        self.cache[cache_key] = (time.time(), result)
+            
+            return result
         except Exception as e:
             logger.error(f"Lỗi thực thi truy vấn: {str(e)}", exc_info=True)
             raise DatabaseError(f"Lỗi thực thi truy vấn: {str(e)}")
     
+    def run(self, name: str, params=None, many: bool = False):
+        """Chạy câu lệnh đã đăng ký theo tên; đọc trả về danh sách dòng (bản ghi nếu câu lệnh gắn bảng), ghi trả về cursor"""
+        statement = self.statements.get(name)
+        start = time.perf_counter()
+        try:
+            if statement.is_read:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                if statement.table is not None:
+                    cursor.row_factory = statement.table.row_factory
+                result = cursor.execute(statement.sql, params or ()).fetchall()
+                rows = len(result)
+            else:
+                with self.transaction() as conn:
+                    result = (conn.executemany if many else conn.execute)(statement.sql, params or ())
+                rows = max(result.rowcount, 0)
+        except Exception as e:
+            logger.error(f"Lỗi chạy câu lệnh {name}: {str(e)}")
+            raise DatabaseError(f"Lỗi chạy câu lệnh {name}: {str(e)}")
+        self.statements.record(name, time.perf_counter() - start, rows)
+        self._profile('run', statement.sql, start, rows, conn=conn, params=params[0] if many and params else params)
+        return result
+    
+    def enable_profiling(self, slow_query_ms: float = SLOW_QUERY_MS, trace: bool = False) -> QueryProfiler:
+        """Bật đo truy vấn; trace=True ghi thêm mọi câu lệnh SQLite qua set_trace_callback"""
+        profiler = QueryProfiler(slow_query_ms, trace, skip_files=(__file__,))
+        with self._connections_lock:
+            for conn in self._connections.values():
+                profiler.attach(conn)
+        self.profiler = profiler
+        return profiler
+    
+    def disable_profiling(self) -> Optional[QueryProfiler]:
+        """Tắt đo truy vấn, trả về profiler cũ để đọc kết quả"""
+        profiler, self.profiler = self.profiler, None
+        with self._connections_lock:
+            for conn in self._connections.values():
+                QueryProfiler.detach(conn)
+        return profiler
+    
+    def _profile(self, kind: str, sql: str, start: float, rows: int = 0, cache_hit: bool = False,
+                 conn: Optional[sqlite3.Connection] = None, params=None) -> None:
+        if self.profiler is not None:
+            self.profiler.record(kind, sql, time.perf_counter() - start, rows, cache_hit, conn, params)
+    
+    def get_statement_stats(self) -> List[Dict[str, Any]]:
+        """Số lần gọi, độ trễ và số dòng của từng câu lệnh có tên"""
+        return self.statements.get_stats()
+    
+    def iter_query(self, query, params=None, batch_size: int = 500, row_factory=None) -> Iterator[Any]:
+        """Đọc kết quả theo từng lô fetchmany thay vì fetchall (không qua cache truy vấn)"""
+        cursor = self.get_connection().cursor()
+        if row_factory is not None:
+            cursor.row_factory = row_factory
+        cursor.arraysize = batch_size
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                yield from rows
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi đọc truy vấn theo lô: {str(e)}", exc_info=True)
+            raise DatabaseError(f"Lỗi đọc truy vấn theo lô: {str(e)}")
+        finally:
+            cursor.close()
+    
+    def iter_records(self, table: Table, clause: str = '', params=None, batch_size: int = 500) -> Iterator[Record]:
+        """Đọc bản ghi của một bảng theo lô, giải mã các cột được mã hóa"""
+        codec = self._get_column_codec()
+        columns = codec.columns.get(table.name, ())
+        for record in self.iter_query(f"{table.select_sql} {clause}", params, batch_size, table.row_factory):
+            for column in columns:
+                setattr(record, column, codec.decrypt(table.name, column, getattr(record, column)))
+            yield record
+    
+    def fetch_arrays(self, query, params=None, dtype=None, batch_size: int = 5000, as_frame: bool = False):
+        """Đọc kết quả thành mảng NumPy có cấu trúc (hoặc DataFrame), chuyển đổi theo từng lô.
+
+        Mỗi lô tuple được chép vào mảng kết quả rồi bỏ đi, nên không giữ cùng lúc toàn bộ
+        danh sách tuple và mảng. dtype mặc định: object cho mọi cột.
+        """
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = None
+        try:
+            cursor.execute(query, params or ())
+            if dtype is None:
+                dtype = [(column[0], 'O') for column in cursor.description]
+            result = np.empty(batch_size, dtype=dtype)
+            size = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if size + len(rows) > len(result):
+                    result = np.resize(result, max(len(result) * 2, size + len(rows)))
+                result[size:size + len(rows)] = np.array(rows, dtype=dtype)
+                size += len(rows)
+            result = result[:size].copy()
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi đọc mảng từ truy vấn: {str(e)}", exc_info=True)
+            raise DatabaseError(f"Lỗi đọc mảng từ truy vấn: {str(e)}")
+        finally:
+            cursor.close()
+        if as_frame:
+            import pandas as pd
+            return pd.DataFrame(result)
+        return result
+    
     def execute_transaction(self, queries):
         """Thực thi nhiều truy vấn trong một transaction"""
-        conn = self.get_connection()
         try:
-            conn.execute("BEGIN TRANSACTION")
-            for query, params in queries:
-                conn.execute(query, params or ())
-            conn.commit()
+            with self.transaction() as conn:
+                for query, params in queries:
+                    start = time.perf_counter()
+                    cursor = conn.execute(query, params or ())
+                    self._profile('execute_transaction', query, start, max(cursor.rowcount, 0), conn=conn, params=params)
         except Exception as e:
-            conn.rollback()
             logger.error(f"Lỗi thực thi transaction: {str(e)}", exc_info=True)
             raise DatabaseError(f"Lỗi thực thi transaction: {str(e)}")
-        finally:
-            self.release_connection(conn)
     
     def clear_cache(self):
         """Xóa toàn bộ cache"""
-        self.cache.clear()
+        with self._cache_lock:
+            self._cache_generation += 1
+            self.cache.clear()
     
     def close(self):
-        """Đóng kết nối database an toàn"""
-        try:
-            if hasattr(self, 'conn') and self.conn:
-                self.conn.close()
-                logger.info("Đã đóng kết nối database")
+        """Đóng kết nối database an toàn; PRAGMA optimize trước khi đóng để cập nhật thống kê cho query planner"""
+        try:
+            with self._connections_lock:
+                self._closed = True
+                connections, self._connections = list(self._connections.values()), {}
+            for conn in connections:
+                try:
+                    conn.execute("PRAGMA optimize")
+                except sqlite3.Error as e:
+                    logger.warning(f"Không thể chạy PRAGMA optimize: {str(e)}")
+                conn.close()
+            self._local = threading.local()
+            logger.info("Đã đóng kết nối database")
         except Exception as e:
             logger.error(f"Lỗi khi đóng database: {e}")
             
@@ -391,37 +356,147 @@ class DatabaseManager:
         """Đóng tất cả kết nối (alias cho close)"""
         self.close()
 
+    def wal_size(self) -> int:
+        """Kích thước file -wal hiện tại (byte)"""
+        try:
+            return os.path.getsize(f"{self.db_path}-wal")
+        except OSError:
+            return 0
+
+    def checkpoint(self, mode: str = 'TRUNCATE') -> tuple:
+        """Chép WAL vào file database; trả về (busy, số trang log, số trang đã chép).
+
+        Không chạy được trong transaction nên giữ khóa ghi để các luồng khác không ghi xen vào.
+        """
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"Chế độ checkpoint không hợp lệ: {mode}")
+        with self._write_lock:
+            return tuple(self.get_connection().execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+    def vacuum(self, auto_vacuum: Optional[str] = None) -> None:
+        """VACUUM toàn bộ database, chặn mọi ghi trong lúc chạy; auto_vacuum đổi chế độ (có hiệu lực sau lần VACUUM này)"""
+        if auto_vacuum is not None and auto_vacuum not in ('NONE', 'FULL', 'INCREMENTAL'):
+            raise ValueError(f"Chế độ auto_vacuum không hợp lệ: {auto_vacuum}")
+        with self._write_lock:
+            conn = self.get_connection()
+            if auto_vacuum is not None:
+                conn.execute(f"PRAGMA auto_vacuum={auto_vacuum}")
+            conn.execute("VACUUM")
+
+    def take_changed_rows(self) -> int:
+        """Số dòng các transaction đã thay đổi kể từ lần gọi trước (đặt lại về 0)"""
+        with self._write_lock:
+            rows, self._changed_rows = self._changed_rows, 0
+            return rows
+
+    def log_maintenance(self, task: str, started_at: str, duration_ms: float, status: str,
+                        details: Optional[str] = None) -> None:
+        """Ghi kết quả một tác vụ bảo trì"""
+        try:
+            self.run('maintenance.insert', (task, started_at, duration_ms, status, details))
+        except Exception as e:
+            logger.error(f"Lỗi ghi log bảo trì: {str(e)}")
+            raise DatabaseError("Không thể ghi log bảo trì", "DB_LOG_ERROR", {"details": str(e)})
+
+    def get_maintenance_log(self, limit: int = 20) -> List[Record]:
+        """Các lần bảo trì gần nhất"""
+        try:
+            return self.run('maintenance.recent', (limit,))
+        except Exception as e:
+            logger.error(f"Lỗi lấy log bảo trì: {str(e)}")
+            return []
+
+    def _get_column_codec(self) -> EncryptedColumnCodec:
+        """Codec mã hóa cột, khóa được dẫn xuất từ khóa của SecurityManager"""
+        if self.column_codec is None:
+            with self._column_codec_lock:
+                if self.column_codec is None:
+                    self.column_codec = EncryptedColumnCodec.from_security_manager()
+                    self._encrypt_deferred_columns()
+        return self.column_codec
+
+    def _encrypt_deferred_columns(self) -> None:
+        """Mã hóa dữ liệu cũ mà migration v6 đã hoãn vì lúc đó chưa nạp được khóa"""
+        try:
+            rows = self.run('maintenance.last_status', (ENCRYPT_COLUMNS_TASK,))
+            if not rows or rows[0][0] != 'deferred':
+                return
+            started_at = datetime.now().isoformat()
+            start = time.perf_counter()
+            encrypted = self.encrypt_existing_columns()
+            self.log_maintenance(ENCRYPT_COLUMNS_TASK, started_at, (time.perf_counter() - start) * 1000, 'ok',
+                                 json.dumps(encrypted))
+        except Exception as e:
+            # Vẫn ở trạng thái 'deferred', lần khởi động sau thử lại
+            logger.error(f"Lỗi mã hóa dữ liệu cũ đã hoãn: {str(e)}")
+
+    def decode_rows(self, table: str, rows) -> List[Dict[str, Any]]:
+        """Chuyển các dòng thành dict, giải mã các cột được mã hóa của bảng"""
+        codec = self._get_column_codec()
+        if not codec.columns.get(table):
+            return [dict(row) for row in rows]
+        return [codec.decode_row(table, row) for row in rows]
+
+    @staticmethod
+    def _facts_text(facts: Any) -> Optional[str]:
+        if facts is None or isinstance(facts, str):
+            return facts
+        return json.dumps(facts, ensure_ascii=False)
+
+    def encrypt_existing_columns(self, batch_size: int = 500) -> Dict[str, int]:
+        """Mã hóa các giá trị còn lưu dạng rõ trong các cột nhạy cảm.
+
+        Migration v6 đã chạy việc này một lần khi nâng cấp; hàm để chạy lại thủ công
+        (ví dụ sau khi khôi phục bản sao lưu cũ).
+        """
+        try:
+            with self.transaction() as conn:
+                return self._get_column_codec().encrypt_plaintext(conn, batch_size)
+        except Exception as e:
+            logger.error(f"Lỗi mã hóa dữ liệu cũ: {str(e)}")
+            raise DatabaseError("Không thể mã hóa dữ liệu cũ", "DB_ENCRYPT_ERROR", {"details": str(e)})
+
+    def _decrypt_records(self, table: Table, records: List[Record]) -> List[Record]:
+        """Giải mã tại chỗ các cột được mã hóa của bản ghi"""
+        codec = self._get_column_codec()
+        columns = codec.columns.get(table.name, ())
+        for record in records:
+            for column in columns:
+                setattr(record, column, codec.decrypt(table.name, column, getattr(record, column)))
+        return records
+
     def add_reminder(self, title: str, description: str, due_date: str, priority: str = "medium") -> int:
         """Thêm reminder mới"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO reminders (title, description, due_date, created_at, priority)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (title, description, due_date, datetime.now().isoformat(), priority)
-                )
-                return cursor.lastrowid
+            cursor = self.run('reminders.insert', (
+                title, self._get_column_codec().encrypt('reminders', 'description', description),
+                due_date, datetime.now().isoformat(), priority
+            ))
+            return cursor.lastrowid
         except Exception as e:
             logger.error(f"Lỗi thêm reminder: {str(e)}")
             raise DatabaseError("Không thể thêm reminder", "DB_ADD_ERROR", {"details": str(e)})
 
-    def get_reminders(self, status: str = "pending") -> List[Dict[str, Any]]:
+    def add_reminders(self, reminders: List[Dict[str, Any]]) -> int:
+        """Thêm nhiều reminder trong một transaction, mã hóa mô tả theo lô"""
+        try:
+            now = datetime.now().isoformat()
+            descriptions = self._get_column_codec().encrypt_many(
+                'reminders', 'description', [reminder.get('description') for reminder in reminders]
+            )
+            self.run('reminders.insert', [
+                (reminder['title'], description, reminder['due_date'], now, reminder.get('priority', 'medium'))
+                for reminder, description in zip(reminders, descriptions)
+            ], many=True)
+            return len(reminders)
+        except Exception as e:
+            logger.error(f"Lỗi thêm nhiều reminder: {str(e)}")
+            raise DatabaseError("Không thể thêm reminder", "DB_ADD_ERROR", {"details": str(e)})
+
+    def get_reminders(self, status: str = "pending") -> List[Record]:
         """Lấy danh sách reminders"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT * FROM reminders 
-                    WHERE status = ? 
-                    ORDER BY due_date ASC
-                    """,
-                    (status,)
-                )
-                return [dict(row) for row in cursor.fetchall()]
+            return self._decrypt_records(REMINDERS, self.run('reminders.by_status', (status,)))
         except Exception as e:
             logger.error(f"Lỗi lấy reminders: {str(e)}")
             raise DatabaseError("Không thể lấy danh sách reminders", "DB_GET_ERROR", {"details": str(e)})
@@ -429,17 +504,7 @@ class DatabaseManager:
     def update_reminder_status(self, reminder_id: int, new_status: str) -> bool:
         """Cập nhật trạng thái reminder"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    UPDATE reminders 
-                    SET status = ? 
-                    WHERE id = ?
-                    """,
-                    (new_status, reminder_id)
-                )
-                return cursor.rowcount > 0
+            return self.run('reminders.update_status', (new_status, reminder_id)).rowcount > 0
         except Exception as e:
             logger.error(f"Lỗi cập nhật trạng thái reminder: {str(e)}")
             raise DatabaseError("Không thể cập nhật trạng thái reminder", "DB_UPDATE_ERROR", {"details": str(e)})
@@ -447,34 +512,16 @@ class DatabaseManager:
     def delete_reminder(self, reminder_id: int) -> bool:
         """Xóa reminder"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    DELETE FROM reminders 
-                    WHERE id = ?
-                    """,
-                    (reminder_id,)
-                )
-                return cursor.rowcount > 0
+            return self.run('reminders.delete', (reminder_id,)).rowcount > 0
         except Exception as e:
             logger.error(f"Lỗi xóa reminder: {str(e)}")
             raise DatabaseError("Không thể xóa reminder", "DB_DELETE_ERROR", {"details": str(e)})
 
-    def get_weather_data(self) -> Optional[Dict[str, Any]]:
+    def get_weather_data(self) -> Optional[Record]:
         """Lấy dữ liệu thời tiết mới nhất"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT * FROM weather_data 
-                    ORDER BY timestamp DESC 
-                    LIMIT 1
-                    """
-                )
-                row = cursor.fetchone()
-                return dict(row) if row else None
+            records = self.run('weather.latest')
+            return records[0] if records else None
         except Exception as e:
             logger.error(f"Lỗi lấy dữ liệu thời tiết: {str(e)}")
             raise DatabaseError("Không thể lấy dữ liệu thời tiết", "DB_GET_ERROR", {"details": str(e)})
@@ -482,62 +529,52 @@ class DatabaseManager:
     def save_weather_data(self, data: Dict[str, Any]) -> None:
         """Lưu dữ liệu thời tiết mới"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO weather_data 
-                    (temperature, feels_like, humidity, pressure, description, 
-                     icon, wind_speed, clouds, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        data.get("temperature"),
-                        data.get("feels_like"),
-                        data.get("humidity"),
-                        data.get("pressure"),
-                        data.get("description"),
-                        data.get("icon"),
-                        data.get("wind_speed"),
-                        data.get("clouds"),
-                        data.get("timestamp")
-                    )
-                )
+            self.run('weather.insert', (
+                data.get("city") or "Unknown",
+                data.get("temperature"),
+                data.get("feels_like"),
+                data.get("humidity"),
+                data.get("pressure"),
+                data.get("description"),
+                data.get("icon"),
+                data.get("wind_speed"),
+                data.get("clouds"),
+                data.get("timestamp") or datetime.now().isoformat()
+            ))
         except Exception as e:
             logger.error(f"Lỗi lưu dữ liệu thời tiết: {str(e)}")
             raise DatabaseError("Không thể lưu dữ liệu thời tiết", "DB_SAVE_ERROR", {"details": str(e)})
 
-    def log_user_interaction(self, action_type: str, facts: Optional[str] = None) -> None:
+    def log_user_interaction(self, action_type: str, facts: Optional[Any] = None) -> None:
         """Ghi log tương tác người dùng"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO user_interactions_log 
-                    (timestamp, action_type, facts)
-                    VALUES (?, ?, ?)
-                    """,
-                    (datetime.now().isoformat(), action_type, facts)
-                )
+            self.run('interactions.insert', (
+                datetime.now().isoformat(), action_type,
+                self._get_column_codec().encrypt('user_interactions_log', 'facts', self._facts_text(facts))
+            ))
         except Exception as e:
             logger.error(f"Lỗi ghi log tương tác: {str(e)}")
             raise DatabaseError("Không thể ghi log tương tác", "DB_LOG_ERROR", {"details": str(e)})
 
-    def get_recent_interactions(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def log_user_interactions(self, interactions: List[tuple]) -> int:
+        """Ghi nhiều tương tác (action_type, facts) trong một transaction, mã hóa facts theo lô"""
+        try:
+            now = datetime.now().isoformat()
+            facts = self._get_column_codec().encrypt_many(
+                'user_interactions_log', 'facts', [self._facts_text(item[1]) for item in interactions]
+            )
+            self.run('interactions.insert', [
+                (now, item[0], encrypted) for item, encrypted in zip(interactions, facts)
+            ], many=True)
+            return len(interactions)
+        except Exception as e:
+            logger.error(f"Lỗi ghi log nhiều tương tác: {str(e)}")
+            raise DatabaseError("Không thể ghi log tương tác", "DB_LOG_ERROR", {"details": str(e)})
+
+    def get_recent_interactions(self, limit: int = 10) -> List[Record]:
         """Lấy danh sách tương tác gần đây"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT * FROM user_interactions_log 
-                    ORDER BY timestamp DESC 
-                    LIMIT ?
-                    """,
-                    (limit,)
-                )
-                return [dict(row) for row in cursor.fetchall()]
+            return self._decrypt_records(USER_INTERACTIONS_LOG, self.run('interactions.recent', (limit,)))
         except Exception as e:
             logger.error(f"Lỗi lấy lịch sử tương tác: {str(e)}")
             raise DatabaseError("Không thể lấy lịch sử tương tác", "DB_GET_ERROR", {"details": str(e)})
@@ -545,20 +582,10 @@ class DatabaseManager:
     def get_cache(self, key: str) -> Optional[Any]:
         """Lấy dữ liệu từ cache"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT value, expires_at 
-                    FROM api_cache 
-                    WHERE key = ? AND expires_at > ?
-                    """,
-                    (key, datetime.now().isoformat())
-                )
-                row = cursor.fetchone()
-                if row:
-                    return json.loads(row["value"])
-                return None
+            rows = self.run('cache.get', (key, datetime.now().isoformat()))
+            if rows:
+                return json.loads(rows[0]["response"])
+            return None
         except Exception as e:
             logger.error(f"Lỗi lấy cache: {str(e)}")
             raise DatabaseError("Không thể lấy dữ liệu từ cache", "DB_CACHE_ERROR", {"details": str(e)})
@@ -567,16 +594,9 @@ class DatabaseManager:
         """Lưu dữ liệu vào cache"""
         try:
             expires_at = datetime.now() + timedelta(seconds=expires_in)
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO api_cache 
-                    (key, value, expires_at, created_at)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (key, json.dumps(value), expires_at.isoformat(), datetime.now().isoformat())
-                )
+            with self.transaction():
+                self.run('cache.delete', (key,))
+                self.run('cache.insert', (key, json.dumps(value), expires_at.isoformat(), datetime.now().isoformat()))
         except Exception as e:
             logger.error(f"Lỗi lưu cache: {str(e)}")
             raise DatabaseError("Không thể lưu dữ liệu vào cache", "DB_CACHE_ERROR", {"details": str(e)})
@@ -584,15 +604,7 @@ class DatabaseManager:
     def clear_expired_cache(self) -> None:
         """Xóa cache hết hạn"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    DELETE FROM api_cache 
-                    WHERE expires_at <= ?
-                    """,
-                    (datetime.now().isoformat(),)
-                )
+            self.run('cache.clear_expired', (datetime.now().isoformat(),))
         except Exception as e:
             logger.error(f"Lỗi xóa cache hết hạn: {str(e)}")
             raise DatabaseError("Không thể xóa cache hết hạn", "DB_CACHE_ERROR", {"details": str(e)})
@@ -600,76 +612,73 @@ class DatabaseManager:
     def log_app_launch(self) -> None:
         """Ghi log thời gian khởi chạy ứng dụng"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO app_launches (launch_time)
-                    VALUES (?)
-                    """,
-                    (datetime.now().isoformat(),)
-                )
+            self.run('launches.insert', (datetime.now().isoformat(),))
         except Exception as e:
             logger.error(f"Lỗi ghi log khởi chạy: {str(e)}")
             raise DatabaseError("Không thể ghi log khởi chạy", "DB_LOG_ERROR", {"details": str(e)})
 
-    def get_launch_history(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_launch_history(self, limit: int = 10) -> List[Record]:
         """Lấy lịch sử khởi chạy ứng dụng"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT * FROM app_launches 
-                    ORDER BY launch_time DESC 
-                    LIMIT ?
-                    """,
-                    (limit,)
-                )
-                return [dict(row) for row in cursor.fetchall()]
+            return self.run('launches.recent', (limit,))
         except Exception as e:
             logger.error(f"Lỗi lấy lịch sử khởi chạy: {str(e)}")
             raise DatabaseError("Không thể lấy lịch sử khởi chạy", "DB_GET_ERROR", {"details": str(e)})
 
-    def get_schedule_for_day(self, day_of_week: str):
+    def get_schedule_for_day(self, day_of_week: str) -> List[Record]:
         """Lấy lịch trình cho một ngày trong tuần (ví dụ: 'Monday', 'Tuesday', ...)."""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM schedule WHERE day_of_week = ? ORDER BY start_time
-                ''', (day_of_week,))
-                return [dict(row) for row in cursor.fetchall()]
+            return self.run('schedule.by_day', (day_of_week,))
         except Exception as e:
             logger.error(f"Lỗi lấy lịch trình cho ngày {day_of_week}: {str(e)}")
             return []
 
-    def get_recent_applications(self, limit: int = 5) -> List[Dict[str, Any]]:
+    def get_recent_applications(self, limit: int = 5) -> List[Record]:
         """Lấy danh sách ứng dụng gần đây"""
         try:
-            with self.transaction() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM app_launches 
-                    ORDER BY launch_time DESC 
-                    LIMIT ?
-                ''', (limit,))
-                return [dict(row) for row in cursor.fetchall()]
+            return self.run('launches.recent', (limit,))
         except Exception as e:
             logger.error(f"Lỗi lấy danh sách ứng dụng gần đây: {str(e)}")
             return []
 
+    @contextmanager
+    def read(self):
+        """Kết nối đọc của luồng hiện tại; không giữ khóa vì WAL cho phép đọc song song với ghi"""
+        yield self.get_connection()
+
     @contextmanager
     def transaction(self):
-        """Context manager để thực hiện các thao tác database trong một giao dịch nguyên tử."""
+        """Context manager để thực hiện các thao tác database trong một giao dịch nguyên tử.
+
+        Chỉ một luồng ghi tại một thời điểm (khóa ghi + BEGIN IMMEDIATE); gọi lồng nhau
+        trong cùng luồng dùng chung transaction ngoài cùng.
+        """
         conn = self.get_connection()
-        try:
-            conn.autocommit = False # Bắt đầu transaction
-            yield conn
-            conn.commit()
-        except Exception as e:
-            logger.error(f"Transaction error: {str(e)}")
-            conn.rollback()
-            raise
-        finally:
-            self.release_connection(conn)
\ No newline at end of file
+        with self._write_lock:
+            if self._local.depth:
+                self._local.depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._local.depth -= 1
+                return
+            start = time.perf_counter()
+            changes = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.depth = 1
+            try:
+                yield conn
+                conn.commit()
+            except BaseException as e:
+                # Cả CancelledError/KeyboardInterrupt: không để kết nối kẹt trong transaction dở dang
+                logger.error(f"Transaction error: {str(e)}")
+                conn.rollback()
+                raise
+            finally:
+                self._local.depth = 0
+            changes = conn.total_changes - changes
+            self._changed_rows += changes
+            self.last_write_at = time.monotonic()
+            self._profile('transaction', 'TRANSACTION', start, changes)
+            # Dữ liệu đã thay đổi: bỏ các kết quả đọc đã cache
+            self.clear_cache()
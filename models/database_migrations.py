@@ -0,0 +1,230 @@
+import logging
+import sqlite3
+from datetime import datetime
+
+from models.column_codec import EncryptedColumnCodec, find_plaintext_columns
+from models.migrations import Migration
+from models.tables import API_CACHE, APP_LAUNCHES, MAINTENANCE_LOG, REMINDERS, USER_INTERACTIONS_LOG, WEATHER_DATA
+
+logger = logging.getLogger(__name__)
+
+# Tác vụ trong maintenance_log đánh dấu việc mã hóa dữ liệu cũ bị hoãn (status 'deferred') hoặc đã xong
+ENCRYPT_COLUMNS_TASK = 'encrypt_columns'
+
+# Cột mà các phiên bản cũ của ứng dụng có thể còn thiếu trong database đã tạo trước đó
+LEGACY_EXPECTED_COLUMNS = {
+    'weather_data': {
+        'city': 'TEXT DEFAULT "Unknown"',
+        'temperature': 'REAL',
+        'description': 'TEXT',
+        'humidity': 'INTEGER',
+        'wind_speed': 'REAL',
+        'pressure': 'REAL',
+        'visibility': 'INTEGER',
+        'dew_point': 'REAL',
+        'feels_like': 'REAL',
+        'temp_min': 'REAL',
+        'temp_max': 'REAL',
+        'timestamp': 'TEXT DEFAULT CURRENT_TIMESTAMP'
+    },
+    'api_cache': {
+        'endpoint': 'TEXT NOT NULL',
+        'response': 'TEXT NOT NULL',
+        'timestamp': 'TEXT DEFAULT CURRENT_TIMESTAMP'
+    },
+    'user_interactions_log': {
+        'interaction_type': 'TEXT NOT NULL',
+        'details': 'TEXT',
+        'timestamp': 'TEXT DEFAULT CURRENT_TIMESTAMP'
+    }
+}
+
+def _add_legacy_columns(conn: sqlite3.Connection) -> None:
+    """Thêm các cột còn thiếu vào bảng được tạo bởi phiên bản cũ (chỉ chạy một lần)"""
+    for table_name, expected_columns in LEGACY_EXPECTED_COLUMNS.items():
+        existing_columns = {column[1] for column in conn.execute(f"PRAGMA table_info({table_name})").fetchall()}
+        for column_name, column_def in expected_columns.items():
+            if column_name in existing_columns:
+                continue
+            logger.info(f"Cập nhật schema bảng {table_name}: thêm cột {column_name}")
+            try:
+                conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_def}")
+            except sqlite3.OperationalError as e:
+                # ADD COLUMN không hỗ trợ NOT NULL không có default: bỏ qua như trước đây
+                logger.warning(f"Không thể thêm cột {column_name} vào bảng {table_name}: {str(e)}")
+
+def _encrypt_plaintext_columns(conn: sqlite3.Connection) -> None:
+    """Mã hóa các giá trị nhạy cảm ghi trước khi có mã hóa cột (chỉ nạp khóa khi thực sự có dữ liệu cũ).
+
+    Không nạp được khóa thì không chặn việc mở database: ghi nhận vào maintenance_log để
+    DatabaseManager mã hóa ở lần đầu dùng codec.
+    """
+    if not find_plaintext_columns(conn):
+        return
+    try:
+        codec = EncryptedColumnCodec.from_security_manager()
+    except Exception as e:
+        logger.warning(f"Chưa nạp được khóa mã hóa cột, hoãn mã hóa dữ liệu cũ: {str(e)}")
+        conn.execute(MAINTENANCE_LOG.insert_sql('task', 'started_at', 'status', 'details'),
+                     (ENCRYPT_COLUMNS_TASK, datetime.now().isoformat(), 'deferred', str(e)))
+        return
+    encrypted = codec.encrypt_plaintext(conn)
+    logger.info(f"Đã mã hóa dữ liệu cũ: {encrypted}")
+
+MIGRATIONS = [
+    Migration(1, "Tạo các bảng cơ bản", [
+        '''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            due_date TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS weather_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            city TEXT NOT NULL,
+            temperature REAL,
+            description TEXT,
+            humidity INTEGER,
+            wind_speed REAL,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_interactions_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interaction_type TEXT NOT NULL,
+            details TEXT,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS api_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            endpoint TEXT NOT NULL,
+            response TEXT NOT NULL,
+            timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS app_launches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            launch_time TEXT DEFAULT CURRENT_TIMESTAMP,
+            version TEXT,
+            status TEXT DEFAULT 'success'
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day_of_week TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            location TEXT
+        )
+        ''',
+        _add_legacy_columns
+    ]),
+    Migration(2, "Index cho reminders, weather_data và api_cache", [
+        "CREATE INDEX IF NOT EXISTS idx_reminders_due_date ON reminders(due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_status ON reminders(status)",
+        "CREATE INDEX IF NOT EXISTS idx_weather_city ON weather_data(city)",
+        "CREATE INDEX IF NOT EXISTS idx_weather_timestamp ON weather_data(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_api_cache_endpoint ON api_cache(endpoint)",
+        "CREATE INDEX IF NOT EXISTS idx_api_cache_timestamp ON api_cache(timestamp)"
+    ]),
+    Migration(3, "Bảng theo dõi cập nhật của UpdateOptimizerService", [
+        '''
+        CREATE TABLE IF NOT EXISTS update_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            service_type TEXT NOT NULL,
+            update_time TEXT NOT NULL,
+            data_changed BOOLEAN NOT NULL,
+            user_interaction BOOLEAN NOT NULL,
+            response_time REAL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS optimal_update_intervals (
+            service_type TEXT PRIMARY KEY,
+            interval INTEGER NOT NULL,
+            last_updated TEXT NOT NULL,
+            confidence REAL DEFAULT 0.0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS update_interval_models (
+            service_type TEXT PRIMARY KEY,
+            last_update REAL,
+            ewma_gap REAL,
+            gap_variance REAL DEFAULT 0.0,
+            change_rate REAL DEFAULT 0.0,
+            interaction_rate REAL DEFAULT 0.0,
+            response_time REAL DEFAULT 0.0,
+            samples INTEGER DEFAULT 0,
+            checkpoint_time TEXT NOT NULL
+        )
+        '''
+    ]),
+    Migration(4, "Đồng bộ reminders, weather_data, user_interactions_log, api_cache với models/tables.py", [
+        REMINDERS.rebuild,
+        WEATHER_DATA.rebuild,
+        lambda conn: USER_INTERACTIONS_LOG.rebuild(conn, renames={
+            'action_type': ('interaction_type',),
+            'facts': ('details',)
+        }),
+        API_CACHE.rebuild
+    ]),
+    Migration(5, "Bảng ghi kết quả bảo trì database của MaintenanceService", [
+        MAINTENANCE_LOG.create_sql(),
+        *MAINTENANCE_LOG.index_sql()
+    ]),
+    Migration(6, "Mã hóa các giá trị cũ còn lưu dạng rõ trong cột nhạy cảm", [
+        _encrypt_plaintext_columns
+    ]),
+    Migration(7, "Bảng rollup, watermark và index theo thời gian của RetentionService", [
+        '''
+        CREATE TABLE IF NOT EXISTS retention_watermarks (
+            table_name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+        ''',
+        *[f'''
+        CREATE TABLE IF NOT EXISTS update_history_{period} (
+            service_type TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            updates REAL NOT NULL DEFAULT 0,
+            changes REAL NOT NULL DEFAULT 0,
+            interactions REAL NOT NULL DEFAULT 0,
+            total_response_time REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (service_type, bucket)
+        )
+        ''' for period in ('hourly', 'daily')],
+        *[f'''
+        CREATE TABLE IF NOT EXISTS user_interactions_{period} (
+            action_type TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            interactions REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (action_type, bucket)
+        )
+        ''' for period in ('hourly', 'daily')],
+        '''
+        CREATE TABLE IF NOT EXISTS app_launches_daily (
+            status TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            launches REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, bucket)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_update_history_service_time ON update_history(service_type, update_time)",
+        *APP_LAUNCHES.index_sql()
+    ])
+]
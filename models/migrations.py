@@ -0,0 +1,88 @@
+import logging
+import sqlite3
+from typing import Callable, List, NamedTuple, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: Sequence[MigrationStep]
+
+class SchemaMigrator:
+    """Áp dụng các migration theo số phiên bản, tất cả trong một transaction.
+
+    Không có component: phiên bản lưu trong PRAGMA user_version của file database.
+    Có component: phiên bản lưu trong bảng schema_versions, để nhiều thành phần
+    dùng chung một file mà không ghi đè phiên bản của nhau.
+    """
+
+    def __init__(self, migrations: List[Migration], component: Optional[str] = None):
+        versions = [migration.version for migration in migrations]
+        if versions != sorted(set(versions)):
+            raise ValueError("Các migration phải có version tăng dần và không trùng")
+        self.migrations = migrations
+        self.component = component
+
+    @property
+    def latest_version(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self, conn: sqlite3.Connection) -> int:
+        """Phiên bản schema hiện tại"""
+        if self.component is None:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_versions'"
+        ).fetchone()
+        if not exists:
+            return 0
+        row = conn.execute("SELECT version FROM schema_versions WHERE component = ?", (self.component,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_version(self, conn: sqlite3.Connection, version: int) -> None:
+        if self.component is None:
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_versions (
+                component TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        conn.execute("INSERT OR REPLACE INTO schema_versions (component, version) VALUES (?, ?)",
+                     (self.component, version))
+
+    def migrate(self, conn: sqlite3.Connection) -> int:
+        """Chạy các migration còn thiếu; trả về phiên bản sau khi chạy"""
+        current = self.current_version(conn)
+        pending = [migration for migration in self.migrations if migration.version > current]
+        if not pending:
+            return current
+
+        isolation_level = conn.isolation_level
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Kiểm tra lại sau khi giữ khóa ghi, phòng khi tiến trình khác vừa migrate
+            current = self.current_version(conn)
+            for migration in self.migrations:
+                if migration.version <= current:
+                    continue
+                logger.info(f"Migration {self.component or 'database'} v{migration.version}: {migration.description}")
+                for step in migration.steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                current = migration.version
+            self._set_version(conn, current)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.isolation_level = isolation_level
+        return current
@@ -0,0 +1,173 @@
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ngưỡng mặc định để coi một truy vấn là chậm (ms)
+SLOW_QUERY_MS = 100
+# Số truy vấn chậm và số câu lệnh trace được giữ lại gần nhất
+MAX_SLOW_QUERIES = 200
+MAX_TRACE_STATEMENTS = 2000
+# Số nơi gọi hiển thị cho mỗi truy vấn trong bản tóm tắt
+TOP_CALLERS = 3
+
+class QueryProfiler:
+    """Đo thời gian, số dòng, số lần trúng cache và nơi gọi của từng truy vấn (bật khi cần).
+
+    Truy vấn chậm hơn ngưỡng được ghi log kèm EXPLAIN QUERY PLAN. Chế độ trace dùng
+    sqlite3 set_trace_callback để ghi lại mọi câu lệnh SQLite thực sự chạy, kể cả các
+    câu lệnh không đi qua DatabaseManager.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, trace: bool = False,
+                 skip_files: Iterable[str] = ()):
+        self.slow_query_ms = slow_query_ms
+        self.trace_enabled = trace
+        # Các file bỏ qua khi tìm nơi gọi (chính DatabaseManager, contextlib...)
+        self._skip_files = {os.path.abspath(path) for path in (__file__, contextlib.__file__, *skip_files)}
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, Dict[str, Any]] = {}
+        self._slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+        self._trace = deque(maxlen=MAX_TRACE_STATEMENTS)
+
+    @staticmethod
+    def normalize(sql: str) -> str:
+        return ' '.join(sql.split())
+
+    def caller(self) -> str:
+        """Nơi gọi đầu tiên nằm ngoài các file bị bỏ qua, dạng file:dòng hàm"""
+        frame = sys._getframe(1)
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename not in self._skip_files:
+                return f"{os.path.relpath(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+            frame = frame.f_back
+        return 'unknown'
+
+    def record(self, kind: str, sql: str, elapsed: float, rows: int = 0, cache_hit: bool = False,
+               conn: Optional[sqlite3.Connection] = None, params=None) -> None:
+        """Ghi lại một lần chạy; nếu chậm và có kết nối thì lấy thêm EXPLAIN QUERY PLAN"""
+        sql = self.normalize(sql)
+        caller = self.caller()
+        with self._lock:
+            entry = self._stats.get((kind, sql))
+            if entry is None:
+                entry = self._stats[(kind, sql)] = {
+                    'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0, 'cache_hits': 0, 'callers': Counter()
+                }
+            entry['calls'] += 1
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+            entry['rows'] += rows
+            entry['cache_hits'] += int(cache_hit)
+            entry['callers'][caller] += 1
+        if cache_hit or elapsed * 1000 < self.slow_query_ms:
+            return
+        plan = self.explain(conn, sql, params) if conn is not None else []
+        logger.warning(
+            f"Truy vấn chậm ({elapsed * 1000:.1f} ms, {rows} dòng) tại {caller}: {sql}"
+            + ''.join(f"\n    {line}" for line in plan)
+        )
+        with self._lock:
+            self._slow_queries.append({
+                'at': datetime.now().isoformat(),
+                'kind': kind,
+                'sql': sql,
+                'elapsed_ms': elapsed * 1000,
+                'rows': rows,
+                'caller': caller,
+                'plan': plan
+            })
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, sql: str, params=None) -> List[str]:
+        """Các dòng EXPLAIN QUERY PLAN của một câu lệnh (rỗng nếu không lấy được)"""
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            logger.debug(f"Không lấy được query plan: {str(e)}")
+            return []
+
+    def trace(self, statement: str) -> None:
+        """Callback cho sqlite3 set_trace_callback"""
+        with self._lock:
+            self._trace.append((time.time(), threading.current_thread().name, statement))
+
+    def attach(self, conn: sqlite3.Connection) -> None:
+        if self.trace_enabled:
+            conn.set_trace_callback(self.trace)
+
+    @staticmethod
+    def detach(conn: sqlite3.Connection) -> None:
+        conn.set_trace_callback(None)
+
+    def get_summary(self, limit: Optional[int] = None, sort_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """Thống kê theo từng câu lệnh, sắp giảm dần theo sort_by (total_ms, avg_ms, max_ms, calls, rows)"""
+        with self._lock:
+            items = [(key, dict(entry, callers=entry['callers'].most_common(TOP_CALLERS)))
+                     for key, entry in self._stats.items()]
+        summary = [
+            {
+                'kind': kind,
+                'sql': sql,
+                'calls': entry['calls'],
+                'total_ms': entry['total'] * 1000,
+                'avg_ms': entry['total'] * 1000 / entry['calls'],
+                'max_ms': entry['max'] * 1000,
+                'rows': entry['rows'],
+                'cache_hits': entry['cache_hits'],
+                'callers': [{'site': site, 'calls': calls} for site, calls in entry['callers']]
+            }
+            for (kind, sql), entry in items
+        ]
+        summary.sort(key=lambda item: item[sort_by], reverse=True)
+        return summary[:limit] if limit else summary
+
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._slow_queries)
+
+    def get_trace(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {'at': datetime.fromtimestamp(at).isoformat(), 'thread': thread, 'sql': statement}
+                for at, thread, statement in self._trace
+            ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'slow_query_ms': self.slow_query_ms,
+            'queries': self.get_summary(),
+            'slow_queries': self.get_slow_queries(),
+            'trace': self.get_trace()
+        }
+
+    def dump(self, path: str) -> None:
+        """Ghi snapshot ra file JSON (ghi file tạm rồi thay thế)"""
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"Lỗi ghi profile truy vấn: {str(e)}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._slow_queries.clear()
+            self._trace.clear()
@@ -1,9 +1,262 @@
 import pandas as pd
 import os
 import logging
+import bisect
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Thời khóa biểu mặc định, trước đây được dựng lại trong get_schedule mỗi lần gọi
+TIME_SLOTS = ['06:00 – 08:00', '08:30 – 10:30', '14:00 – 16:00', '16:30 – 18:00', '20:00 – 22:00']
+
+TIMETABLE = {
+    'Thứ Hai': [
+        'Lập trình hướng đối\ntượng',
+        'Trí tuệ nhân tạo',
+        'Nguyên lý Hệ điều\nhành',
+        'Tư tưởng HCM',
+        'Gym (tối)'
+    ],
+    'Thứ Ba': [
+        'Trí tuệ nhân tạo',
+        'Nguyên lý Hệ ĐH',
+        'Tư tưởng HCM',
+        'Tiếng Anh 1',
+        'Gym (tối)'
+    ],
+    'Thứ Tư': [
+        'Nguyên lý Hệ điều\nhành',
+        'Tư tưởng HCM',
+        'Tiếng Anh 1',
+        'Lập trình HĐTD',
+        'Gym (tối)'
+    ],
+    'Thứ Năm': [
+        'Tư tưởng HCM',
+        'Tiếng Anh 1',
+        'Lập trình HĐTD',
+        'Trí tuệ nhân tạo',
+        'Gym (tối)'
+    ],
+    'Thứ Sáu': [
+        'Tiếng Anh 1',
+        'Lập trình HĐTD',
+        'Trí tuệ nhân tạo',
+        'Nguyên lý HĐH',
+        'Gym (tối)'
+    ],
+    'Thứ Bảy': [
+        '(Đang đi làm)',
+        '(Đang đi làm)',
+        '(Đang đi làm đến\n17:00)',
+        '17:00 – 18:30:\nGym\n18:30 – 20:00:\nĂn tối/ nghỉ',
+        '20:00 – 22:00: Dự án\nnhỏ hàng tuần'
+    ],
+    'Chủ Nhật': [
+        'Ôn tập nhanh tất cả\nmôn (2h)',
+        'Hoàn thiện dự án\nnhỏ hàng tuần (2h)',
+        'Buffer & ôn chuyên\nsâu (2h)',
+        'Nghỉ/nghỉ linh hoạt',
+        '20:00 – 21:30: Gym\n(tùy chọn)'
+    ]
+}
+
+# Tên ngày chấp nhận được (tiếng Việt, viết tắt, tiếng Anh) -> weekday() (Thứ Hai = 0)
+DAY_ALIASES = {}
+for _index, _names in enumerate([
+    ('thứ hai', 'thứ 2', 't2', 'monday', 'mon'),
+    ('thứ ba', 'thứ 3', 't3', 'tuesday', 'tue'),
+    ('thứ tư', 'thứ 4', 't4', 'wednesday', 'wed'),
+    ('thứ năm', 'thứ 5', 't5', 'thursday', 'thu'),
+    ('thứ sáu', 'thứ 6', 't6', 'friday', 'fri'),
+    ('thứ bảy', 'thứ 7', 't7', 'saturday', 'sat'),
+    ('chủ nhật', 'cn', 'sunday', 'sun'),
+]):
+    for _name in _names:
+        DAY_ALIASES[_name] = _index
+
+# Từ khóa để gắn nhãn hoạt động, được tính sẵn một lần cho mỗi ô lịch
+ACTIVITY_KEYWORDS = {
+    'gym': ('gym', 'tập'),
+    'work': ('đi làm',),
+    'project': ('dự án',),
+    'review': ('ôn tập', 'ôn chuyên', 'buffer'),
+    'rest': ('nghỉ',),
+}
+
+# Cụm từ bị bỏ qua khi so khớp từ khóa của một nhãn ('ôn tập', 'tập trung' không phải tập gym)
+ACTIVITY_EXCLUSIONS = {
+    'gym': ('ôn tập', 'tập trung'),
+}
+
+
+def parse_day(day) -> Optional[int]:
+    """Chuyển tên ngày (hoặc số weekday) thành weekday(), None nếu không nhận ra"""
+    if isinstance(day, int):
+        return day if 0 <= day <= 6 else None
+    return DAY_ALIASES.get(str(day).strip().lower())
+
+
+def parse_time_range(time_slot: str) -> Optional[Tuple[int, int]]:
+    """Tách '06:00 – 08:00' thành (phút bắt đầu, phút kết thúc) tính từ 0h"""
+    normalized = str(time_slot).replace('–', '-').replace('—', '-')
+    parts = normalized.split('-')
+    if len(parts) != 2:
+        return None
+    try:
+        start_h, start_m = parts[0].strip().split(':')
+        end_h, end_m = parts[1].strip().split(':')
+        return int(start_h) * 60 + int(start_m), int(end_h) * 60 + int(end_m)
+    except ValueError:
+        return None
+
+
+def extract_tags(subject: str) -> FrozenSet[str]:
+    """Gắn nhãn hoạt động cho một ô lịch dựa trên ACTIVITY_KEYWORDS"""
+    text = str(subject).lower()
+    tags = set()
+    for tag, keywords in ACTIVITY_KEYWORDS.items():
+        tag_text = text
+        for phrase in ACTIVITY_EXCLUSIONS.get(tag, ()):
+            tag_text = tag_text.replace(phrase, ' ')
+        if any(keyword in tag_text for keyword in keywords):
+            tags.add(tag)
+    return frozenset(tags)
+
+
+class ScheduleSlot(NamedTuple):
+    day: int
+    start: int
+    end: int
+    subject: str
+    tags: FrozenSet[str]
+
+
+class ScheduleStore:
+    """Lịch trình theo ngày với index khoảng thời gian (mảng start/end đã sắp xếp, tra bằng bisect)"""
+
+    def __init__(self, slots: Iterable[ScheduleSlot] = ()):
+        by_day: Dict[int, List[ScheduleSlot]] = {day: [] for day in range(7)}
+        for slot in slots:
+            by_day[slot.day].append(slot)
+
+        self._slots: Dict[int, List[ScheduleSlot]] = {}
+        self._starts: Dict[int, List[int]] = {}
+        self._ends: Dict[int, List[int]] = {}
+        self._tags: Dict[int, FrozenSet[str]] = {}
+        for day, day_slots in by_day.items():
+            day_slots.sort(key=lambda s: (s.start, s.end))
+            self._slots[day] = day_slots
+            self._starts[day] = [s.start for s in day_slots]
+            self._ends[day] = [s.end for s in day_slots]
+            self._tags[day] = frozenset().union(*(s.tags for s in day_slots))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable) -> 'ScheduleStore':
+        """Tạo store từ các dòng (day_of_week, start_time, end_time, subject) như bảng schedule"""
+        slots = []
+        for row in rows:
+            day = parse_day(row['day_of_week'])
+            time_range = parse_time_range(f"{row['start_time']}-{row['end_time']}")
+            subject = row['subject']
+            if day is None or time_range is None or not subject or str(subject) == 'nan':
+                continue
+            slots.append(ScheduleSlot(day, time_range[0], time_range[1], str(subject), extract_tags(subject)))
+        return cls(slots)
+
+    @classmethod
+    def from_timetable(cls, time_slots: List[str], timetable: Dict[str, List[str]]) -> 'ScheduleStore':
+        """Tạo store từ bảng dạng cột 'Thời gian' + một cột cho mỗi ngày"""
+        slots = []
+        for day_name, subjects in timetable.items():
+            day = parse_day(day_name)
+            if day is None:
+                continue
+            for time_slot, subject in zip(time_slots, subjects):
+                time_range = parse_time_range(time_slot)
+                if time_range is None or not subject or str(subject) == 'nan':
+                    continue
+                slots.append(ScheduleSlot(day, time_range[0], time_range[1], str(subject), extract_tags(subject)))
+        return cls(slots)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'ScheduleStore':
+        """Tạo store từ DataFrame thời khóa biểu (ví dụ file Excel được import)"""
+        return cls.from_timetable(
+            list(df['Thời gian']),
+            {column: list(df[column]) for column in df.columns[1:]}
+        )
+
+    def slots_for_day(self, day) -> List[ScheduleSlot]:
+        """Danh sách ô lịch của một ngày, đã sắp xếp theo giờ bắt đầu"""
+        day = parse_day(day)
+        return list(self._slots.get(day, ())) if day is not None else []
+
+    def count_for_day(self, day) -> int:
+        day = parse_day(day)
+        return len(self._slots.get(day, ())) if day is not None else 0
+
+    def has_activity(self, tag: str, day) -> bool:
+        """Ngày đó có hoạt động mang nhãn tag hay không"""
+        day = parse_day(day)
+        return day is not None and tag in self._tags[day]
+
+    def current_activity(self, now: Optional[datetime] = None) -> Optional[ScheduleSlot]:
+        """Hoạt động đang diễn ra tại thời điểm now"""
+        now = now or datetime.now()
+        day = now.weekday()
+        minute = now.hour * 60 + now.minute
+        index = bisect.bisect_right(self._starts[day], minute) - 1
+        if index >= 0 and minute < self._ends[day][index]:
+            return self._slots[day][index]
+        return None
+
+    def next_activity(self, now: Optional[datetime] = None) -> Optional[ScheduleSlot]:
+        """Hoạt động kế tiếp bắt đầu sau now (tìm sang các ngày sau nếu hôm nay đã hết)"""
+        now = now or datetime.now()
+        day = now.weekday()
+        minute = now.hour * 60 + now.minute
+        index = bisect.bisect_right(self._starts[day], minute)
+        if index < len(self._slots[day]):
+            return self._slots[day][index]
+        for offset in range(1, 8):
+            next_day = (day + offset) % 7
+            if self._slots[next_day]:
+                return self._slots[next_day][0]
+        return None
+
+
+# Store mặc định được dựng một lần khi import module
+_schedule_store = ScheduleStore.from_timetable(TIME_SLOTS, TIMETABLE)
+_timetable_frame = None
+
+
+def get_schedule_store() -> ScheduleStore:
+    """Lấy store lịch trình đang dùng chung"""
+    return _schedule_store
+
+
+def set_schedule_store(store: ScheduleStore) -> None:
+    """Thay store lịch trình dùng chung (ví dụ sau khi import file Excel)"""
+    global _schedule_store
+    _schedule_store = store
+    logger.info(f"Đã cập nhật lịch trình: {sum(store.count_for_day(d) for d in range(7))} ô lịch")
+
+
+def load_schedule_store(db) -> ScheduleStore:
+    """Nạp lịch trình từ bảng schedule nếu đã có dữ liệu import, ngược lại giữ store mặc định"""
+    try:
+        rows = db.execute_query(
+            "SELECT day_of_week, start_time, end_time, subject FROM schedule",
+            use_cache=False
+        )
+        if rows:
+            set_schedule_store(ScheduleStore.from_rows(rows))
+    except Exception as e:
+        logger.error(f"Không thể nạp lịch trình từ database: {str(e)}")
+    return _schedule_store
+
 class Schedule:
     def __init__(self):
         self.excel_dir = os.path.join('data', 'excel')
@@ -37,61 +290,10 @@ class Schedule:
 
     def get_schedule(self) -> pd.DataFrame:
         """Trả về dữ liệu thời khóa biểu đã hardcode để hiển thị UI."""
-        # Dữ liệu thời khóa biểu đã hardcode dựa trên hình ảnh bạn cung cấp
-        data = {
-            'Thời gian': ['06:00 – 08:00', '08:30 – 10:30', '14:00 – 16:00', '16:30 – 18:00', '20:00 – 22:00'],
-            'Thứ Hai': [
-                'Lập trình hướng đối\ntượng',
-                'Trí tuệ nhân tạo',
-                'Nguyên lý Hệ điều\nhành',
-                'Tư tưởng HCM',
-                'Gym (tối)'
-            ],
-            'Thứ Ba': [
-                'Trí tuệ nhân tạo',
-                'Nguyên lý Hệ ĐH',
-                'Tư tưởng HCM',
-                'Tiếng Anh 1',
-                'Gym (tối)'
-            ],
-            'Thứ Tư': [
-                'Nguyên lý Hệ điều\nhành',
-                'Tư tưởng HCM',
-                'Tiếng Anh 1',
-                'Lập trình HĐTD',
-                'Gym (tối)'
-            ],
-            'Thứ Năm': [
-                'Tư tưởng HCM',
-                'Tiếng Anh 1',
-                'Lập trình HĐTD',
-                'Trí tuệ nhân tạo',
-                'Gym (tối)'
-            ],
-            'Thứ Sáu': [
-                'Tiếng Anh 1',
-                'Lập trình HĐTD',
-                'Trí tuệ nhân tạo',
-                'Nguyên lý HĐH',
-                'Gym (tối)'
-            ],
-            'Thứ Bảy': [
-                '(Đang đi làm)',
-                '(Đang đi làm)',
-                '(Đang đi làm đến\n17:00)',
-                '17:00 – 18:30:\nGym\n18:30 – 20:00:\nĂn tối/ nghỉ',
-                '20:00 – 22:00: Dự án\nnhỏ hàng tuần'
-            ],
-            'Chủ Nhật': [
-                'Ôn tập nhanh tất cả\nmôn (2h)',
-                'Hoàn thiện dự án\nnhỏ hàng tuần (2h)',
-                'Buffer & ôn chuyên\nsâu (2h)',
-                'Nghỉ/nghỉ linh hoạt',
-                '20:00 – 21:30: Gym\n(tùy chọn)'
-            ]
-        }
-        df = pd.DataFrame(data)
-        return df
+        global _timetable_frame
+        if _timetable_frame is None:
+            _timetable_frame = pd.DataFrame({'Thời gian': TIME_SLOTS, **TIMETABLE})
+        return _timetable_frame.copy()
 
     def update_schedule(self, df: pd.DataFrame) -> bool:
         """Cập nhật dữ liệu thời khóa biểu - Không sử dụng khi hardcode data"""
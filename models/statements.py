@@ -0,0 +1,132 @@
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from models.tables import (
+    API_CACHE, APP_LAUNCHES, MAINTENANCE_LOG, REMINDERS, SCHEDULE, USER_INTERACTIONS_LOG, WEATHER_DATA, Table
+)
+
+logger = logging.getLogger(__name__)
+
+# Số câu lệnh đã biên dịch mà mỗi kết nối giữ lại (mặc định của sqlite3 là 128)
+STATEMENT_CACHE_SIZE = 256
+
+READ_PREFIXES = ('SELECT', 'WITH', 'EXPLAIN', 'VALUES')
+
+class Statement(NamedTuple):
+    name: str
+    sql: str
+    table: Optional[Table] = None
+
+    @property
+    def is_read(self) -> bool:
+        return self.sql.lstrip().split(None, 1)[0].upper() in READ_PREFIXES
+
+class StatementRegistry:
+    """Các câu lệnh SQL có tên, khai báo một lần và kiểm tra khi khởi động.
+
+    Vì SQL của mỗi tên luôn giống hệt nhau, bộ cache câu lệnh của kết nối dùng lại
+    được bản đã biên dịch. Registry cũng đếm số lần gọi, số dòng và thời gian
+    của từng câu lệnh.
+    """
+
+    def __init__(self):
+        self._statements: Dict[str, Statement] = {}
+        # name -> [calls, total_time, max_time, rows]
+        self._stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str, table: Optional[Table] = None) -> Statement:
+        if name in self._statements:
+            raise ValueError(f"Câu lệnh {name} đã được đăng ký")
+        statement = Statement(name, ' '.join(sql.split()), table)
+        self._statements[name] = statement
+        return statement
+
+    def get(self, name: str) -> Statement:
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Chưa đăng ký câu lệnh: {name}") from None
+
+    def names(self) -> List[str]:
+        return sorted(self._statements)
+
+    def validate(self, conn: sqlite3.Connection) -> None:
+        """Biên dịch thử mọi câu lệnh (EXPLAIN không chạy câu lệnh); lỗi SQL được báo ngay khi khởi động"""
+        errors = []
+        for statement in self._statements.values():
+            try:
+                conn.execute(f"EXPLAIN {statement.sql}", [None] * statement.sql.count('?')).fetchall()
+            except sqlite3.Error as e:
+                errors.append(f"{statement.name}: {str(e)}")
+        if errors:
+            raise ValueError("Câu lệnh không hợp lệ: " + "; ".join(errors))
+
+    def record(self, name: str, elapsed: float, rows: int) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                self._stats[name] = [1, elapsed, elapsed, rows]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3] += rows
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Số lần gọi, thời gian (ms) và số dòng của từng câu lệnh, sắp theo tổng thời gian"""
+        with self._lock:
+            items = [(name, list(values)) for name, values in self._stats.items()]
+        stats = [
+            {
+                'name': name,
+                'calls': int(calls),
+                'total_ms': total * 1000,
+                'avg_ms': total * 1000 / calls,
+                'max_ms': maximum * 1000,
+                'rows': int(rows)
+            }
+            for name, (calls, total, maximum, rows) in items
+        ]
+        return sorted(stats, key=lambda item: item['total_ms'], reverse=True)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+STATEMENTS = StatementRegistry()
+
+STATEMENTS.register('reminders.insert', REMINDERS.insert_sql('title', 'description', 'due_date', 'created_at', 'priority'))
+STATEMENTS.register('reminders.by_status', f"{REMINDERS.select_sql} WHERE status = ? ORDER BY due_date ASC", REMINDERS)
+STATEMENTS.register('reminders.update_status', "UPDATE reminders SET status = ? WHERE id = ?")
+STATEMENTS.register('reminders.delete', "DELETE FROM reminders WHERE id = ?")
+
+STATEMENTS.register('weather.latest', f"{WEATHER_DATA.select_sql} ORDER BY timestamp DESC LIMIT 1", WEATHER_DATA)
+STATEMENTS.register('weather.insert', WEATHER_DATA.insert_sql(
+    'city', 'temperature', 'feels_like', 'humidity', 'pressure', 'description',
+    'icon', 'wind_speed', 'clouds', 'timestamp'
+))
+
+STATEMENTS.register('interactions.insert', USER_INTERACTIONS_LOG.insert_sql('timestamp', 'action_type', 'facts'))
+STATEMENTS.register('interactions.recent', f"{USER_INTERACTIONS_LOG.select_sql} ORDER BY timestamp DESC LIMIT ?",
+                    USER_INTERACTIONS_LOG)
+
+STATEMENTS.register('cache.get', '''
+    SELECT response FROM api_cache
+    WHERE endpoint = ? AND (expires_at IS NULL OR expires_at > ?)
+    ORDER BY id DESC LIMIT 1
+''')
+STATEMENTS.register('cache.delete', "DELETE FROM api_cache WHERE endpoint = ?")
+STATEMENTS.register('cache.insert', API_CACHE.insert_sql('endpoint', 'response', 'expires_at', 'timestamp'))
+STATEMENTS.register('cache.clear_expired', "DELETE FROM api_cache WHERE expires_at <= ?")
+
+STATEMENTS.register('launches.insert', APP_LAUNCHES.insert_sql('launch_time'))
+STATEMENTS.register('launches.recent', f"{APP_LAUNCHES.select_sql} ORDER BY launch_time DESC LIMIT ?", APP_LAUNCHES)
+
+STATEMENTS.register('schedule.by_day', f"{SCHEDULE.select_sql} WHERE day_of_week = ? ORDER BY start_time", SCHEDULE)
+
+STATEMENTS.register('maintenance.insert', MAINTENANCE_LOG.insert_sql('task', 'started_at', 'duration_ms', 'status', 'details'))
+STATEMENTS.register('maintenance.recent', f"{MAINTENANCE_LOG.select_sql} ORDER BY id DESC LIMIT ?", MAINTENANCE_LOG)
+STATEMENTS.register('maintenance.last_status', "SELECT status FROM maintenance_log WHERE task = ? ORDER BY id DESC LIMIT 1")
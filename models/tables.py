@@ -0,0 +1,200 @@
+import logging
+import sqlite3
+from dataclasses import make_dataclass
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class Column(NamedTuple):
+    name: str
+    type: str
+    constraints: str = ''
+
+    def ddl(self) -> str:
+        return f"{self.name} {self.type} {self.constraints}".strip()
+
+class Record:
+    """Lớp cơ sở cho bản ghi dùng __slots__; hỗ trợ record['cột'], record[0] và dict(record) như sqlite3.Row"""
+    __slots__ = ()
+
+    def __getitem__(self, key: Union[str, int, slice]) -> Any:
+        if isinstance(key, (int, slice)):
+            # Truy cập theo vị trí cột như sqlite3.Row (row[0], row[-1], row[1:3])
+            values = tuple(getattr(self, name) for name in self.__slots__)
+            return values[key]
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class Table:
+    """Định nghĩa bảng dạng khai báo: sinh DDL, câu lệnh SQL dựng sẵn và lớp bản ghi từ cùng một nguồn"""
+
+    def __init__(self, name: str, columns: Sequence[Column], indexes: Optional[Dict[str, str]] = None,
+                 record_name: Optional[str] = None):
+        self.name = name
+        self.columns = tuple(columns)
+        self.column_names = tuple(column.name for column in self.columns)
+        self.indexes = dict(indexes or {})
+        self.record = make_dataclass(
+            record_name or name.title().replace('_', ''),
+            self.column_names,
+            bases=(Record,),
+            slots=True
+        )
+        # Liệt kê cột tường minh để thứ tự giá trị luôn khớp với lớp bản ghi
+        self.select_sql = f"SELECT {', '.join(self.column_names)} FROM {self.name}"
+        self._insert_sql: Dict[Tuple[str, ...], str] = {}
+
+    def create_sql(self, name: Optional[str] = None) -> str:
+        columns = ',\n    '.join(column.ddl() for column in self.columns)
+        return f"CREATE TABLE IF NOT EXISTS {name or self.name} (\n    {columns}\n)"
+
+    def index_sql(self) -> List[str]:
+        return [f"CREATE INDEX IF NOT EXISTS {index} ON {self.name}{columns}" for index, columns in self.indexes.items()]
+
+    def insert_sql(self, *columns: str) -> str:
+        """Câu INSERT cho các cột cho trước (được dựng một lần rồi dùng lại)"""
+        sql = self._insert_sql.get(columns)
+        if sql is None:
+            unknown = set(columns) - set(self.column_names)
+            if unknown:
+                raise ValueError(f"Bảng {self.name} không có cột: {', '.join(sorted(unknown))}")
+            sql = f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            self._insert_sql[columns] = sql
+        return sql
+
+    def row_factory(self, cursor: sqlite3.Cursor, row: tuple) -> Record:
+        return self.record(*row)
+
+    def select(self, conn: sqlite3.Connection, clause: str = '', params: Sequence[Any] = ()) -> List[Record]:
+        """Đọc các bản ghi theo mệnh đề WHERE/ORDER BY/LIMIT"""
+        cursor = conn.cursor()
+        cursor.row_factory = self.row_factory
+        return cursor.execute(f"{self.select_sql} {clause}", params).fetchall()
+
+    def rebuild(self, conn: sqlite3.Connection, renames: Optional[Dict[str, Sequence[str]]] = None) -> None:
+        """Dựng lại bảng theo định nghĩa, chép dữ liệu từ các cột trùng tên hoặc tên cũ trong renames"""
+        existing = [row[1] for row in conn.execute(f"PRAGMA table_info({self.name})").fetchall()]
+        if not existing:
+            conn.execute(self.create_sql())
+        else:
+            renames = renames or {}
+            temp_name = f"{self.name}__rebuild"
+            conn.execute(f"DROP TABLE IF EXISTS {temp_name}")
+            conn.execute(self.create_sql(temp_name))
+            targets, sources = [], []
+            for column in self.column_names:
+                present = [name for name in (column, *renames.get(column, ())) if name in existing]
+                if present:
+                    targets.append(column)
+                    sources.append(present[0] if len(present) == 1 else f"COALESCE({', '.join(present)})")
+            if targets:
+                conn.execute(
+                    f"INSERT INTO {temp_name} ({', '.join(targets)}) SELECT {', '.join(sources)} FROM {self.name}"
+                )
+            conn.execute(f"DROP TABLE {self.name}")
+            conn.execute(f"ALTER TABLE {temp_name} RENAME TO {self.name}")
+            logger.info(f"Đã dựng lại bảng {self.name} theo định nghĩa mới")
+        for sql in self.index_sql():
+            conn.execute(sql)
+
+REMINDERS = Table('reminders', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('title', 'TEXT', 'NOT NULL'),
+    Column('description', 'TEXT'),
+    Column('due_date', 'TEXT', 'NOT NULL'),
+    Column('status', 'TEXT', "DEFAULT 'pending'"),
+    Column('priority', 'TEXT', "DEFAULT 'medium'"),
+    Column('created_at', 'TEXT', 'DEFAULT CURRENT_TIMESTAMP'),
+    Column('updated_at', 'TEXT', 'DEFAULT CURRENT_TIMESTAMP')
+], indexes={
+    'idx_reminders_due_date': '(due_date)',
+    'idx_reminders_status': '(status)'
+}, record_name='Reminder')
+
+WEATHER_DATA = Table('weather_data', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('city', 'TEXT', "DEFAULT 'Unknown'"),
+    Column('temperature', 'REAL'),
+    Column('feels_like', 'REAL'),
+    Column('temp_min', 'REAL'),
+    Column('temp_max', 'REAL'),
+    Column('description', 'TEXT'),
+    Column('icon', 'TEXT'),
+    Column('humidity', 'INTEGER'),
+    Column('pressure', 'REAL'),
+    Column('wind_speed', 'REAL'),
+    Column('clouds', 'INTEGER'),
+    Column('visibility', 'INTEGER'),
+    Column('dew_point', 'REAL'),
+    Column('timestamp', 'TEXT', 'DEFAULT CURRENT_TIMESTAMP')
+], indexes={
+    'idx_weather_city': '(city)',
+    'idx_weather_timestamp': '(timestamp)'
+}, record_name='WeatherReading')
+
+USER_INTERACTIONS_LOG = Table('user_interactions_log', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('action_type', 'TEXT', 'NOT NULL'),
+    Column('facts', 'TEXT'),
+    Column('timestamp', 'TEXT', 'DEFAULT CURRENT_TIMESTAMP')
+], indexes={
+    'idx_interactions_timestamp': '(timestamp)'
+}, record_name='UserInteraction')
+
+API_CACHE = Table('api_cache', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('endpoint', 'TEXT', 'NOT NULL'),
+    Column('response', 'TEXT', 'NOT NULL'),
+    Column('timestamp', 'TEXT', 'DEFAULT CURRENT_TIMESTAMP'),
+    Column('expires_at', 'TEXT')
+], indexes={
+    'idx_api_cache_endpoint': '(endpoint)',
+    'idx_api_cache_timestamp': '(timestamp)'
+}, record_name='ApiCacheEntry')
+
+APP_LAUNCHES = Table('app_launches', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('launch_time', 'TEXT', 'DEFAULT CURRENT_TIMESTAMP'),
+    Column('version', 'TEXT'),
+    Column('status', 'TEXT', "DEFAULT 'success'")
+], indexes={
+    'idx_app_launches_launch_time': '(launch_time)'
+}, record_name='AppLaunch')
+
+SCHEDULE = Table('schedule', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('day_of_week', 'TEXT', 'NOT NULL'),
+    Column('start_time', 'TEXT', 'NOT NULL'),
+    Column('end_time', 'TEXT', 'NOT NULL'),
+    Column('subject', 'TEXT', 'NOT NULL'),
+    Column('location', 'TEXT')
+], record_name='ScheduleEntry')
+
+MAINTENANCE_LOG = Table('maintenance_log', [
+    Column('id', 'INTEGER', 'PRIMARY KEY AUTOINCREMENT'),
+    Column('task', 'TEXT', 'NOT NULL'),
+    Column('started_at', 'TEXT', 'NOT NULL'),
+    Column('duration_ms', 'REAL'),
+    Column('status', 'TEXT', 'NOT NULL'),
+    Column('details', 'TEXT')
+], indexes={
+    'idx_maintenance_log_started_at': '(started_at)'
+}, record_name='MaintenanceRun')
+
+TABLES = (REMINDERS, WEATHER_DATA, USER_INTERACTIONS_LOG, API_CACHE, APP_LAUNCHES, SCHEDULE, MAINTENANCE_LOG)
@@ -0,0 +1,52 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+DEFAULT_DB_PATH = os.path.join('data', 'database', 'database.db')
+
+def show_gemini_metrics(db_path=DEFAULT_DB_PATH, hours=24, prefix='gemini.'):
+    """In độ trễ, số token, lỗi và cache của Gemini đã được gộp trong bảng metrics_rollup"""
+    if not os.path.exists(db_path):
+        print(f"Không tìm thấy database: {db_path}")
+        return 1
+    conn = sqlite3.connect(db_path)
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metrics_rollup'"
+        ).fetchone()
+        if not exists:
+            print("Chưa có dữ liệu metrics (bảng metrics_rollup chưa được tạo).")
+            return 0
+        since = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:00')
+        rows = conn.execute('''
+            SELECT name, labels, SUM(count), SUM(sum), MIN(min), MAX(max)
+            FROM metrics_rollup
+            WHERE bucket >= ? AND name LIKE ?
+            GROUP BY name, labels
+            ORDER BY name, labels
+        ''', (since, prefix + '%')).fetchall()
+    finally:
+        conn.close()
+
+    if not rows:
+        print(f"Không có metrics nào trong {hours} giờ qua.")
+        return 0
+    print(f"Metrics Gemini trong {hours} giờ qua ({db_path}):")
+    for name, labels, count, total, minimum, maximum in rows:
+        labels_text = ', '.join(f"{key}={value}" for key, value in (json.loads(labels) if labels else {}).items())
+        if name.endswith('latency'):
+            mean = total / count if count else 0
+            print(f"- {name} [{labels_text}] số lần={count:.0f} tb={mean:.2f}s min={minimum:.2f}s max={maximum:.2f}s")
+        else:
+            print(f"- {name} [{labels_text}] tổng={total:.0f}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Xem metrics các lời gọi Gemini")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Đường dẫn database")
+    parser.add_argument('--hours', type=int, default=24, help="Số giờ gần nhất cần xem")
+    args = parser.parse_args()
+    sys.exit(show_gemini_metrics(args.db, args.hours))
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_PROFILE_PATH = os.path.join('logs', 'query_profile.json')
+SORT_KEYS = ('total_ms', 'avg_ms', 'max_ms', 'calls', 'rows')
+
+def show_query_profile(path=DEFAULT_PROFILE_PATH, limit=20, sort_by='total_ms', show_trace=False):
+    """In các truy vấn tốn thời gian nhất, truy vấn chậm kèm query plan và (tùy chọn) trace từ file profile"""
+    if not os.path.exists(path):
+        print(f"Không tìm thấy file profile: {path}")
+        print("Bật database.profiling.enabled trong data/config.json rồi chạy và đóng ứng dụng để tạo file.")
+        return 1
+    with open(path, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+
+    queries = sorted(profile.get('queries', []), key=lambda item: item[sort_by], reverse=True)[:limit]
+    print(f"Profile truy vấn lúc {profile.get('generated_at')} (ngưỡng chậm {profile.get('slow_query_ms')} ms):")
+    if not queries:
+        print("Chưa có truy vấn nào được ghi lại.")
+    for query in queries:
+        print(
+            f"- [{query['kind']}] số lần={query['calls']} tổng={query['total_ms']:.1f}ms tb={query['avg_ms']:.2f}ms "
+            f"max={query['max_ms']:.2f}ms dòng={query['rows']} trúng cache={query['cache_hits']}"
+        )
+        print(f"    {query['sql']}")
+        for caller in query.get('callers', []):
+            print(f"    <- {caller['site']} ({caller['calls']})")
+
+    slow_queries = profile.get('slow_queries', [])
+    if slow_queries:
+        print(f"\nTruy vấn chậm ({len(slow_queries)}):")
+        for query in slow_queries[-limit:]:
+            print(f"- {query['at']} {query['elapsed_ms']:.1f}ms {query['caller']}")
+            print(f"    {query['sql']}")
+            for line in query.get('plan', []):
+                print(f"      {line}")
+
+    if show_trace:
+        trace = profile.get('trace', [])
+        print(f"\nTrace ({len(trace)} câu lệnh):")
+        for statement in trace:
+            print(f"{statement['at']} [{statement['thread']}] {statement['sql']}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Xem profile truy vấn database")
+    parser.add_argument('--file', default=DEFAULT_PROFILE_PATH, help="Đường dẫn file profile")
+    parser.add_argument('--limit', type=int, default=20, help="Số truy vấn hiển thị")
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total_ms', help="Sắp xếp theo")
+    parser.add_argument('--trace', action='store_true', help="In cả các câu lệnh đã trace")
+    args = parser.parse_args()
+    sys.exit(show_query_profile(args.file, args.limit, args.sort, args.trace))
@@ -3,11 +3,19 @@ from .error_correction_service import ErrorCorrectionService
 from .scheduler_service import SchedulerService
 from .weather_service import WeatherService
 from .gemini_error_correction_service import GeminiErrorCorrectionService
+from .refresh_scheduler import RefreshScheduler
+from .retention_service import RetentionService
+from .error_telemetry import ErrorTelemetry
+from .metrics_registry import MetricsRegistry
 
 __all__ = [
     'UpdateOptimizerService',
     'ErrorCorrectionService',
     'SchedulerService',
     'WeatherService',
-    'GeminiErrorCorrectionService'
+    'GeminiErrorCorrectionService',
+    'RefreshScheduler',
+    'RetentionService',
+    'ErrorTelemetry',
+    'MetricsRegistry'
 ] 
\ No newline at end of file
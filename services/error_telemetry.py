@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Số lỗi gần nhất giữ lại cho mỗi service
+DEFAULT_MAX_LOGS = 100
+# Cửa sổ tính tốc độ lỗi (giây)
+DEFAULT_RATE_WINDOW = 60.0
+
+class ErrorTelemetry:
+    """Lưu lỗi gần đây theo service trong ring buffer có giới hạn.
+
+    Bộ đếm theo loại lỗi được cập nhật tăng dần khi thêm/đẩy lỗi ra khỏi buffer,
+    nên đọc thống kê chỉ tốn O(số loại lỗi) thay vì đếm lại toàn bộ log.
+    """
+
+    def __init__(self, max_logs: int = DEFAULT_MAX_LOGS, rate_window: float = DEFAULT_RATE_WINDOW):
+        self.max_logs = max_logs
+        self.rate_window = rate_window
+        self._logs: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._type_counts: Dict[str, Counter] = {}
+        self._totals: Counter = Counter()
+        self._recent: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, service: str, error_type: str, error_message: str, context: Any = None) -> None:
+        """Ghi nhận một lỗi"""
+        now = time.monotonic()
+        entry = {
+            'timestamp': datetime.now(),
+            'error_type': error_type,
+            'error_message': error_message,
+            'context': context
+        }
+        with self._lock:
+            logs = self._logs.get(service)
+            if logs is None:
+                logs = self._logs[service] = deque(maxlen=self.max_logs)
+                self._type_counts[service] = Counter()
+                self._recent[service] = deque()
+            counts = self._type_counts[service]
+            if len(logs) == self.max_logs:
+                # Lỗi cũ nhất sắp bị deque đẩy ra
+                evicted = logs[0]['error_type']
+                counts[evicted] -= 1
+                if counts[evicted] <= 0:
+                    del counts[evicted]
+            logs.append(entry)
+            counts[error_type] += 1
+            self._totals[service] += 1
+            recent = self._recent[service]
+            recent.append(now)
+            self._prune(recent, now)
+
+    def _prune(self, recent: Deque[float], now: float) -> None:
+        cutoff = now - self.rate_window
+        while recent and recent[0] < cutoff:
+            recent.popleft()
+
+    def get_logs(self, service: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Các lỗi gần nhất của service (cũ trước, mới sau)"""
+        with self._lock:
+            logs = list(self._logs.get(service, ()))
+        return logs[-limit:] if limit else logs
+
+    def services(self) -> List[str]:
+        with self._lock:
+            return list(self._logs)
+
+    def errors_per_minute(self, service: str) -> float:
+        """Số lỗi mỗi phút trong cửa sổ rate_window gần nhất"""
+        with self._lock:
+            recent = self._recent.get(service)
+            if not recent:
+                return 0.0
+            self._prune(recent, time.monotonic())
+            return len(recent) * 60.0 / self.rate_window
+
+    def get_stats(self, service: str) -> Dict[str, Any]:
+        """Thống kê của một service; {} nếu service chưa có lỗi"""
+        with self._lock:
+            if service not in self._logs:
+                return {}
+            recent = self._recent[service]
+            self._prune(recent, time.monotonic())
+            return {
+                'total_errors': len(self._logs[service]),
+                'error_types': dict(self._type_counts[service]),
+                'lifetime_errors': self._totals[service],
+                'errors_per_minute': len(recent) * 60.0 / self.rate_window
+            }
+
+    def get_all_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Thống kê của mọi service"""
+        return {service: self.get_stats(service) for service in self.services()}
+
+    def clear(self, service: Optional[str] = None) -> None:
+        """Xóa dữ liệu của một service hoặc toàn bộ"""
+        with self._lock:
+            targets = [service] if service else list(self._logs)
+            for name in targets:
+                self._logs.pop(name, None)
+                self._type_counts.pop(name, None)
+                self._recent.pop(name, None)
+                self._totals.pop(name, None)
+
+_shared_telemetry = ErrorTelemetry()
+
+def get_error_telemetry() -> ErrorTelemetry:
+    """Bộ telemetry lỗi dùng chung cho các service"""
+    return _shared_telemetry
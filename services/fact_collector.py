@@ -1,11 +1,34 @@
 import logging
 from datetime import datetime
+from models.schedule import get_schedule_store, load_schedule_store
+from models.tables import Record
 
 class FactCollector:
     def __init__(self, db, weather_service=None):
         self.db = db
         self.weather_service = weather_service
         self.logger = logging.getLogger(__name__)
+        # Nạp lịch trình đã import (nếu có) một lần, các lần suy luận sau chỉ tra index
+        load_schedule_store(db)
+
+    def _collect_schedule_facts(self, facts, now):
+        """Thu thập facts lịch trình từ store dùng chung (tra cứu O(log n))"""
+        store = get_schedule_store()
+        day = now.weekday()
+        schedule_count = store.count_for_day(day)
+        facts['has_schedule'] = schedule_count > 0
+        facts['schedule_count'] = schedule_count
+        if schedule_count == 0:
+            facts['schedule_activity'] = 'None'
+        elif store.has_activity('gym', day):
+            facts['schedule_activity'] = 'Gym'
+        else:
+            facts['schedule_activity'] = 'Other'
+
+        current = store.current_activity(now)
+        upcoming = store.next_activity(now)
+        facts['current_activity'] = current.subject if current else 'None'
+        facts['next_activity'] = upcoming.subject if upcoming else 'None'
 
     def collect_facts(self):
         """Thu thập tất cả các sự kiện từ các dịch vụ khác nhau."""
@@ -30,20 +53,7 @@ class FactCollector:
         # Thu thập thông tin từ cơ sở dữ liệu
         try:
             # Kiểm tra lịch trình trong ngày
-            schedule = self.db.get_schedule_for_day(day_of_week)
-            if schedule:
-                facts['has_schedule'] = True
-                facts['schedule_count'] = len(schedule)
-                # Kiểm tra xem có hoạt động Gym không
-                gym_activities = [s for s in schedule if 'gym' in s.get('activity', '').lower() or 'tập' in s.get('activity', '').lower()]
-                if gym_activities:
-                    facts['schedule_activity'] = 'Gym'
-                else:
-                    facts['schedule_activity'] = 'Other'
-            else:
-                facts['has_schedule'] = False
-                facts['schedule_count'] = 0
-                facts['schedule_activity'] = 'None'
+            self._collect_schedule_facts(facts, now)
             
             # Xác định schedule_empty_or_flexible
             if facts['schedule_count'] == 0:
@@ -57,7 +67,7 @@ class FactCollector:
                 # Kiểm tra cấu trúc dữ liệu trước khi truy cập
                 app_names = []
                 for app in recent_apps:
-                    if isinstance(app, dict):
+                    if isinstance(app, (dict, Record)):
                         # Nếu là dict, tìm key phù hợp
                         if 'name' in app:
                             app_names.append(app['name'])
@@ -113,20 +123,7 @@ class FactCollector:
         facts = {}
         try:
             # Lấy facts lịch trình
-            day_of_week = datetime.now().strftime('%A')
-            schedule = self.db.get_schedule_for_day(day_of_week)
-            if schedule:
-                facts['has_schedule'] = True
-                facts['schedule_count'] = len(schedule)
-                gym_activities = [s for s in schedule if 'gym' in str(s.get('activity', '')).lower() or 'tập' in str(s.get('activity', '')).lower()]
-                if gym_activities:
-                    facts['schedule_activity'] = 'Gym'
-                else:
-                    facts['schedule_activity'] = 'Other'
-            else:
-                facts['has_schedule'] = False
-                facts['schedule_count'] = 0
-                facts['schedule_activity'] = 'None'
+            self._collect_schedule_facts(facts, datetime.now())
             # Lấy facts thời tiết
             if hasattr(self, 'weather_service') and self.weather_service:
                 weather_data = self.weather_service.get_weather()
@@ -147,7 +144,7 @@ class FactCollector:
             if recent_apps:
                 app_names = []
                 for app in recent_apps:
-                    if isinstance(app, dict):
+                    if isinstance(app, (dict, Record)):
                         if 'name' in app:
                             app_names.append(app['name'])
                         elif 'launch_time' in app:
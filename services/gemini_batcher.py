@@ -0,0 +1,180 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prompt gộp: yêu cầu model trả lời từng tác vụ độc lập dưới dạng mảng JSON
+PACKED_PROMPT_HEADER = (
+    "You will receive {count} independent tasks, each introduced by a numbered TASK marker.\n"
+    "Answer each task separately and completely, in the same language it asks for.\n"
+    "Return ONLY a JSON array of {count} strings, where element n is the full answer to TASK n.\n"
+)
+
+class _BatchItem:
+    __slots__ = ('prompt', 'future', 'packable')
+
+    def __init__(self, prompt: str, packable: bool):
+        self.prompt = prompt
+        self.future = Future()
+        self.packable = packable
+
+class GeminiBatcher:
+    """Hàng đợi gom các prompt gửi tới Gemini.
+
+    Các prompt ngắn được gộp thành một yêu cầu có cấu trúc rồi tách kết quả cho
+    từng future; prompt dài (hoặc khi không tách được kết quả) được gửi riêng,
+    song song với số luồng giới hạn. Future chỉ chuyển sang trạng thái đang chạy khi
+    yêu cầu thực sự bắt đầu, nên vẫn hủy được khi còn chờ trong hàng đợi của executor.
+    """
+
+    def __init__(self, generate: Callable[[str], str], max_batch: int = 5, max_packed_chars: int = 6000,
+                 max_wait: float = 0.2, max_workers: int = 3):
+        self.generate = generate
+        self.max_batch = max_batch
+        self.max_packed_chars = max_packed_chars
+        self.max_wait = max_wait
+        self._queue: 'queue.Queue[Optional[_BatchItem]]' = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='GeminiRequest')
+        self.stats = {'submitted': 0, 'packed_requests': 0, 'single_requests': 0, 'cancelled': 0, 'unpack_failures': 0}
+        # Bộ đếm được cập nhật từ nhiều luồng của executor
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='GeminiBatcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt: str, packable: bool = True) -> Future:
+        """Gửi prompt, trả về Future chứa câu trả lời (có thể hủy bằng future.cancel())"""
+        item = _BatchItem(prompt, packable and len(prompt) <= self.max_packed_chars // self.max_batch)
+        self._inc('submitted')
+        self._queue.put(item)
+        return item.future
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Dừng nhận yêu cầu; các yêu cầu đang chờ bị hủy"""
+        self._queue.put(None)
+        self._thread.join(5 if wait else 0.1)
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stopping:
+                break
+        # Hủy các yêu cầu còn lại trong hàng đợi
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.future.cancel()
+
+    def _inc(self, key: str, count: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += count
+
+    def _start(self, items: List[_BatchItem]) -> List[_BatchItem]:
+        """Chuyển các future sang trạng thái đang chạy, bỏ qua các future đã bị hủy (ví dụ UI đã chuyển màn hình)"""
+        live = [item for item in items if item.future.set_running_or_notify_cancel()]
+        if len(live) != len(items):
+            self._inc('cancelled', len(items) - len(live))
+        return live
+
+    def _dispatch(self, batch: List[_BatchItem]) -> None:
+        live = [item for item in batch if not item.future.cancelled()]
+        if len(live) != len(batch):
+            self._inc('cancelled', len(batch) - len(live))
+        packable = [item for item in live if item.packable]
+        singles = [item for item in live if not item.packable]
+        if len(packable) == 1:
+            singles += packable
+            packable = []
+        if packable:
+            self._submit(self._run_packed, packable)
+        for item in singles:
+            self._submit(self._run_single, [item])
+
+    def _submit(self, run: Callable[[List[_BatchItem]], None], items: List[_BatchItem]) -> None:
+        work = self._executor.submit(run, items)
+        # Executor hủy công việc còn chờ khi shutdown: hủy luôn future của người gọi để họ không chờ mãi
+        work.add_done_callback(lambda work: [item.future.cancel() for item in items] if work.cancelled() else None)
+
+    def _run_single(self, items: List[_BatchItem]) -> None:
+        for item in self._start(items):
+            self._generate_single(item)
+
+    def _generate_single(self, item: _BatchItem) -> None:
+        self._inc('single_requests')
+        try:
+            item.future.set_result(self.generate(item.prompt))
+        except Exception as e:
+            logger.error(f"Lỗi khi gọi Gemini: {str(e)}")
+            item.future.set_exception(e)
+
+    def _run_packed(self, items: List[_BatchItem]) -> None:
+        items = self._start(items)
+        if len(items) <= 1:
+            for item in items:
+                self._generate_single(item)
+            return
+        self._inc('packed_requests')
+        try:
+            answers = self.unpack(self.generate(self.pack([item.prompt for item in items])), len(items))
+        except Exception as e:
+            logger.error(f"Lỗi khi gọi Gemini cho yêu cầu gộp: {str(e)}")
+            for item in items:
+                item.future.set_exception(e)
+            return
+        if answers is None:
+            # Không tách được kết quả: gửi lại từng prompt riêng
+            self._inc('unpack_failures')
+            for item in items:
+                self._generate_single(item)
+            return
+        for item, answer in zip(items, answers):
+            item.future.set_result(answer)
+
+    @staticmethod
+    def pack(prompts: List[str]) -> str:
+        """Gộp nhiều prompt thành một yêu cầu có cấu trúc"""
+        parts = [PACKED_PROMPT_HEADER.format(count=len(prompts))]
+        for index, prompt in enumerate(prompts, start=1):
+            parts.append(f"### TASK {index} ###\n{prompt.strip()}\n")
+        return "\n".join(parts)
+
+    @staticmethod
+    def unpack(text: str, count: int) -> Optional[List[str]]:
+        """Tách câu trả lời gộp; None nếu không đúng định dạng"""
+        if not text:
+            return None
+        cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+        try:
+            answers = json.loads(cleaned)
+        except ValueError:
+            return None
+        if not isinstance(answers, list) or len(answers) != count:
+            return None
+        return [answer if isinstance(answer, str) else json.dumps(answer, ensure_ascii=False) for answer in answers]
@@ -1,23 +1,59 @@
 import logging
 import google.generativeai as genai
 from models.config import Config
+from controllers.services.fix_suggestion_cache import FixSuggestionCache
+from services.gemini_batcher import GeminiBatcher
+from services.metrics_registry import MetricsRegistry, get_metrics_registry, timed
+from concurrent.futures import Future
+from typing import List, Tuple
 import os
 
 logger = logging.getLogger(__name__)
 
 class GeminiErrorCorrectionService:
-    def __init__(self):
+    def __init__(self, fix_cache: FixSuggestionCache = None, metrics: MetricsRegistry = None):
         self.config = Config()
+        self.metrics = metrics or get_metrics_registry()
         self.api_key = os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY chưa được cấu hình. Vui lòng cấu hình biến môi trường GEMINI_API_KEY.")
         self.model = genai.GenerativeModel('models/gemini-1.5-flash')
         self.chat = self.model.start_chat(history=[])
+        # Lỗi lặp lại chiếm phần lớn yêu cầu: dùng lại gợi ý cũ thay vì gọi lại API
+        try:
+            self.fix_cache = fix_cache or FixSuggestionCache()
+        except Exception as e:
+            logger.error(f"Không khởi tạo được cache gợi ý sửa lỗi: {str(e)}")
+            self.fix_cache = None
+        # Gom nhiều prompt (nhiều lỗi/nhiều file) thành ít yêu cầu hơn
+        self.batcher = GeminiBatcher(lambda prompt: self._generate(prompt, 'batch'))
 
-    def get_fix_suggestion(self, error_message: str, error_context: str) -> str:
-        """Lấy gợi ý sửa lỗi từ Gemini"""
+    def _generate(self, prompt: str, operation: str = 'generate') -> str:
+        """Gọi generate_content và ghi lại độ trễ, số token và lỗi"""
         try:
-            prompt = f"""
+            with timed(self.metrics, 'gemini.latency', operation=operation):
+                response = self.model.generate_content(prompt)
+                text = response.text if hasattr(response, 'text') else str(response)
+        except Exception as e:
+            self.metrics.inc('gemini.errors', operation=operation, error_type=e.__class__.__name__)
+            raise
+        self.metrics.inc('gemini.requests', operation=operation)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            self.metrics.inc('gemini.prompt_tokens', getattr(usage, 'prompt_token_count', 0) or 0, operation=operation)
+            self.metrics.inc('gemini.response_tokens', getattr(usage, 'candidates_token_count', 0) or 0, operation=operation)
+        return text
+
+    def _lookup_fix(self, error_message: str):
+        """Tra cache gợi ý sửa lỗi và đếm trúng/trượt"""
+        if not self.fix_cache:
+            return None
+        cached = self.fix_cache.lookup(error_message)
+        self.metrics.inc('gemini.fix_cache', result='hit' if cached else 'miss')
+        return cached
+
+    def _build_fix_prompt(self, error_message: str, error_context: str) -> str:
+        return f"""
             Error Message: {error_message}
             Context: {error_context}
             
@@ -27,18 +63,9 @@ class GeminiErrorCorrectionService:
             2. How to fix it
             3. Best practices to prevent similar errors
             """
-            
-            response = self.model.generate_content(prompt)
-            return response.text
-            
-        except Exception as e:
-            logger.error(f"Error getting fix suggestion from Gemini: {str(e)}")
-            return "Không thể lấy gợi ý sửa lỗi từ Gemini. Vui lòng kiểm tra lại kết nối và API key."
 
-    def get_code_review(self, code: str) -> str:
-        """Lấy đánh giá code từ Gemini"""
-        try:
-            prompt = f"""
+    def _build_review_prompt(self, code: str) -> str:
+        return f"""
             Code to review:
             {code}
             
@@ -48,9 +75,69 @@ class GeminiErrorCorrectionService:
             3. Suggestions for improvement
             4. Best practices to follow
             """
+
+    def get_fix_suggestion(self, error_message: str, error_context: str) -> str:
+        """Lấy gợi ý sửa lỗi, ưu tiên gợi ý đã lưu cho lỗi trùng hoặc tương tự"""
+        cached = self._lookup_fix(error_message)
+        if cached:
+            return cached
+        try:
+            suggestion = self._generate(self._build_fix_prompt(error_message, error_context), 'fix_suggestion')
+            if self.fix_cache and suggestion:
+                self.fix_cache.store(error_message, error_context, suggestion)
+            return suggestion
             
-            response = self.model.generate_content(prompt)
-            return response.text
+        except Exception as e:
+            logger.error(f"Error getting fix suggestion from Gemini: {str(e)}")
+            return "Không thể lấy gợi ý sửa lỗi từ Gemini. Vui lòng kiểm tra lại kết nối và API key."
+
+    def submit_fix_suggestion(self, error_message: str, error_context: str) -> Future:
+        """Gửi yêu cầu gợi ý sửa lỗi vào hàng đợi, trả về Future (có thể hủy)"""
+        cached = self._lookup_fix(error_message)
+        if cached:
+            future = Future()
+            future.set_result(cached)
+            return future
+        future = self.batcher.submit(self._build_fix_prompt(error_message, error_context))
+        if self.fix_cache:
+            def store_result(done: Future):
+                if not done.cancelled() and done.exception() is None and done.result():
+                    self.fix_cache.store(error_message, error_context, done.result())
+            future.add_done_callback(store_result)
+        return future
+
+    def submit_code_review(self, code: str) -> Future:
+        """Gửi yêu cầu đánh giá code vào hàng đợi, trả về Future (có thể hủy)"""
+        return self.batcher.submit(self._build_review_prompt(code))
+
+    def get_fix_suggestions(self, errors: List[Tuple[str, str]]) -> List[str]:
+        """Lấy gợi ý sửa lỗi cho nhiều lỗi cùng lúc"""
+        futures = [self.submit_fix_suggestion(message, context) for message, context in errors]
+        return self._collect(futures, "Không thể lấy gợi ý sửa lỗi từ Gemini. Vui lòng kiểm tra lại kết nối và API key.")
+
+    def get_code_reviews(self, codes: List[str]) -> List[str]:
+        """Đánh giá nhiều đoạn code cùng lúc"""
+        futures = [self.submit_code_review(code) for code in codes]
+        return self._collect(futures, "Không thể lấy đánh giá code từ Gemini. Vui lòng kiểm tra lại kết nối và API key.")
+
+    def _collect(self, futures: List[Future], fallback: str) -> List[str]:
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error getting batched response from Gemini: {str(e)}")
+                results.append(fallback)
+        return results
+
+    def get_fix_cache_stats(self) -> dict:
+        """Tỉ lệ trúng cache gợi ý sửa lỗi"""
+        return self.fix_cache.get_stats() if self.fix_cache else {}
+
+    def get_code_review(self, code: str) -> str:
+        """Lấy đánh giá code từ Gemini"""
+        try:
+            return self._generate(self._build_review_prompt(code), 'code_review')
             
         except Exception as e:
             logger.error(f"Error getting code review from Gemini: {str(e)}")
@@ -60,8 +147,7 @@ class GeminiErrorCorrectionService:
         """Tạo prompt từ facts và lấy đề xuất từ Gemini"""
         try:
             prompt = self._build_prompt_from_facts(facts)
-            response = self.model.generate_content(prompt)
-            return response.text if hasattr(response, 'text') else str(response)
+            return self._generate(prompt, 'facts')
         except Exception as e:
             logger.error(f"Error getting suggestion from facts: {str(e)}")
             return "Không thể lấy đề xuất từ Gemini. Vui lòng kiểm tra lại kết nối và API key."
@@ -78,12 +164,26 @@ class GeminiErrorCorrectionService:
         )
         return prompt
 
-    def list_models(self):
-        """Liệt kê các model khả dụng"""
+    def list_models(self) -> list:
+        """Liệt kê các model khả dụng: [{'name', 'methods'}]"""
         try:
             genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-            for m in genai.list_models():
-                print(m.name, m.supported_generation_methods)
+            return [
+                {'name': m.name, 'methods': list(m.supported_generation_methods)}
+                for m in genai.list_models()
+            ]
         except Exception as e:
             logger.error(f"Error listing models: {str(e)}")
-            return "Không thể liệt kê các model khả dụng. Vui lòng kiểm tra lại kết nối và API key." 
\ No newline at end of file
+            return []
+
+    def get_metrics(self) -> dict:
+        """Độ trễ, số token, lỗi và tỉ lệ trúng cache của các lời gọi Gemini"""
+        snapshot = self.metrics.snapshot('gemini.')
+        snapshot['fix_cache'] = self.get_fix_cache_stats()
+        return snapshot
+
+    def close(self):
+        """Hủy các yêu cầu đang chờ và dừng luồng embedding của cache gợi ý"""
+        self.batcher.shutdown()
+        if self.fix_cache:
+            self.fix_cache.close()
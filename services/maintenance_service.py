@@ -0,0 +1,147 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from models.config import Config
+from models.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Số dòng lỗi tối đa của quick_check được ghi vào log bảo trì
+MAX_QUICK_CHECK_ERRORS = 20
+
+class MaintenanceService:
+    """Bảo trì database trên luồng nền: PRAGMA optimize định kỳ, checkpoint WAL khi file -wal lớn,
+    ANALYZE sau khi ghi nhiều dòng, quick_check và chuyển sang auto_vacuum=INCREMENTAL khi không có ghi.
+
+    Kết quả của mỗi tác vụ được ghi vào bảng maintenance_log. PRAGMA optimize lúc đóng
+    ứng dụng do DatabaseManager.close() đảm nhận.
+    """
+
+    def __init__(self, db: Optional[DatabaseManager] = None, policy: Optional[Dict[str, Any]] = None):
+        self.db = db or DatabaseManager()
+        self.policy = policy or Config().get_maintenance_config()
+        self.check_interval = self.policy.get('check_interval', 60)
+        self.optimize_interval = self.policy.get('optimize_interval', 3600)
+        self.wal_checkpoint_bytes = int(self.policy.get('wal_checkpoint_mb', 64) * 1024 * 1024)
+        self.analyze_min_rows = self.policy.get('analyze_min_rows', 500)
+        self.idle_seconds = self.policy.get('idle_seconds', 300)
+        self.quick_check_interval = self.policy.get('quick_check_interval', 86400)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pending_rows = 0
+        self._last_optimize = time.monotonic()
+        self._last_quick_check = None
+        self._last_vacuum = None
+
+    def start(self) -> None:
+        """Kiểm tra và chạy các tác vụ đến hạn định kỳ trên một luồng nền"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='MaintenanceService', daemon=True)
+        self._thread.start()
+        logger.info("MaintenanceService đã khởi động")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Dừng luồng nền"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_loop(self) -> None:
+        while not self._stop_event.wait(self.check_interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Lỗi khi bảo trì database: {str(e)}", exc_info=True)
+
+    def run_once(self) -> Dict[str, Dict[str, Any]]:
+        """Chạy các tác vụ đã đến hạn, trả về kết quả theo tên tác vụ"""
+        results = {}
+        self._pending_rows += self.db.take_changed_rows()
+        if self._pending_rows and self._pending_rows >= self.analyze_min_rows:
+            results['analyze'] = self.analyze()
+
+        now = time.monotonic()
+        if now - self._last_optimize >= self.optimize_interval:
+            results['optimize'] = self.optimize()
+
+        if self.db.wal_size() >= self.wal_checkpoint_bytes:
+            results['wal_checkpoint'] = self.checkpoint()
+
+        idle = now - self.db.last_write_at >= self.idle_seconds
+        if idle and (self._last_quick_check is None or now - self._last_quick_check >= self.quick_check_interval):
+            results['quick_check'] = self.quick_check()
+        if idle and (self._last_vacuum is None or now - self._last_vacuum >= self.quick_check_interval):
+            if self.db.get_connection().execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                results['vacuum'] = self.enable_incremental_vacuum()
+        return results
+
+    def optimize(self) -> Dict[str, Any]:
+        """PRAGMA optimize: chỉ ANALYZE lại các bảng mà query planner cần thống kê mới"""
+        def task():
+            with self.db.transaction() as conn:
+                conn.execute("PRAGMA optimize").fetchall()
+            return 'ok', None
+        self._last_optimize = time.monotonic()
+        return self._run_task('optimize', task)
+
+    def analyze(self) -> Dict[str, Any]:
+        """ANALYZE toàn bộ sau khi các transaction đã thay đổi nhiều dòng"""
+        rows, self._pending_rows = self._pending_rows, 0
+        def task():
+            with self.db.transaction() as conn:
+                conn.execute("ANALYZE")
+            return 'ok', json.dumps({'changed_rows': rows})
+        return self._run_task('analyze', task)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """wal_checkpoint(TRUNCATE): chép WAL vào database và cắt file -wal về 0"""
+        def task():
+            wal_bytes = self.db.wal_size()
+            busy, log_pages, checkpointed = self.db.checkpoint('TRUNCATE')
+            details = {'wal_bytes': wal_bytes, 'log_pages': log_pages, 'checkpointed_pages': checkpointed}
+            return ('busy' if busy else 'ok'), json.dumps(details)
+        return self._run_task('wal_checkpoint', task)
+
+    def quick_check(self) -> Dict[str, Any]:
+        """PRAGMA quick_check: kiểm tra toàn vẹn nhanh (bỏ qua đối chiếu index với bảng)"""
+        def task():
+            rows = [row[0] for row in self.db.get_connection().execute("PRAGMA quick_check").fetchall()]
+            if rows == ['ok']:
+                return 'ok', None
+            logger.error(f"quick_check phát hiện lỗi database: {rows[:MAX_QUICK_CHECK_ERRORS]}")
+            return 'corrupt', json.dumps(rows[:MAX_QUICK_CHECK_ERRORS], ensure_ascii=False)
+        self._last_quick_check = time.monotonic()
+        return self._run_task('quick_check', task)
+
+    def enable_incremental_vacuum(self) -> Dict[str, Any]:
+        """Chuyển sang auto_vacuum=INCREMENTAL bằng một lần VACUUM đầy đủ, để RetentionService
+        sau đó chỉ cần incremental_vacuum"""
+        def task():
+            self.db.vacuum(auto_vacuum='INCREMENTAL')
+            return 'ok', None
+        self._last_vacuum = time.monotonic()
+        return self._run_task('vacuum', task)
+
+    def _run_task(self, task: str, func: Callable[[], Tuple[str, Optional[str]]]) -> Dict[str, Any]:
+        """Chạy một tác vụ, đo thời gian và ghi kết quả vào maintenance_log"""
+        started_at = datetime.now().isoformat()
+        start = time.perf_counter()
+        try:
+            status, details = func()
+        except Exception as e:
+            logger.error(f"Lỗi tác vụ bảo trì {task}: {str(e)}", exc_info=True)
+            status, details = 'error', str(e)
+        duration_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Bảo trì {task}: {status} ({duration_ms:.1f} ms)")
+        try:
+            self.db.log_maintenance(task, started_at, duration_ms, status, details)
+        except Exception as e:
+            logger.error(f"Không ghi được kết quả bảo trì {task}: {str(e)}")
+        return {'status': status, 'details': details, 'duration_ms': duration_ms}
@@ -0,0 +1,207 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from models.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Biên các bucket độ trễ (giây) cho histogram
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 30.0, 60.0)
+
+MetricKey = Tuple[str, str]
+
+def _labels_key(labels: Dict[str, Any]) -> str:
+    return json.dumps(labels, sort_keys=True, ensure_ascii=False) if labels else ''
+
+class Histogram:
+    """Histogram theo bucket cố định, cộng thêm tổng/min/max để tính trung bình"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Ước lượng phân vị từ bucket (trả về biên trên của bucket chứa phân vị)"""
+        if not self.count:
+            return None
+        target = self.count * percent / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99)
+        }
+
+class MetricsRegistry:
+    """Bộ đếm và histogram trong bộ nhớ, gộp định kỳ vào bảng metrics_rollup của SQLite"""
+
+    def __init__(self):
+        self._counters: Dict[MetricKey, float] = {}
+        self._histograms: Dict[MetricKey, Histogram] = {}
+        # Phần chưa được gộp vào SQLite kể từ lần rollup trước
+        self._pending: Dict[MetricKey, List[float]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Tăng bộ đếm"""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._add_pending(key, value, value)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Ghi một giá trị vào histogram"""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+            self._add_pending(key, 1, value)
+
+    def _add_pending(self, key: MetricKey, count: float, value: float) -> None:
+        # [count, sum, min, max]
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [count, value, value, value]
+        else:
+            pending[0] += count
+            pending[1] += value
+            pending[2] = min(pending[2], value)
+            pending[3] = max(pending[3], value)
+
+    def snapshot(self, prefix: str = '') -> Dict[str, Any]:
+        """Trạng thái hiện tại của các metric có tên bắt đầu bằng prefix"""
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': json.loads(labels) if labels else {}, 'value': value}
+                    for (name, labels), value in sorted(self._counters.items()) if name.startswith(prefix)
+                ],
+                'histograms': [
+                    {'name': name, 'labels': json.loads(labels) if labels else {}, **histogram.to_dict()}
+                    for (name, labels), histogram in sorted(self._histograms.items()) if name.startswith(prefix)
+                ]
+            }
+
+    def rollup(self, db: Optional[DatabaseManager] = None) -> int:
+        """Gộp phần metric mới vào bảng metrics_rollup theo giờ; trả về số dòng đã ghi"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        bucket = datetime.now().strftime('%Y-%m-%d %H:00')
+        try:
+            # Ghi qua transaction của DatabaseManager: giữ khóa ghi chung và làm mới cache truy vấn
+            with (db or DatabaseManager()).transaction() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS metrics_rollup (
+                        bucket TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        labels TEXT NOT NULL,
+                        count REAL NOT NULL DEFAULT 0,
+                        sum REAL NOT NULL DEFAULT 0,
+                        min REAL,
+                        max REAL,
+                        PRIMARY KEY (bucket, name, labels)
+                    )
+                ''')
+                conn.executemany('''
+                    INSERT INTO metrics_rollup (bucket, name, labels, count, sum, min, max)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (bucket, name, labels) DO UPDATE SET
+                        count = count + excluded.count,
+                        sum = sum + excluded.sum,
+                        min = MIN(min, excluded.min),
+                        max = MAX(max, excluded.max)
+                ''', [(bucket, name, labels, *values) for (name, labels), values in pending.items()])
+            return len(pending)
+        except Exception as e:
+            logger.error(f"Lỗi khi gộp metrics vào database: {str(e)}")
+            # Trả lại phần chưa ghi để lần sau gộp tiếp
+            with self._lock:
+                for key, values in pending.items():
+                    current = self._pending.get(key)
+                    if current is None:
+                        self._pending[key] = values
+                    else:
+                        current[0] += values[0]
+                        current[1] += values[1]
+                        current[2] = min(current[2], values[2])
+                        current[3] = max(current[3], values[3])
+            return 0
+
+    def start_rollup(self, db: Optional[DatabaseManager] = None, interval: float = 300) -> None:
+        """Gộp metrics định kỳ trên luồng nền"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self.rollup(db)
+
+        self._thread = threading.Thread(target=run, name='MetricsRollup', daemon=True)
+        self._thread.start()
+
+    def stop_rollup(self, db: Optional[DatabaseManager] = None) -> None:
+        """Dừng luồng nền và gộp nốt phần còn lại"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        self.rollup(db)
+
+class timed:
+    """Context manager đo thời gian một lời gọi và ghi vào histogram"""
+
+    def __init__(self, registry: MetricsRegistry, name: str, **labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.elapsed = None
+
+    def __enter__(self) -> 'timed':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.elapsed = time.perf_counter() - self._start
+        status = 'error' if exc_type else 'ok'
+        self.registry.observe(self.name, self.elapsed, status=status, **self.labels)
+        return False
+
+_registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Registry metrics dùng chung cho cả tiến trình"""
+    return _registry
@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class RefreshJob:
+    """Một công việc định kỳ do RefreshScheduler điều phối"""
+
+    def __init__(self, name: str, callback: Callable[[], None], interval: Optional[float] = None,
+                 interval_provider: Optional[Callable[[], float]] = None, jitter: float = 0.0,
+                 run_when_paused: bool = False):
+        if interval is None and interval_provider is None:
+            raise ValueError(f"Job {name} cần interval hoặc interval_provider")
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.interval_provider = interval_provider
+        self.jitter = jitter
+        self.run_when_paused = run_when_paused
+        self.next_run = 0.0
+        self.cancelled = False
+        self.run_count = 0
+
+    def get_interval(self) -> float:
+        """Lấy khoảng thời gian hiện tại (giây), ưu tiên interval_provider"""
+        interval = self.interval
+        if self.interval_provider is not None:
+            try:
+                interval = float(self.interval_provider())
+            except Exception as e:
+                logger.error(f"Không lấy được interval cho job {self.name}: {str(e)}")
+                interval = self.interval or 60
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(interval, 0.05)
+
+
+class RefreshScheduler:
+    """Một timer duy nhất (heap) trên Tk event loop điều phối mọi cập nhật định kỳ của UI.
+
+    Các job đến hạn trong cùng coalesce_window được chạy chung một lần thức dậy;
+    khi cửa sổ bị thu nhỏ, các job không có run_when_paused sẽ được hoãn và chạy
+    bù đúng một lần khi cửa sổ hiện lại.
+    """
+
+    def __init__(self, root, coalesce_window: float = 0.25):
+        self.root = root
+        self.coalesce_window = coalesce_window
+        self._heap = []
+        self._jobs: Dict[str, RefreshJob] = {}
+        self._deferred: Dict[str, RefreshJob] = {}
+        self._sequence = itertools.count()
+        self._after_id = None
+        self._running = False
+        self._paused = False
+        self.wakeups = 0
+
+        self.root.bind('<Unmap>', self._on_unmap, add='+')
+        self.root.bind('<Map>', self._on_map, add='+')
+
+    def add_job(self, name: str, callback: Callable[[], None], interval: Optional[float] = None,
+                interval_provider: Optional[Callable[[], float]] = None, jitter: float = 0.0,
+                run_when_paused: bool = False, initial_delay: float = 0.0) -> RefreshJob:
+        """Đăng ký job định kỳ; job cùng tên sẽ bị thay thế"""
+        self.remove_job(name)
+        job = RefreshJob(name, callback, interval, interval_provider, jitter, run_when_paused)
+        self._jobs[name] = job
+        self._push(job, time.monotonic() + initial_delay)
+        logger.debug(f"Đã đăng ký job {name}")
+        return job
+
+    def remove_job(self, name: str) -> None:
+        """Hủy job (xóa lười khỏi heap)"""
+        job = self._jobs.pop(name, None)
+        if job:
+            job.cancelled = True
+        self._deferred.pop(name, None)
+        if job and self._running:
+            self._arm()
+
+    def reschedule(self, name: str, delay: float = 0.0) -> None:
+        """Chạy lại job sớm hơn, ví dụ khi người dùng tương tác"""
+        job = self._jobs.get(name)
+        if job:
+            self._push(job, time.monotonic() + delay)
+
+    def start(self) -> None:
+        """Bắt đầu điều phối các job"""
+        self._running = True
+        self._arm()
+
+    def stop(self) -> None:
+        """Dừng timer và hủy callback after đang chờ"""
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def pause(self) -> None:
+        """Tạm dừng các job không cần chạy khi cửa sổ bị ẩn"""
+        if not self._paused:
+            self._paused = True
+            logger.debug("RefreshScheduler tạm dừng")
+
+    def resume(self) -> None:
+        """Tiếp tục và chạy bù một lần các job đã bị hoãn"""
+        if not self._paused:
+            return
+        self._paused = False
+        now = time.monotonic()
+        for job in self._deferred.values():
+            self._push(job, now)
+        self._deferred.clear()
+        logger.debug("RefreshScheduler tiếp tục")
+        self._arm()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Thống kê số lần chạy của từng job"""
+        now = time.monotonic()
+        return {
+            name: {'run_count': job.run_count, 'due_in': max(job.next_run - now, 0.0)}
+            for name, job in self._jobs.items()
+        }
+
+    def _push(self, job: RefreshJob, run_at: float) -> None:
+        job.next_run = run_at
+        heapq.heappush(self._heap, (run_at, next(self._sequence), job))
+        if self._running and self._heap[0][2] is job:
+            self._arm()
+
+    def _arm(self) -> None:
+        """Đặt đúng một callback after cho job sớm nhất"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        if not self._running:
+            return
+
+        # Bỏ các mục đã hủy hoặc đã được đặt lại ở đầu heap
+        while self._heap and (self._heap[0][2].cancelled or self._heap[0][0] != self._heap[0][2].next_run):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return
+
+        delay = max(self._heap[0][0] - time.monotonic(), 0.0)
+        self._after_id = self.root.after(int(delay * 1000), self._tick)
+
+    def _tick(self) -> None:
+        self._after_id = None
+        self.wakeups += 1
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now + self.coalesce_window:
+            run_at, _, job = heapq.heappop(self._heap)
+            if job.cancelled or run_at != job.next_run or job in due:
+                continue
+            if self._paused and not job.run_when_paused:
+                self._deferred[job.name] = job
+                continue
+            due.append(job)
+
+        for job in due:
+            try:
+                job.callback()
+                job.run_count += 1
+            except Exception as e:
+                logger.error(f"Lỗi khi chạy job {job.name}: {str(e)}", exc_info=True)
+            if job.cancelled:
+                continue
+            # Giữ nhịp cố định nếu kịp, tránh dồn việc sau khi bị trễ
+            next_run = job.next_run + job.get_interval()
+            if next_run <= now:
+                next_run = now + job.get_interval()
+            job.next_run = next_run
+            heapq.heappush(self._heap, (next_run, next(self._sequence), job))
+
+        self._arm()
+
+    def _on_unmap(self, event) -> None:
+        if event.widget is self.root:
+            self.pause()
+
+    def _on_map(self, event) -> None:
+        if event.widget is self.root:
+            self.resume()
@@ -0,0 +1,193 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from models.config import Config
+from models.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Các bảng được gộp theo giờ/ngày; bảng rollup và watermark được tạo bởi migration v7 (models/database_migrations.py)
+ROLLUPS = [
+    {
+        'source': 'update_history',
+        'time_column': 'update_time',
+        'key_column': 'service_type',
+        'targets': {
+            'update_history_hourly': '%Y-%m-%d %H:00',
+            'update_history_daily': '%Y-%m-%d'
+        },
+        'measures': {
+            'updates': 'COUNT(*)',
+            'changes': 'SUM(data_changed)',
+            'interactions': 'SUM(user_interaction)',
+            'total_response_time': 'SUM(COALESCE(response_time, 0))'
+        }
+    },
+    {
+        'source': 'user_interactions_log',
+        'time_column': 'timestamp',
+        'key_column': 'action_type',
+        'targets': {
+            'user_interactions_hourly': '%Y-%m-%d %H:00',
+            'user_interactions_daily': '%Y-%m-%d'
+        },
+        'measures': {
+            'interactions': 'COUNT(*)'
+        }
+    },
+    {
+        'source': 'app_launches',
+        'time_column': 'launch_time',
+        'key_column': 'status',
+        'targets': {
+            'app_launches_daily': '%Y-%m-%d'
+        },
+        'measures': {
+            'launches': 'COUNT(*)'
+        }
+    }
+]
+
+# Cột thời gian dùng để xóa dữ liệu thô theo TTL
+TIME_COLUMNS = {
+    'update_history': 'update_time',
+    'user_interactions_log': 'timestamp',
+    'weather_data': 'timestamp',
+    'app_launches': 'launch_time'
+}
+
+class RetentionService:
+    """Gộp dữ liệu thô vào bảng rollup theo giờ/ngày, xóa dữ liệu thô quá hạn và thu gọn database.
+
+    Rollup được cập nhật tăng dần theo watermark id của từng bảng nguồn nên dữ liệu
+    thô chỉ bị xóa sau khi đã được gộp. Việc chuyển sang auto_vacuum=INCREMENTAL (cần
+    một lần VACUUM đầy đủ) do MaintenanceService làm khi database rảnh.
+    """
+
+    def __init__(self, db: Optional[DatabaseManager] = None, policy: Optional[Dict[str, Any]] = None):
+        self.db = db or DatabaseManager()
+        self.policy = policy or Config().get_retention_config()
+        self.raw_ttl_days = self.policy.get('raw_ttl_days', {})
+        self.hourly_rollup_ttl_days = self.policy.get('hourly_rollup_ttl_days', 90)
+        self.compaction_interval = self.policy.get('compaction_interval', 3600)
+        self.incremental_vacuum_pages = self.policy.get('incremental_vacuum_pages', 1000)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_run = None
+
+    def start(self) -> None:
+        """Chạy compaction định kỳ trên một luồng nền"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='RetentionService', daemon=True)
+        self._thread.start()
+        logger.info("RetentionService đã khởi động")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Dừng luồng nền"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_loop(self) -> None:
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self.compaction_interval)
+
+    def run_once(self) -> Dict[str, Any]:
+        """Gộp, xóa dữ liệu quá hạn và thu gọn database một lần"""
+        summary = {'rolled_up': {}, 'deleted': {}, 'vacuum': None}
+        try:
+            # Ghi qua transaction của DatabaseManager: giữ khóa ghi chung và làm mới cache truy vấn
+            with self.db.transaction() as conn:
+                for rollup in ROLLUPS:
+                    summary['rolled_up'][rollup['source']] = self._roll_up(conn, rollup)
+                summary['deleted'] = self._apply_ttl(conn)
+
+            with self.db.transaction() as conn:
+                summary['vacuum'] = self._compact(conn)
+            self.last_run = datetime.now()
+            logger.info(f"Retention hoàn tất: {summary}")
+        except Exception as e:
+            logger.error(f"Lỗi khi chạy retention: {str(e)}", exc_info=True)
+        return summary
+
+    def _roll_up(self, conn: sqlite3.Connection, rollup: Dict[str, Any]) -> int:
+        """Gộp các dòng mới (id > watermark) vào bảng rollup, trả về số dòng đã gộp"""
+        source = rollup['source']
+        key_column = rollup['key_column']
+        row = conn.execute("SELECT last_id FROM retention_watermarks WHERE table_name = ?", (source,)).fetchone()
+        last_id = row[0] if row else 0
+        max_id = conn.execute(f"SELECT MAX(id) FROM {source}").fetchone()[0]
+        if max_id is None or max_id <= last_id:
+            return 0
+
+        measure_names = list(rollup['measures'])
+        measure_exprs = ', '.join(rollup['measures'].values())
+        updates = ', '.join(f"{name} = {name} + excluded.{name}" for name in measure_names)
+        for target, bucket_format in rollup['targets'].items():
+            conn.execute(f'''
+                INSERT INTO {target} ({key_column}, bucket, {', '.join(measure_names)})
+                SELECT COALESCE({key_column}, 'unknown'),
+                       strftime('{bucket_format}', {rollup['time_column']}),
+                       {measure_exprs}
+                FROM {source}
+                WHERE id > ? AND id <= ? AND {rollup['time_column']} IS NOT NULL
+                GROUP BY 1, 2
+                ON CONFLICT ({key_column}, bucket) DO UPDATE SET {updates}
+            ''', (last_id, max_id))
+
+        conn.execute('''
+            INSERT OR REPLACE INTO retention_watermarks (table_name, last_id, updated_at)
+            VALUES (?, ?, ?)
+        ''', (source, max_id, datetime.now().isoformat()))
+        return max_id - last_id
+
+    def _apply_ttl(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Xóa dữ liệu thô và rollup theo giờ đã quá hạn.
+
+        Với bảng có rollup chỉ xóa các dòng có id không vượt watermark, để dòng chưa gộp
+        được (ví dụ thiếu cột khóa) không bị mất.
+        """
+        deleted = {}
+        now = datetime.now()
+        rollup_sources = {rollup['source'] for rollup in ROLLUPS}
+        for table, ttl_days in self.raw_ttl_days.items():
+            time_column = TIME_COLUMNS.get(table)
+            if not ttl_days or time_column is None:
+                continue
+            cutoff = (now - timedelta(days=ttl_days)).isoformat()
+            if table in rollup_sources:
+                row = conn.execute("SELECT last_id FROM retention_watermarks WHERE table_name = ?", (table,)).fetchone()
+                cursor = conn.execute(
+                    f"DELETE FROM {table} WHERE {time_column} < ? AND id <= ?", (cutoff, row[0] if row else 0)
+                )
+            else:
+                cursor = conn.execute(f"DELETE FROM {table} WHERE {time_column} < ?", (cutoff,))
+            deleted[table] = cursor.rowcount
+
+        hourly_cutoff = (now - timedelta(days=self.hourly_rollup_ttl_days)).strftime('%Y-%m-%d %H:00')
+        for rollup in ROLLUPS:
+            for target, bucket_format in rollup['targets'].items():
+                if '%H' in bucket_format:
+                    cursor = conn.execute(f"DELETE FROM {target} WHERE bucket < ?", (hourly_cutoff,))
+                    deleted[target] = cursor.rowcount
+        return deleted
+
+    def _compact(self, conn: sqlite3.Connection) -> Optional[str]:
+        """Giải phóng trang trống nếu database đã ở chế độ auto_vacuum=INCREMENTAL"""
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if auto_vacuum != 2:
+            # VACUUM đầy đủ chặn mọi ghi nên không chạy ở đây; MaintenanceService chuyển chế độ khi rảnh
+            return None
+
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if freelist_count:
+            conn.execute(f"PRAGMA incremental_vacuum({int(self.incremental_vacuum_pages)})").fetchall()
+            return f'incremental_vacuum({min(freelist_count, self.incremental_vacuum_pages)})'
+        return None
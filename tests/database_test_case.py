@@ -0,0 +1,25 @@
+import os
+import tempfile
+import unittest
+
+from models.database import DatabaseManager
+
+class DatabaseTestCase(unittest.TestCase):
+    """Lớp cơ sở cho test cần DatabaseManager thật trên database tạm.
+
+    Chạy trong thư mục tạm vì SecurityManager ghi khóa theo đường dẫn tương đối, và
+    đặt lại singleton để mỗi test có database riêng.
+    """
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        DatabaseManager._instance = None
+        self.db = DatabaseManager(os.path.join('data', 'test.db'))
+
+    def tearDown(self):
+        self.db.close()
+        DatabaseManager._instance = None
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
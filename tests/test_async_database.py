@@ -0,0 +1,82 @@
+import asyncio
+import time
+import unittest
+
+from models.async_database import AsyncDatabase
+from tests.database_test_case import DatabaseTestCase
+
+class _FakeTk:
+    """Tk root giả: after() chỉ ghi lại callback để test gọi thủ công"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def after_cancel(self, after_id):
+        pass
+
+class TestAsyncDatabase(DatabaseTestCase):
+    """Kiểm tra mặt tiền bất đồng bộ của DatabaseManager"""
+
+    def setUp(self):
+        super().setUp()
+        self.tk = _FakeTk()
+        self.adb = AsyncDatabase(self.db, tk_root=self.tk)
+
+    def tearDown(self):
+        self.adb.close()
+        super().tearDown()
+
+    def test_transaction_isolated_from_other_jobs(self):
+        """Job khác chờ transaction kết thúc; transaction lỗi được rollback"""
+        async def scenario():
+            await self.adb.execute_many(
+                "INSERT INTO api_cache (endpoint, response) VALUES (?, ?)", [('a', '{}'), ('b', '{}')]
+            )
+            with self.assertRaises(RuntimeError):
+                async with self.adb.transaction() as tx:
+                    await tx.execute("DELETE FROM api_cache")
+                    # Đọc ngoài transaction chỉ chạy sau khi transaction kết thúc
+                    outside = asyncio.ensure_future(self.adb.fetch_one("SELECT COUNT(*) FROM api_cache"))
+                    await asyncio.sleep(0.05)
+                    self.assertFalse(outside.done())
+                    raise RuntimeError("hủy")
+            return (await outside)[0]
+
+        self.assertEqual(asyncio.run(scenario()), 2)
+
+    def test_cancelled_while_entering_transaction(self):
+        """Task bị hủy sau khi BEGIN đã chạy: transaction được rollback, luồng database và khóa ghi được giải phóng"""
+        async def scenario():
+            tx = self.adb.transaction()
+            entering = asyncio.ensure_future(tx.__aenter__())
+            await asyncio.sleep(0)
+            # Chặn event loop để BEGIN xong trên luồng database trước khi task kịp nhận kết quả
+            while self.adb._active is not tx:
+                time.sleep(0.01)
+            entering.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await entering
+            return await asyncio.wait_for(
+                self.adb.execute("INSERT INTO api_cache (endpoint, response) VALUES (?, ?)", ('a', '{}')), 5
+            )
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertIsNone(self.adb._active)
+        self.db.execute_query("INSERT INTO api_cache (endpoint, response) VALUES (?, ?)", ('b', '{}'))
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM api_cache", use_cache=False)[0][0], 2)
+
+    def test_then_runs_callback_on_tk_poll(self):
+        """Kết quả được chuyển về qua after() của Tk"""
+        results = []
+        future = self.adb.submit(self.db.get_reminders, 'pending')
+        self.adb.then(future, results.append)
+        future.result(5)
+        self.tk.scheduled.pop(0)()
+        self.assertEqual(results, [[]])
+
+if __name__ == '__main__':
+    unittest.main()
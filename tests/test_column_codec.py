@@ -0,0 +1,89 @@
+import os
+import unittest
+from unittest import mock
+
+from cryptography.exceptions import InvalidTag
+
+from models.column_codec import ENCRYPTED_VALUE_PREFIX, EncryptedColumnCodec
+from models.database import DatabaseManager
+from models.database_migrations import MIGRATIONS
+from tests.database_test_case import DatabaseTestCase
+
+class TestEncryptedColumnCodec(unittest.TestCase):
+    """Kiểm tra mã hóa cột và cache giá trị đã giải mã"""
+
+    def setUp(self):
+        self.codec = EncryptedColumnCodec(os.urandom(32))
+
+    def test_round_trip_and_cache(self):
+        """Giải mã đúng, lần đọc lại lấy từ cache"""
+        tokens = self.codec.encrypt_many('reminders', 'description', ['họp nhóm', None, 'nộp báo cáo'])
+        self.assertIsNone(tokens[1])
+        self.codec.clear_cache()
+        self.assertEqual(self.codec.decrypt('reminders', 'description', tokens[0]), 'họp nhóm')
+        self.assertEqual(self.codec.decrypt('reminders', 'description', tokens[0]), 'họp nhóm')
+        self.assertEqual(self.codec.stats['decrypted'], 1)
+        self.assertEqual(self.codec.stats['cache_hits'], 1)
+
+    def test_plaintext_passthrough_and_column_binding(self):
+        """Dữ liệu cũ chưa mã hóa giữ nguyên; không giải mã được khi chép sang cột khác"""
+        row = self.codec.decode_row('reminders', {'id': 1, 'description': 'dữ liệu cũ'})
+        self.assertEqual(row['description'], 'dữ liệu cũ')
+        token = self.codec.encrypt('user_interactions_log', 'facts', '{"weather": "mưa"}')
+        self.codec.clear_cache()
+        with self.assertRaises(InvalidTag):
+            self.codec.decrypt('reminders', 'description', token)
+
+class TestEncryptExistingColumns(DatabaseTestCase):
+    """Dữ liệu cũ dạng rõ được mã hóa khi nâng cấp database và vẫn đọc lại được"""
+
+    def _insert_plaintext(self, description):
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO reminders (title, description, due_date) VALUES (?, ?, ?)",
+                ('Họp', description, '2030-01-01')
+            )
+
+    def _stored_description(self):
+        return self.db.get_connection().execute("SELECT description FROM reminders").fetchone()[0]
+
+    def test_migration_encrypts_plaintext_once(self):
+        """Database ở phiên bản 5 có dữ liệu dạng rõ: migration v6 mã hóa, lần mở sau không chạy lại"""
+        self._insert_plaintext('dữ liệu cũ')
+        self.db.get_connection().execute("PRAGMA user_version = 5")
+        self.db.close()
+        DatabaseManager._instance = None
+        self.db = DatabaseManager(os.path.join('data', 'test.db'))
+
+        self.assertEqual(self.db.get_connection().execute("PRAGMA user_version").fetchone()[0], MIGRATIONS[-1].version)
+        self.assertTrue(bytes(self._stored_description()).startswith(ENCRYPTED_VALUE_PREFIX))
+        self.assertEqual(self.db.get_reminders()[0].description, 'dữ liệu cũ')
+
+    def test_migration_defers_without_key(self):
+        """Không nạp được khóa: database vẫn mở được, dữ liệu cũ được mã hóa ở lần đầu dùng codec"""
+        self._insert_plaintext('dữ liệu cũ')
+        self.db.get_connection().execute("PRAGMA user_version = 5")
+        self.db.close()
+        DatabaseManager._instance = None
+        with mock.patch.object(EncryptedColumnCodec, 'from_security_manager', side_effect=OSError("không đọc được khóa")):
+            self.db = DatabaseManager(os.path.join('data', 'test.db'))
+        self.assertEqual(self._stored_description(), 'dữ liệu cũ')
+        self.assertEqual(self.db.get_maintenance_log(1)[0].status, 'deferred')
+
+        self.assertEqual(self.db.get_reminders()[0].description, 'dữ liệu cũ')
+        self.assertTrue(bytes(self._stored_description()).startswith(ENCRYPTED_VALUE_PREFIX))
+        last = self.db.get_maintenance_log(1)[0]
+        self.assertEqual((last.task, last.status, last.details), ('encrypt_columns', 'ok', '{"reminders.description": 1}'))
+
+    def test_encrypt_existing_columns(self):
+        """Chạy lại thủ công chỉ mã hóa các giá trị còn dạng rõ"""
+        self.db.add_reminders([{'title': 'Mới', 'description': 'đã mã hóa', 'due_date': '2030-01-01'}])
+        self._insert_plaintext('dữ liệu khôi phục')
+        self.assertEqual(self.db.encrypt_existing_columns(), {'reminders.description': 1})
+        self.assertEqual(self.db.encrypt_existing_columns(), {})
+        self.db.column_codec.clear_cache()
+        self.assertEqual(sorted(reminder.description for reminder in self.db.get_reminders()),
+                         ['dữ liệu khôi phục', 'đã mã hóa'])
+
+if __name__ == '__main__':
+    unittest.main()
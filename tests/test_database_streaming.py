@@ -0,0 +1,32 @@
+import unittest
+
+from models.tables import USER_INTERACTIONS_LOG
+from tests.database_test_case import DatabaseTestCase
+
+class TestDatabaseStreaming(DatabaseTestCase):
+    """Kiểm tra đọc theo lô và đọc thành mảng cột"""
+
+    def setUp(self):
+        super().setUp()
+        self.db.log_user_interactions([('open_vscode' if i % 3 else 'open_schedule', {'i': i}) for i in range(1050)])
+
+    def test_iter_records_across_batches(self):
+        """Duyệt đủ mọi dòng qua nhiều lô, facts đã được giải mã"""
+        records = list(self.db.iter_records(USER_INTERACTIONS_LOG, "ORDER BY id", batch_size=100))
+        self.assertEqual(len(records), 1050)
+        self.assertEqual(records[-1].facts, '{"i": 1049}')
+
+    def test_fetch_arrays(self):
+        """Mảng có cấu trúc theo dtype, hoặc DataFrame"""
+        arrays = self.db.fetch_arrays(
+            "SELECT action_type, id FROM user_interactions_log ORDER BY id",
+            dtype=[('action', 'U32'), ('id', 'i8')], batch_size=256
+        )
+        self.assertEqual(arrays.shape, (1050,))
+        self.assertEqual(int(arrays['id'].sum()), 1050 * 1051 // 2)
+        self.assertEqual(int((arrays['action'] == 'open_schedule').sum()), 350)
+        frame = self.db.fetch_arrays("SELECT action_type, COUNT(*) AS n FROM user_interactions_log GROUP BY 1", as_frame=True)
+        self.assertEqual(sorted(frame['n'].tolist()), [350, 700])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from utils.error_handler import DatabaseError
+from tests.database_test_case import DatabaseTestCase
+
+class TestDatabaseThreads(DatabaseTestCase):
+    """Kiểm tra kết nối theo luồng và ghi tuần tự từ nhiều luồng"""
+
+    def test_concurrent_writers_and_readers(self):
+        """Ghi từ nhiều luồng không mất dữ liệu, mỗi luồng có kết nối riêng"""
+        errors = []
+
+        def writer(index):
+            try:
+                for i in range(20):
+                    self.db.execute_query("INSERT INTO api_cache (endpoint, response) VALUES (?, ?)", (f"{index}-{i}", '{}'))
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(20):
+                    self.db.execute_query("SELECT COUNT(*) FROM api_cache", use_cache=False)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(3)] + [threading.Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM api_cache", use_cache=False)[0][0], 60)
+
+    def test_nested_transaction_rolls_back_as_one(self):
+        """Transaction lồng nhau dùng chung transaction ngoài, lỗi thì rollback toàn bộ"""
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO api_cache (endpoint, response) VALUES ('outer', '{}')")
+                with self.db.transaction() as inner:
+                    inner.execute("INSERT INTO api_cache (endpoint, response) VALUES ('inner', '{}')")
+                raise RuntimeError("hủy")
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM api_cache", use_cache=False)[0][0], 0)
+
+    def test_read_overlapping_write_is_not_cached(self):
+        """Kết quả đọc bắt đầu trước một lần ghi không được lưu lại vào cache sau khi ghi xong"""
+        query = "SELECT COUNT(*) FROM api_cache"
+        profile = self.db._profile
+        writes = []
+
+        def write_during_read(kind, *args, **kwargs):
+            # Chạy ngay sau khi đọc xong, trước khi execute_query lưu kết quả vào cache
+            if kind == 'execute_query' and not writes:
+                writes.append(threading.Thread(target=self.db.execute_query, args=(
+                    "INSERT INTO api_cache (endpoint, response) VALUES ('late', '{}')",
+                )))
+                writes[0].start()
+                writes[0].join()
+            return profile(kind, *args, **kwargs)
+
+        self.db._profile = write_during_read
+        self.assertEqual(self.db.execute_query(query)[0][0], 0)
+        del self.db._profile
+        self.assertEqual(self.db.execute_query(query)[0][0], 1)
+
+    def test_no_connections_after_close(self):
+        """Sau close(), luồng nền không mở được kết nối mới"""
+        self.db.close()
+        errors = []
+
+        def late_reader():
+            try:
+                self.db.get_connection()
+            except DatabaseError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=late_reader)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        with self.assertRaises(DatabaseError):
+            self.db.execute_query("SELECT 1", use_cache=False)
+
+if __name__ == '__main__':
+    unittest.main()
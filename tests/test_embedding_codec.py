@@ -0,0 +1,44 @@
+import json
+import sqlite3
+import unittest
+import numpy as np
+from controllers.services.embedding_codec import EmbeddingCodec, HEADER_SIZE
+
+class TestEmbeddingCodec(unittest.TestCase):
+    def setUp(self):
+        self.vector = np.random.default_rng(1).normal(size=384).astype(np.float32)
+
+    def test_float32_round_trip(self):
+        """float32 giải mã đúng từng giá trị và không sao chép dữ liệu"""
+        codec = EmbeddingCodec('all-MiniLM-L6-v2')
+        blob = codec.encode(self.vector)
+        self.assertEqual(len(blob), HEADER_SIZE + len('all-MiniLM-L6-v2') + 384 * 4)
+        decoded = EmbeddingCodec.decode(blob)
+        np.testing.assert_array_equal(decoded, self.vector)
+        self.assertFalse(decoded.flags.owndata)
+        header = EmbeddingCodec.read_header(blob)
+        self.assertEqual((header.model_name, header.dim, header.dtype), ('all-MiniLM-L6-v2', 384, 'float32'))
+
+    def test_quantized_round_trip(self):
+        """float16 và int8 giữ được hướng của vector"""
+        for dtype, max_error in (('float16', 1e-2), ('int8', 5e-2)):
+            blob = EmbeddingCodec('m', dtype).encode(self.vector)
+            decoded = EmbeddingCodec.decode(blob)
+            self.assertEqual(decoded.dtype, np.float32)
+            self.assertLess(np.abs(decoded - self.vector).max(), max_error * np.abs(self.vector).max())
+
+    def test_migrate_json_columns(self):
+        """Embedding JSON cũ được chuyển sang BLOB"""
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE error_log (id INTEGER PRIMARY KEY, error_message_embedding TEXT)")
+        conn.executemany("INSERT INTO error_log (error_message_embedding) VALUES (?)",
+                         [(json.dumps(self.vector.tolist()),), (None,)])
+        codec = EmbeddingCodec('m')
+        self.assertEqual(codec.migrate_json_columns(conn, 'error_log', ['error_message_embedding']), 1)
+        blob = conn.execute("SELECT error_message_embedding FROM error_log WHERE id = 1").fetchone()[0]
+        self.assertIsInstance(blob, bytes)
+        np.testing.assert_allclose(EmbeddingCodec.decode(blob), self.vector)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import threading
+import unittest
+import numpy as np
+from controllers.services.embedding_worker import EmbeddingWorker
+
+class TestEmbeddingWorker(unittest.TestCase):
+    def setUp(self):
+        self.encode_calls = []
+        self.results = []
+        self.lock = threading.Lock()
+
+    def _encode(self, texts):
+        self.encode_calls.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    def _collect(self, results):
+        with self.lock:
+            self.results.extend(results)
+
+    def test_batches_and_dedupes(self):
+        """Các lỗi trùng nội dung chỉ được encode một lần trong cùng lô"""
+        worker = EmbeddingWorker(self._encode, self._collect, batch_size=10, max_latency=0.2)
+        for row_id in range(5):
+            worker.submit(row_id, ('timeout', None))
+        worker.submit(5, ('connection refused', 'weather'))
+        worker.start()
+        self.assertTrue(worker.flush(timeout=5))
+        worker.stop()
+
+        self.assertEqual(len(self.encode_calls), 1)
+        self.assertEqual(sorted(self.encode_calls[0]), ['connection refused', 'timeout', 'weather'])
+        by_key = dict(self.results)
+        self.assertEqual(len(by_key), 6)
+        self.assertIsNone(by_key[0][1])
+        self.assertEqual(by_key[5][0][0], len('connection refused'))
+
+    def test_cache_reused_across_batches(self):
+        """Văn bản đã gặp ở lô trước dùng lại vector trong cache"""
+        worker = EmbeddingWorker(self._encode, self._collect, batch_size=1, max_latency=0.05)
+        worker.start()
+        worker.submit(1, ('timeout',))
+        worker.flush(timeout=5)
+        worker.submit(2, ('timeout',))
+        worker.flush(timeout=5)
+        worker.stop()
+        self.assertEqual(self.encode_calls, [['timeout']])
+        self.assertEqual(worker.stats['cache_hits'], 1)
+        self.assertEqual(worker.stats['batches'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from utils.error_handler import ErrorHandler, NetworkError
+
+class TestErrorHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.handler = ErrorHandler(os.path.join(self.tmpdir.name, 'logs', 'errors.ndjson'),
+                                    max_bytes=4096, backup_count=2)
+
+    def tearDown(self):
+        self.handler.close()
+        self.tmpdir.cleanup()
+
+    def _raise_errors(self, count):
+        for index in range(count):
+            try:
+                raise NetworkError(f"lỗi {index}", "NETWORK", {"index": index})
+            except NetworkError as e:
+                self.handler.handle_error(e, {"service": "weather"})
+        # Đợi luồng ghi file xử lý hết hàng đợi
+        self.handler.close()
+
+    def test_tail_reads_latest_errors(self):
+        """Đọc đúng các lỗi mới nhất, kể cả khi phải đọc sang file đã xoay vòng"""
+        self._raise_errors(40)
+        self.assertTrue(os.path.exists(self.handler.error_log_file + '.1'))
+        logs = self.handler.get_error_logs(limit=5)
+        self.assertEqual([log['message'] for log in logs], [f"lỗi {index}" for index in range(35, 40)])
+        self.assertEqual(logs[-1]['error_code'], 'NETWORK')
+        self.assertIn('NetworkError', logs[-1]['traceback'])
+        self.assertGreater(len(self.handler.get_error_logs(limit=100)), 5)
+
+    def test_non_positive_limit(self):
+        """limit bằng 0 hoặc âm không trả về toàn bộ file"""
+        self._raise_errors(10)
+        self.assertEqual(self.handler.get_error_logs(limit=0), [])
+        self.assertEqual(self.handler.get_error_logs(limit=-3), [])
+        self.assertEqual(ErrorHandler._tail_lines(self.handler.error_log_file, 0), [])
+
+    def test_clear_error_logs(self):
+        """Xóa log xóa cả các file đã xoay vòng"""
+        self._raise_errors(40)
+        self.handler.clear_error_logs()
+        self.assertEqual(self.handler.get_error_logs(), [])
+
+if __name__ == '__main__':
+    unittest.main()
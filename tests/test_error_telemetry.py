@@ -0,0 +1,27 @@
+import unittest
+from services.error_telemetry import ErrorTelemetry
+from services.error_service import ErrorService
+
+class TestErrorTelemetry(unittest.TestCase):
+    def test_counts_follow_ring_buffer(self):
+        """Bộ đếm theo loại lỗi chỉ tính các lỗi còn trong buffer"""
+        telemetry = ErrorTelemetry(max_logs=3)
+        for error_type in ['Timeout', 'Timeout', 'KeyError', 'ValueError', 'ValueError']:
+            telemetry.record('weather', error_type, 'lỗi', None)
+        stats = telemetry.get_stats('weather')
+        self.assertEqual(stats['total_errors'], 3)
+        self.assertEqual(stats['error_types'], {'KeyError': 1, 'ValueError': 2})
+        self.assertEqual(stats['lifetime_errors'], 5)
+        self.assertEqual(stats['errors_per_minute'], 5.0)
+        self.assertEqual([log['error_type'] for log in telemetry.get_logs('weather', limit=2)], ['ValueError', 'ValueError'])
+
+    def test_service_uses_telemetry(self):
+        """ErrorService đọc thống kê từ telemetry"""
+        service = ErrorService(ErrorTelemetry())
+        service.log_error('greeting', 'Timeout', 'hết thời gian', None)
+        self.assertEqual(service.get_error_stats('greeting')['error_types'], {'Timeout': 1})
+        self.assertEqual(service.get_error_stats('weather'), {})
+        self.assertIn('greeting', service.get_error_stats())
+
+if __name__ == '__main__':
+    unittest.main()
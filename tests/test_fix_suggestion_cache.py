@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+
+import numpy as np
+
+from controllers.services.fix_suggestion_cache import FixSuggestionCache
+
+# Embedding giả: hai lỗi KeyError gần giống nhau, lỗi timeout khác hẳn
+FAKE_EMBEDDINGS = {
+    "KeyError: 'city'": [1.0, 0.0, 0.0],
+    "KeyError: 'city_name'": [0.99, 0.05, 0.0],
+    "TimeoutError: weather API": [0.0, 0.0, 1.0]
+}
+
+class _FakeModelHandle:
+    """Handle model giả trả về embedding cố định, không cần sentence_transformers"""
+
+    def __init__(self, ready=True):
+        self.is_ready = ready
+        self.failed = False
+        self.error = None
+        self.load_requests = 0
+
+    def load_async(self):
+        self.load_requests += 1
+
+    def encode(self, texts, timeout=None, **kwargs):
+        if isinstance(texts, str):
+            return np.array(FAKE_EMBEDDINGS[texts], dtype=np.float32)
+        return np.array([FAKE_EMBEDDINGS[text] for text in texts], dtype=np.float32)
+
+class TestFixSuggestionCache(unittest.TestCase):
+    """Kiểm tra tra cứu gợi ý sửa lỗi và migration của bảng gemini_fix_cache"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, 'app_data.db')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _open_cache(self, handle):
+        cache = FixSuggestionCache(self.db_path, model_name='fake-model')
+        cache.model_handle = handle
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_exact_semantic_hit_and_miss(self):
+        """Lỗi trùng nguyên văn hoặc đủ giống thì trúng cache, lỗi khác thì trượt"""
+        cache = self._open_cache(_FakeModelHandle())
+        cache.store("KeyError: 'city'", 'weather_service', 'Kiểm tra key city trong response')
+        self.assertTrue(cache.embedding_worker.flush(5))
+
+        self.assertEqual(cache.lookup("KeyError: 'city'"), 'Kiểm tra key city trong response')
+        self.assertEqual(cache.lookup("KeyError: 'city_name'"), 'Kiểm tra key city trong response')
+        self.assertIsNone(cache.lookup("TimeoutError: weather API"))
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['exact_hits'], stats['semantic_hits'], stats['misses']), (1, 1, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            self.assertEqual(conn.execute("SELECT hits FROM gemini_fix_cache").fetchone()[0], 2)
+
+    def test_empty_message_does_not_drop_batch(self):
+        """Lỗi rỗng không có embedding nhưng các gợi ý cùng lô vẫn được lưu embedding"""
+        cache = self._open_cache(_FakeModelHandle())
+        cache.embedding_worker.max_latency = 1.0
+        cache.store('', None, 'Không có nội dung lỗi')
+        cache.store("KeyError: 'city'", None, 'Kiểm tra key city')
+        self.assertTrue(cache.embedding_worker.flush(5))
+        self.assertEqual(cache.embedding_worker.stats['batches'], 1)
+
+        self.assertEqual(cache.lookup("KeyError: 'city_name'"), 'Kiểm tra key city')
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            rows = conn.execute("SELECT error_message, embedding IS NOT NULL FROM gemini_fix_cache ORDER BY id").fetchall()
+        self.assertEqual(rows, [('', 0), ("KeyError: 'city'", 1)])
+
+    def test_model_not_ready_only_exact_match(self):
+        """Model chưa tải xong: chỉ tra theo hash, yêu cầu tải model ở nền"""
+        handle = _FakeModelHandle(ready=False)
+        cache = self._open_cache(handle)
+        cache.store("KeyError: 'city'", None, 'Kiểm tra key city')
+        self.assertEqual(cache.lookup("KeyError: 'city'"), 'Kiểm tra key city')
+        self.assertIsNone(cache.lookup("KeyError: 'city_name'"))
+        self.assertEqual(handle.load_requests, 1)
+
+    def test_component_migration(self):
+        """Phiên bản lưu theo component gemini_fix_cache, không đụng user_version của file dùng chung"""
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            conn.execute("PRAGMA user_version = 7")
+        self._open_cache(_FakeModelHandle())
+        # Mở lại không chạy lại migration
+        self._open_cache(_FakeModelHandle())
+
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 7)
+            self.assertEqual(conn.execute(
+                "SELECT version FROM schema_versions WHERE component = 'gemini_fix_cache'"
+            ).fetchone()[0], 1)
+            self.assertIsNotNone(conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_gemini_fix_cache_hash'"
+            ).fetchone())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import threading
+import unittest
+from services.gemini_batcher import GeminiBatcher
+
+class TestGeminiBatcher(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _generate(self, prompt):
+        with self.lock:
+            self.calls.append(prompt)
+        if prompt.startswith("You will receive"):
+            count = prompt.count("### TASK")
+            return "```json\n" + json.dumps([f"answer {index}" for index in range(1, count + 1)]) + "\n```"
+        return f"single: {prompt}"
+
+    def test_packs_short_prompts(self):
+        """Các prompt ngắn được gộp thành một yêu cầu và tách kết quả đúng thứ tự"""
+        batcher = GeminiBatcher(self._generate, max_batch=5, max_wait=0.2)
+        futures = [batcher.submit(f"lỗi {index}") for index in range(3)]
+        results = [future.result(timeout=5) for future in futures]
+        batcher.shutdown(wait=True)
+        self.assertEqual(results, ['answer 1', 'answer 2', 'answer 3'])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_falls_back_when_unpack_fails(self):
+        """Kết quả gộp không đúng định dạng thì gửi lại từng prompt"""
+        batcher = GeminiBatcher(lambda prompt: self._generate(prompt).replace('answer', '').strip('`') + 'x'
+                                if prompt.startswith("You will receive") else self._generate(prompt),
+                                max_batch=2, max_wait=0.2)
+        futures = [batcher.submit("a"), batcher.submit("b")]
+        self.assertEqual([future.result(timeout=5) for future in futures], ['single: a', 'single: b'])
+        self.assertEqual(batcher.stats['unpack_failures'], 1)
+        batcher.shutdown(wait=True)
+
+    def test_cancelled_prompts_are_skipped(self):
+        """Future bị hủy trước khi gửi thì không gọi API"""
+        batcher = GeminiBatcher(self._generate, max_batch=5, max_wait=0.3)
+        cancelled = batcher.submit("bỏ qua")
+        kept = batcher.submit("giữ lại")
+        self.assertTrue(cancelled.cancel())
+        self.assertEqual(kept.result(timeout=5), 'single: giữ lại')
+        batcher.shutdown(wait=True)
+        self.assertEqual(self.calls, ['giữ lại'])
+        self.assertEqual(batcher.stats['cancelled'], 1)
+
+    def test_cancel_while_waiting_for_worker(self):
+        """Yêu cầu đang chờ luồng rảnh vẫn hủy được và không gọi API"""
+        started, release = threading.Event(), threading.Event()
+
+        def generate(prompt):
+            started.set()
+            release.wait(5)
+            return self._generate(prompt)
+
+        batcher = GeminiBatcher(generate, max_wait=0.05, max_workers=1)
+        running = batcher.submit("đang chạy", packable=False)
+        self.assertTrue(started.wait(5))
+        waiting = batcher.submit("đang chờ", packable=False)
+        while batcher._executor._work_queue.qsize() == 0:
+            threading.Event().wait(0.01)
+        self.assertTrue(waiting.cancel())
+        self.assertFalse(running.cancel())
+        release.set()
+        self.assertEqual(running.result(timeout=5), 'single: đang chạy')
+        batcher.shutdown(wait=True)
+        self.assertEqual(self.calls, ['đang chạy'])
+        self.assertEqual(batcher.stats['cancelled'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
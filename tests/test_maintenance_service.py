@@ -0,0 +1,73 @@
+import json
+import unittest
+
+from services.maintenance_service import MaintenanceService
+from tests.database_test_case import DatabaseTestCase
+
+class TestMaintenanceService(DatabaseTestCase):
+    """Kiểm tra các tác vụ bảo trì database"""
+
+    def setUp(self):
+        super().setUp()
+        self.service = MaintenanceService(self.db, {
+            'optimize_interval': 3600,
+            'wal_checkpoint_mb': 0.01,
+            'analyze_min_rows': 100,
+            'idle_seconds': 0,
+            'quick_check_interval': 3600
+        })
+
+    def tearDown(self):
+        self.service.stop()
+        super().tearDown()
+
+    def test_run_once_after_bulk_import(self):
+        """Nhập hàng loạt kích hoạt ANALYZE; WAL lớn được checkpoint; quick_check và VACUUM chạy khi rảnh"""
+        self.db.log_user_interactions([('open_vscode', {'i': i}) for i in range(150)])
+        self.assertGreater(self.db.wal_size(), 0)
+
+        results = self.service.run_once()
+        self.assertEqual(sorted(results), ['analyze', 'wal_checkpoint'])
+        self.assertTrue(all(result['status'] == 'ok' for result in results.values()))
+        checkpoint = json.loads(results['wal_checkpoint']['details'])
+        self.assertEqual(checkpoint['checkpointed_pages'], checkpoint['log_pages'])
+        stats = self.db.execute_query("SELECT tbl FROM sqlite_stat1 WHERE tbl = 'user_interactions_log'")
+        self.assertTrue(stats)
+
+        # Lần kiểm tra sau không còn gì để ANALYZE/checkpoint; database rảnh nên chạy quick_check
+        self.service.wal_checkpoint_bytes = 64 * 1024 * 1024
+        idle_results = self.service.run_once()
+        self.assertEqual(sorted(idle_results), ['quick_check', 'vacuum'])
+        self.assertTrue(all(result['status'] == 'ok' for result in idle_results.values()))
+        self.assertEqual(self.db.execute_query("PRAGMA auto_vacuum", use_cache=False)[0][0], 2)
+        self.assertEqual(self.service.run_once(), {})
+
+        log = self.db.get_maintenance_log()
+        self.assertEqual(sorted(run.task for run in log), ['analyze', 'quick_check', 'vacuum', 'wal_checkpoint'])
+
+    def test_small_import_does_not_analyze(self):
+        """Ghi ít dòng thì chưa ANALYZE, số dòng được cộng dồn cho lần sau"""
+        self.db.add_reminders([{'title': f"R{i}", 'due_date': '2030-01-01'} for i in range(60)])
+        self.assertNotIn('analyze', self.service.run_once())
+        self.db.add_reminders([{'title': f"R{i}", 'due_date': '2030-01-01'} for i in range(60)])
+        self.assertIn('analyze', self.service.run_once())
+
+    def test_counts_rows_from_shared_write_paths(self):
+        """Số dòng được đếm từ mọi transaction, không chỉ các hàm nhập hàng loạt"""
+        self.db.execute_transaction([
+            ("INSERT INTO app_launches (launch_time) VALUES (?)", (f"2030-01-01T00:00:{i:02d}",)) for i in range(50)
+        ])
+        self.db.run('launches.insert', [(f"2030-01-02T00:00:{i:02d}",) for i in range(50)], many=True)
+        self.assertEqual(self.db.take_changed_rows(), 100)
+        self.assertEqual(self.db.take_changed_rows(), 0)
+
+        self.db.execute_query("DELETE FROM app_launches")
+        self.assertEqual(self.service.run_once()['analyze']['details'], '{"changed_rows": 100}')
+
+    def test_optimize(self):
+        """PRAGMA optimize chạy được và được ghi log"""
+        self.assertEqual(self.service.optimize()['status'], 'ok')
+        self.assertEqual(self.db.get_maintenance_log(1)[0].task, 'optimize')
+
+if __name__ == '__main__':
+    unittest.main()
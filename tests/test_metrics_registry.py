@@ -0,0 +1,48 @@
+import unittest
+from services.metrics_registry import Histogram, MetricsRegistry, timed
+from tests.database_test_case import DatabaseTestCase
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_percentiles(self):
+        """Phân vị được ước lượng theo biên trên của bucket"""
+        histogram = Histogram(buckets=(1.0, 2.0, 5.0))
+        for value in (0.5, 0.7, 1.5, 4.0, 9.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.percentile(40), 1.0)
+        self.assertEqual(histogram.percentile(60), 2.0)
+        self.assertEqual(histogram.percentile(100), 9.0)
+        self.assertAlmostEqual(histogram.to_dict()['mean'], 3.14)
+
+    def test_timed_records_errors(self):
+        """timed ghi độ trễ kèm trạng thái lỗi và không nuốt exception"""
+        registry = MetricsRegistry()
+        with self.assertRaises(ValueError):
+            with timed(registry, 'gemini.latency', operation='fix'):
+                raise ValueError('lỗi')
+        histogram = registry.snapshot('gemini.')['histograms'][0]
+        self.assertEqual(histogram['labels'], {'operation': 'fix', 'status': 'error'})
+        self.assertEqual(histogram['count'], 1)
+
+class TestMetricsRollup(DatabaseTestCase):
+    def test_rollup_accumulates_deltas(self):
+        """Rollup chỉ ghi phần mới và cộng dồn vào bucket hiện tại"""
+        registry = MetricsRegistry()
+        registry.inc('gemini.prompt_tokens', 100, operation='fix')
+        self.assertEqual(registry.rollup(self.db), 1)
+        self.assertEqual(registry.rollup(self.db), 0)
+        registry.inc('gemini.prompt_tokens', 50, operation='fix')
+        registry.rollup(self.db)
+        self.assertEqual(self.db.execute_query("SELECT SUM(sum) FROM metrics_rollup", use_cache=False)[0][0], 150)
+
+    def test_rollup_invalidates_query_cache(self):
+        """Ghi rollup làm mới cache của execute_query"""
+        registry = MetricsRegistry()
+        registry.inc('gemini.requests', operation='fix')
+        registry.rollup(self.db)
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM metrics_rollup")[0][0], 1)
+        registry.inc('gemini.requests', operation='review')
+        registry.rollup(self.db)
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM metrics_rollup")[0][0], 2)
+
+if __name__ == '__main__':
+    unittest.main()
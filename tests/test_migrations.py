@@ -0,0 +1,59 @@
+import sqlite3
+import unittest
+from models.database_migrations import MIGRATIONS
+from models.migrations import Migration, SchemaMigrator
+
+class TestSchemaMigrator(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.migrations = [
+            Migration(1, 'tạo bảng', ["CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"]),
+            Migration(2, 'thêm cột', ["ALTER TABLE items ADD COLUMN tag TEXT"]),
+        ]
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_applies_pending_once(self):
+        """Chỉ chạy các migration chưa áp dụng, phiên bản lưu trong user_version"""
+        migrator = SchemaMigrator(self.migrations)
+        self.assertEqual(migrator.migrate(self.conn), 2)
+        self.assertEqual(self.conn.execute("PRAGMA user_version").fetchone()[0], 2)
+        # Chạy lại không lỗi dù ALTER TABLE không idempotent
+        self.assertEqual(migrator.migrate(self.conn), 2)
+
+    def test_component_versions_are_independent(self):
+        """Phiên bản theo component không đụng đến user_version"""
+        SchemaMigrator(self.migrations[:1], component='items').migrate(self.conn)
+        self.assertEqual(self.conn.execute("PRAGMA user_version").fetchone()[0], 0)
+        self.assertEqual(SchemaMigrator(self.migrations, component='items').current_version(self.conn), 1)
+
+    def test_failed_migration_rolls_back(self):
+        """Migration lỗi được rollback toàn bộ, phiên bản không đổi"""
+        broken = self.migrations + [Migration(3, 'lỗi', ["INSERT INTO items (name) VALUES ('a')", "SELECT * FROM missing"])]
+        SchemaMigrator(self.migrations).migrate(self.conn)
+        with self.assertRaises(sqlite3.Error):
+            SchemaMigrator(broken).migrate(self.conn)
+        self.assertEqual(self.conn.execute("PRAGMA user_version").fetchone()[0], 2)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+
+class TestDatabaseMigrations(unittest.TestCase):
+    def test_upgrades_legacy_database(self):
+        """Database cũ (user_version 0) được bổ sung cột và bảng; lần khởi động sau chỉ kiểm tra phiên bản"""
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE weather_data (id INTEGER PRIMARY KEY AUTOINCREMENT, temperature REAL)")
+        migrator = SchemaMigrator(MIGRATIONS)
+        self.assertEqual(migrator.migrate(conn), migrator.latest_version)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(weather_data)")}
+        self.assertTrue({'city', 'feels_like', 'timestamp'} <= columns)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertTrue({'reminders', 'schedule', 'update_interval_models'} <= tables)
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        migrator.migrate(conn)
+        self.assertEqual(statements, ["PRAGMA user_version"])
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from controllers.services.model_registry import FAILED, READY, ModelHandle, ModelRegistry
+
+# Model giả thay cho sentence_transformers, dùng được cả trong tiến trình con (spawn dùng lại sys.path)
+FAKE_SENTENCE_TRANSFORMERS = '''
+import numpy as np
+
+class SentenceTransformer:
+    def __init__(self, model_name):
+        if model_name == 'missing-model':
+            raise OSError("model not found")
+        self.model_name = model_name
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        return np.array([[len(text), float(normalize_embeddings), float(convert_to_numpy)] for text in sentences])
+'''
+
+class TestModelRegistry(unittest.TestCase):
+    """Kiểm tra ModelHandle ở chế độ cùng tiến trình và tiến trình riêng"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(cls._tmp.name, 'sentence_transformers.py'), 'w', encoding='utf-8') as f:
+            f.write(FAKE_SENTENCE_TRANSFORMERS)
+        sys.path.insert(0, cls._tmp.name)
+        cls._saved_module = sys.modules.pop('sentence_transformers', None)
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(cls._tmp.name)
+        sys.modules.pop('sentence_transformers', None)
+        if cls._saved_module is not None:
+            sys.modules['sentence_transformers'] = cls._saved_module
+        cls._tmp.cleanup()
+
+    def _check_encode(self, handle):
+        try:
+            vectors = handle.encode(['timeout', 'db'], timeout=60, normalize_embeddings=True)
+            self.assertEqual(handle.state, READY)
+            self.assertEqual(vectors.dtype, np.float32)
+            np.testing.assert_array_equal(vectors, [[7, 1, 1], [2, 1, 1]])
+        finally:
+            handle.close()
+
+    def test_encode_in_process(self):
+        """Encode trong cùng tiến trình, kwargs được chuyển tiếp"""
+        self._check_encode(ModelHandle('fake-model'))
+
+    def test_encode_in_child_process(self):
+        """Encode qua tiến trình riêng không truyền trùng convert_to_numpy"""
+        self._check_encode(ModelHandle('fake-model', use_process=True))
+
+    def test_load_failure(self):
+        """Tải model lỗi thì encode trả về None và trạng thái là FAILED"""
+        handle = ModelHandle('missing-model')
+        self.assertIsNone(handle.encode('timeout', timeout=10))
+        self.assertEqual(handle.state, FAILED)
+        self.assertIn('model not found', handle.error)
+
+    def test_registry_mode_conflict(self):
+        """Yêu cầu chế độ khác với handle đã đăng ký được cảnh báo; None dùng handle sẵn có"""
+        self.addCleanup(ModelRegistry._handles.pop, 'registry-model', None)
+        handle = ModelRegistry.get('registry-model', use_process=True)
+        self.assertIs(ModelRegistry.get('registry-model'), handle)
+        with self.assertLogs('controllers.services.model_registry', level='WARNING'):
+            self.assertIs(ModelRegistry.get('registry-model', use_process=False), handle)
+        self.assertTrue(handle.use_process)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from scripts.query_profile import show_query_profile
+from tests.database_test_case import DatabaseTestCase
+
+class TestQueryProfiler(DatabaseTestCase):
+    """Kiểm tra đo truy vấn và log truy vấn chậm"""
+
+    def test_disabled_by_default(self):
+        """Không bật thì không đo gì"""
+        self.assertIsNone(self.db.profiler)
+        self.db.execute_query("SELECT 1")
+
+    def test_records_queries_cache_hits_and_callers(self):
+        """Ghi số lần, số dòng, trúng cache, nơi gọi và transaction"""
+        profiler = self.db.enable_profiling(slow_query_ms=10000)
+        self.db.execute_transaction([
+            ("INSERT INTO app_launches (launch_time) VALUES (?)", ('2030-01-01',)),
+            ("INSERT INTO app_launches (launch_time) VALUES (?)", ('2030-01-02',))
+        ])
+        self.db.execute_query("SELECT launch_time FROM app_launches")
+        self.db.execute_query("SELECT launch_time FROM app_launches")
+
+        summary = {(item['kind'], item['sql']): item for item in profiler.get_summary()}
+        select = summary[('execute_query', 'SELECT launch_time FROM app_launches')]
+        self.assertEqual((select['calls'], select['rows'], select['cache_hits']), (2, 4, 1))
+        self.assertIn('test_query_profiler.py', select['callers'][0]['site'])
+        insert = summary[('execute_transaction', 'INSERT INTO app_launches (launch_time) VALUES (?)')]
+        self.assertEqual((insert['calls'], insert['rows']), (2, 2))
+        self.assertEqual(summary[('transaction', 'TRANSACTION')]['rows'], 2)
+        self.assertEqual(profiler.get_slow_queries(), [])
+
+    def test_slow_query_plan_and_trace(self):
+        """Truy vấn vượt ngưỡng được lưu kèm query plan; chế độ trace ghi mọi câu lệnh"""
+        profiler = self.db.enable_profiling(slow_query_ms=0, trace=True)
+        self.db.get_reminders('pending')
+        slow = profiler.get_slow_queries()
+        self.assertTrue(any('reminders' in query['sql'] and query['plan'] for query in slow))
+        self.assertTrue(any('FROM reminders' in statement['sql'] for statement in profiler.get_trace()))
+
+        path = os.path.join('logs', 'query_profile.json')
+        profiler.dump(path)
+        self.assertEqual(show_query_profile(path, show_trace=True), 0)
+
+        self.db.disable_profiling()
+        self.assertIsNone(self.db.profiler)
+
+if __name__ == '__main__':
+    unittest.main()
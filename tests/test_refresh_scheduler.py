@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+from services.refresh_scheduler import RefreshScheduler
+
+class FakeRoot:
+    """Giả lập Tk root: after() chỉ ghi lại callback, test tự gọi"""
+    def __init__(self):
+        self.pending = {}
+        self.bindings = {}
+        self._next_id = 0
+
+    def after(self, delay_ms, callback):
+        self._next_id += 1
+        self.pending[self._next_id] = (delay_ms, callback)
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def bind(self, sequence, handler, add=None):
+        self.bindings[sequence] = handler
+
+    def fire(self):
+        after_id, (_, callback) = self.pending.popitem()
+        callback()
+
+class TestRefreshScheduler(unittest.TestCase):
+    def setUp(self):
+        self.root = FakeRoot()
+        self.scheduler = RefreshScheduler(self.root)
+        self.calls = []
+
+    def test_single_timer_and_coalescing(self):
+        """Test các job đến hạn cùng lúc chỉ dùng một lần thức dậy"""
+        with patch('services.refresh_scheduler.time.monotonic', return_value=100.0):
+            self.scheduler.add_job('a', lambda: self.calls.append('a'), interval=1)
+            self.scheduler.add_job('b', lambda: self.calls.append('b'), interval=1, initial_delay=0.1)
+            self.scheduler.start()
+            self.assertEqual(len(self.root.pending), 1)
+            self.root.fire()
+        self.assertEqual(sorted(self.calls), ['a', 'b'])
+        self.assertEqual(self.scheduler.wakeups, 1)
+        self.assertEqual(len(self.root.pending), 1)
+
+    def test_interval_provider(self):
+        """Test khoảng thời gian lấy từ interval_provider"""
+        with patch('services.refresh_scheduler.time.monotonic', return_value=0.0):
+            job = self.scheduler.add_job('weather', lambda: None, interval_provider=lambda: 300)
+            self.scheduler.start()
+            self.root.fire()
+        self.assertEqual(job.next_run, 300.0)
+
+    def test_pause_defers_jobs(self):
+        """Test job bị hoãn khi cửa sổ thu nhỏ và chạy bù khi hiện lại"""
+        with patch('services.refresh_scheduler.time.monotonic', return_value=0.0):
+            self.scheduler.add_job('clock', lambda: self.calls.append('clock'), interval=1)
+            self.scheduler.start()
+            self.scheduler.pause()
+            self.root.fire()
+            self.assertEqual(self.calls, [])
+            self.assertEqual(self.root.pending, {})
+            self.scheduler.resume()
+            self.root.fire()
+        self.assertEqual(self.calls, ['clock'])
+
+    def test_remove_job(self):
+        """Test job đã hủy không được chạy"""
+        with patch('services.refresh_scheduler.time.monotonic', return_value=0.0):
+            self.scheduler.add_job('a', lambda: self.calls.append('a'), interval=1)
+            self.scheduler.start()
+            self.scheduler.remove_job('a')
+        self.assertEqual(self.root.pending, {})
+        self.assertEqual(self.calls, [])
+
+if __name__ == '__main__':
+    unittest.main()
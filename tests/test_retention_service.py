@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime, timedelta
+from services.retention_service import RetentionService
+from tests.database_test_case import DatabaseTestCase
+
+class TestRetentionService(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        old = (datetime.now() - timedelta(days=40)).isoformat()
+        recent = datetime.now().isoformat()
+        self.db.execute_transaction([
+            ("INSERT INTO update_history (service_type, update_time, data_changed, user_interaction, response_time) "
+             "VALUES (?, ?, ?, ?, ?)", row)
+            for row in [('greeting', old, 1, 0, 0.1)] * 3 + [('weather', recent, 0, 1, 0.2)] * 2
+        ])
+        self.service = RetentionService(self.db, {'raw_ttl_days': {'update_history': 14}})
+
+    def _scalar(self, query):
+        return self.db.execute_query(query, use_cache=False)[0][0]
+
+    def test_rollup_before_ttl(self):
+        """Test dữ liệu thô quá hạn bị xóa nhưng vẫn còn trong rollup"""
+        summary = self.service.run_once()
+        self.assertEqual(summary['rolled_up']['update_history'], 5)
+        self.assertEqual(summary['deleted']['update_history'], 3)
+
+        daily = {row[0]: row[1] for row in self.db.execute_query("SELECT service_type, updates FROM update_history_daily")}
+        self.assertEqual(daily, {'greeting': 3.0, 'weather': 2.0})
+        self.assertEqual(self._scalar("SELECT COUNT(*) FROM update_history"), 2)
+
+    def test_rollup_is_incremental(self):
+        """Test chạy lại không gộp trùng dữ liệu đã gộp"""
+        self.service.run_once()
+        summary = self.service.run_once()
+        self.assertEqual(summary['rolled_up']['update_history'], 0)
+        self.assertEqual(self._scalar("SELECT SUM(updates) FROM update_history_hourly"), 5.0)
+
+    def test_ttl_keeps_rows_not_rolled_up(self):
+        """Dòng chưa được gộp (rollup bị bỏ qua) không bị TTL xóa"""
+        self.service._roll_up = lambda conn, rollup: 0
+        summary = self.service.run_once()
+        self.assertEqual(summary['deleted']['update_history'], 0)
+        self.assertEqual(self._scalar("SELECT COUNT(*) FROM update_history"), 5)
+
+    def test_no_full_vacuum_in_background_pass(self):
+        """Retention không VACUUM đầy đủ khi database chưa ở chế độ incremental"""
+        self.assertEqual(self._scalar("PRAGMA auto_vacuum"), 0)
+        self.assertIsNone(self.service.run_once()['vacuum'])
+        self.assertEqual(self._scalar("PRAGMA auto_vacuum"), 0)
+
+    def test_compound_index_created(self):
+        """Test index (service_type, update_time) được tạo bởi migration, không phải lúc chạy retention"""
+        indexes = [row[1] for row in self.db.execute_query("PRAGMA index_list(update_history)", use_cache=False)]
+        self.assertIn('idx_update_history_service_time', indexes)
+
+if __name__ == '__main__':
+    unittest.main()
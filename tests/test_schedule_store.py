@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime
+from models.schedule import ScheduleStore, ScheduleSlot, TIME_SLOTS, TIMETABLE, parse_time_range, extract_tags
+
+class TestScheduleStore(unittest.TestCase):
+    def setUp(self):
+        self.store = ScheduleStore.from_timetable(TIME_SLOTS, TIMETABLE)
+
+    def test_parse_time_range(self):
+        """Test tách khung giờ với nhiều loại dấu gạch"""
+        self.assertEqual(parse_time_range('06:00 – 08:00'), (360, 480))
+        self.assertEqual(parse_time_range('20:00-22:00'), (1200, 1320))
+        self.assertIsNone(parse_time_range('không hợp lệ'))
+
+    def test_tags_precomputed(self):
+        """Test nhãn hoạt động được gắn sẵn"""
+        self.assertIn('gym', extract_tags('Gym (tối)'))
+        self.assertNotIn('gym', extract_tags('Ôn tập nhanh tất cả\nmôn (2h)'))
+
+    def test_gym_matches_tap(self):
+        """'tập' vẫn được nhận là tập gym như trước, trừ cụm 'ôn tập' và 'tập trung'"""
+        for subject in ('Tập gym', 'Đi tập', 'Tập thể dục buổi sáng', 'Ôn tập xong đi tập'):
+            self.assertIn('gym', extract_tags(subject), subject)
+        self.assertEqual(extract_tags('Ôn tập Toán'), frozenset({'review'}))
+        self.assertNotIn('gym', extract_tags('Tập trung làm dự án'))
+        self.assertTrue(self.store.has_activity('gym', 'Thứ Hai'))
+        self.assertTrue(self.store.has_activity('work', 'Saturday'))
+        self.assertFalse(self.store.has_activity('work', 0))
+
+    def test_current_activity(self):
+        """Test tra hoạt động đang diễn ra"""
+        monday_morning = datetime(2024, 1, 1, 9, 0)  # Thứ Hai
+        self.assertEqual(self.store.current_activity(monday_morning).subject, 'Trí tuệ nhân tạo')
+        self.assertIsNone(self.store.current_activity(datetime(2024, 1, 1, 12, 0)))
+
+    def test_next_activity(self):
+        """Test tra hoạt động kế tiếp, kể cả sang ngày hôm sau"""
+        self.assertEqual(self.store.next_activity(datetime(2024, 1, 1, 12, 0)).start, 14 * 60)
+        late_monday = self.store.next_activity(datetime(2024, 1, 1, 23, 0))
+        self.assertEqual((late_monday.day, late_monday.subject), (1, 'Trí tuệ nhân tạo'))
+
+    def test_from_rows(self):
+        """Test dựng store từ các dòng của bảng schedule"""
+        rows = [
+            {'day_of_week': 'Thứ 2', 'start_time': '17:00', 'end_time': '18:00', 'subject': 'Tập gym'},
+            {'day_of_week': 'Unknown', 'start_time': '17:00', 'end_time': '18:00', 'subject': 'Bỏ qua'},
+        ]
+        store = ScheduleStore.from_rows(rows)
+        self.assertEqual(store.count_for_day('Monday'), 1)
+        self.assertEqual(store.count_for_day('Tuesday'), 0)
+        self.assertIsInstance(store.slots_for_day(0)[0], ScheduleSlot)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import io
+import os
+import tempfile
+import unittest
+
+from utils.security import SecurityManager
+
+class TestSecureStore(unittest.TestCase):
+    """Kiểm tra định dạng mã hóa v2 theo chunk và tương thích với file v1"""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self.security = SecurityManager()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_stream_round_trip_and_truncation(self):
+        """Giải mã đúng dữ liệu nhiều chunk, phát hiện dữ liệu bị cắt"""
+        data = os.urandom(200_001)
+        encrypted = io.BytesIO()
+        self.security.encrypt_stream(io.BytesIO(data), encrypted, chunk_size=4096)
+        self.assertEqual(self.security.decrypt_bytes(encrypted.getvalue()), data)
+        with self.assertRaises(ValueError):
+            self.security.decrypt_bytes(encrypted.getvalue()[:-4200])
+
+    def test_reads_v1_files(self):
+        """File v1 (base64 của Fernet token) vẫn đọc được, file mới ghi theo v2"""
+        payload = {'token': 'abc', 'count': 3}
+        with open(self.security._storage_file('legacy'), 'w') as f:
+            f.write(self.security.encrypt_data(payload))
+        self.assertEqual(self.security.secure_retrieve('legacy'), payload)
+        self.security.secure_store('current', payload)
+        self.assertEqual(self.security.secure_retrieve('current'), payload)
+
+    def test_password_cache(self):
+        """Hash password ổn định với cùng salt và xác thực sai password"""
+        key, salt = self.security.hash_password('secret')
+        self.assertEqual(self.security.hash_password('secret', salt)[0], key)
+        self.assertTrue(self.security.verify_password('secret', key, salt))
+        self.assertFalse(self.security.verify_password('wrong', key, salt))
+
+    def test_password_cache_key_unambiguous(self):
+        """Salt chứa byte 0 không làm hai cặp (salt, password) dùng chung mục cache"""
+        first, _ = self.security.hash_password('c', b'a\x00b')
+        second, _ = self.security.hash_password('b\x00c', b'a')
+        self.assertNotEqual(first, second)
+
+if __name__ == '__main__':
+    unittest.main()
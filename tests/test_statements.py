@@ -0,0 +1,51 @@
+import unittest
+
+from models.statements import STATEMENTS, StatementRegistry
+from tests.database_test_case import DatabaseTestCase
+
+class TestStatementRegistry(DatabaseTestCase):
+    """Kiểm tra registry câu lệnh có tên"""
+
+    def setUp(self):
+        super().setUp()
+        STATEMENTS.reset_stats()
+
+    def test_validate_rejects_bad_sql(self):
+        """Câu lệnh sai tên cột bị phát hiện khi kiểm tra, không phải lúc chạy"""
+        registry = StatementRegistry()
+        registry.register('ok', "SELECT id FROM reminders WHERE status = ?")
+        registry.register('bad', "SELECT missing_column FROM reminders")
+        with self.assertRaises(ValueError) as context:
+            registry.validate(self.db.conn)
+        self.assertIn('bad', str(context.exception))
+        self.assertNotIn('ok:', str(context.exception))
+
+    def test_run_records_stats(self):
+        """run trả về bản ghi và đếm số lần gọi, số dòng của từng câu lệnh"""
+        reminder_id = self.db.add_reminder("Họp", "Phòng 2", "2030-01-01")
+        self.db.add_reminder("Gọi điện", None, "2030-01-02")
+        records = self.db.run('reminders.by_status', ('pending',))
+        self.assertEqual([record.title for record in records], ["Họp", "Gọi điện"])
+        self.assertTrue(self.db.update_reminder_status(reminder_id, 'done'))
+        self.assertEqual(len(self.db.get_reminders('pending')), 1)
+
+        stats = {item['name']: item for item in self.db.get_statement_stats()}
+        self.assertEqual(stats['reminders.insert']['calls'], 2)
+        self.assertEqual(stats['reminders.by_status']['calls'], 2)
+        self.assertEqual(stats['reminders.by_status']['rows'], 3)
+        self.assertEqual(stats['reminders.update_status']['rows'], 1)
+
+    def test_unknown_statement(self):
+        """Tên chưa đăng ký báo lỗi rõ ràng"""
+        with self.assertRaises(KeyError):
+            self.db.run('reminders.nope')
+
+    def test_cache_roundtrip_in_one_transaction(self):
+        """set_cache chạy hai câu lệnh có tên trong cùng một transaction"""
+        self.db.set_cache('weather:hanoi', {'temp': 30})
+        self.db.set_cache('weather:hanoi', {'temp': 31})
+        self.assertEqual(self.db.get_cache('weather:hanoi'), {'temp': 31})
+        self.assertEqual(len(self.db.execute_query("SELECT id FROM api_cache", use_cache=False)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
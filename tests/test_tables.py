@@ -0,0 +1,52 @@
+import sqlite3
+import unittest
+
+from models.tables import USER_INTERACTIONS_LOG, WEATHER_DATA
+
+class TestTableDefinitions(unittest.TestCase):
+    """Kiểm tra định nghĩa bảng khai báo và bản ghi __slots__"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_rebuild_keeps_rows_and_renamed_columns(self):
+        """Bảng cũ được dựng lại theo định nghĩa, dữ liệu cột đổi tên được giữ"""
+        self.conn.execute(
+            "CREATE TABLE user_interactions_log (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "interaction_type TEXT NOT NULL, details TEXT, timestamp TEXT)"
+        )
+        self.conn.execute("INSERT INTO user_interactions_log (interaction_type, details) VALUES ('open_vscode', '{}')")
+        USER_INTERACTIONS_LOG.rebuild(self.conn, renames={'action_type': ('interaction_type',), 'facts': ('details',)})
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(user_interactions_log)")]
+        self.assertEqual(tuple(columns), USER_INTERACTIONS_LOG.column_names)
+        record = USER_INTERACTIONS_LOG.select(self.conn)[0]
+        self.assertEqual((record.action_type, record['facts']), ('open_vscode', '{}'))
+
+    def test_records_use_slots(self):
+        """Bản ghi không có __dict__ nhưng vẫn đọc được như dict"""
+        WEATHER_DATA.rebuild(self.conn)
+        self.conn.execute(WEATHER_DATA.insert_sql('temperature', 'icon', 'clouds'), (21.5, '04d', 75))
+        record = WEATHER_DATA.select(self.conn, "ORDER BY id DESC LIMIT 1")[0]
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(dict(record)['clouds'], 75)
+        self.assertEqual(record.get('city'), 'Unknown')
+        with self.assertRaises(KeyError):
+            record['missing']
+
+    def test_records_index_by_position(self):
+        """Bản ghi đọc được theo vị trí cột như sqlite3.Row"""
+        WEATHER_DATA.rebuild(self.conn)
+        self.conn.execute(WEATHER_DATA.insert_sql('city', 'temperature'), ('Hà Nội', 30.5))
+        record = WEATHER_DATA.select(self.conn)[0]
+        self.assertEqual((record[0], record[1], record[2]), (1, 'Hà Nội', 30.5))
+        self.assertEqual(record[-1], record.timestamp)
+        self.assertEqual(record[1:3], ('Hà Nội', 30.5))
+        self.assertEqual(len(record), len(WEATHER_DATA.column_names))
+        with self.assertRaises(IndexError):
+            record[len(WEATHER_DATA.column_names)]
+
+if __name__ == '__main__':
+    unittest.main()
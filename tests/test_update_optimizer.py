@@ -0,0 +1,151 @@
+import math
+import unittest
+from datetime import datetime, timedelta
+
+from controllers.services.update_optimizer_service import ServiceIntervalModel, UpdateOptimizerService
+from tests.database_test_case import DatabaseTestCase
+
+class TestServiceIntervalModel(unittest.TestCase):
+    """Kiểm tra cập nhật EWMA của mô hình interval"""
+
+    def test_ewma_update(self):
+        """Mẫu đầu tiên gán trực tiếp, các mẫu sau cập nhật theo alpha"""
+        model = ServiceIntervalModel('weather', alpha=0.5)
+        model.observe(0.0, True, False, 1.0)
+        self.assertEqual((model.change_rate, model.interaction_rate, model.response_time), (1.0, 0.0, 1.0))
+        self.assertIsNone(model.ewma_gap)
+        self.assertEqual(model.optimal_interval(10, 1000), 1000)
+
+        model.observe(100.0, False, True, 3.0)
+        model.observe(300.0, False, False, 2.0)
+        self.assertEqual(model.samples, 3)
+        self.assertEqual(model.last_update, 300.0)
+        self.assertEqual((model.change_rate, model.interaction_rate, model.response_time), (0.25, 0.25, 2.0))
+        self.assertEqual(model.ewma_gap, 150.0)
+        self.assertEqual(model.gap_variance, 2500.0)
+        # 150 giây, tương tác ít (< 0.3) nên giãn thêm 10%
+        self.assertEqual(model.optimal_interval(10, 1000), 165)
+        self.assertAlmostEqual(model.confidence(1000), 0.03 * 0.95)
+
+class TestUpdateOptimizerCheckpoint(DatabaseTestCase):
+    """Kiểm tra lưu và nạp lại checkpoint mô hình"""
+
+    def setUp(self):
+        super().setUp()
+        self.services = []
+
+    def tearDown(self):
+        # Checkpoint cuối cần database còn mở
+        for service in self.services:
+            service.close()
+        super().tearDown()
+
+    def _service(self):
+        service = UpdateOptimizerService()
+        service.checkpoint_every = 1000
+        self.services.append(service)
+        return service
+
+    def _samples(self, service_type):
+        return self.db.execute_query(
+            "SELECT samples FROM update_interval_models WHERE service_type = ?", (service_type,), use_cache=False
+        )[0][0]
+
+    def test_checkpoint_round_trip(self):
+        """Mô hình nạp lại từ checkpoint giống hệt mô hình trong bộ nhớ"""
+        service = self._service()
+        for changed, interaction in ((True, True), (False, True), (True, False)):
+            service.log_update('weather', changed, interaction, 0.5)
+        model = service.models['weather']
+        service.checkpoint()
+
+        restored = self._service().models['weather']
+        for field in ('last_update', 'ewma_gap', 'gap_variance', 'change_rate',
+                      'interaction_rate', 'response_time', 'samples'):
+            self.assertEqual(getattr(restored, field), getattr(model, field), field)
+        row = self.db.execute_query(
+            "SELECT interval, confidence FROM optimal_update_intervals WHERE service_type = 'weather'", use_cache=False
+        )[0]
+        self.assertEqual(row['interval'], service.get_optimal_interval('weather'))
+        self.assertAlmostEqual(row['confidence'], model.confidence(service.max_update_interval))
+
+    def test_checkpoint_writes_only_changed_models(self):
+        """Hai instance cập nhật service khác nhau không ghi đè mô hình của nhau"""
+        first = self._service()
+        first.log_update('weather', True, False, 0.1)
+        first.checkpoint()
+        second = self._service()
+
+        first.log_update('weather', True, False, 0.1)
+        first.checkpoint()
+        second.log_update('news', False, True, 0.2)
+        second.checkpoint()
+        # second vẫn giữ mô hình weather cũ (1 mẫu) nhưng không ghi lại nó
+        self.assertEqual(second.models['weather'].samples, 1)
+        self.assertEqual(self._samples('weather'), 2)
+        self.assertEqual(self._samples('news'), 1)
+
+    def test_close_saves_pending_updates(self):
+        """close() lưu các cập nhật chưa checkpoint"""
+        service = self._service()
+        service.log_update('weather', True, False, 0.1)
+        service.close()
+        self.assertEqual(self._samples('weather'), 1)
+
+class TestAnalyzeAllPatterns(DatabaseTestCase):
+    """So sánh thống kê vector hóa với giá trị tính tay trên lịch sử nhỏ"""
+
+    def setUp(self):
+        super().setUp()
+        self.service = UpdateOptimizerService()
+        self.addCleanup(self.service.close)
+        self.service.decay_factor = 0.5
+        self.service.max_update_interval = 10 ** 6
+        now = datetime.now()
+        history = [
+            ('weather', now - timedelta(days=3), True, False),
+            ('weather', now - timedelta(days=1), False, True),
+            ('weather', now, True, True),
+            ('news', now - timedelta(days=2), False, False),
+            # Ngoài cửa sổ 7 ngày
+            ('weather', now - timedelta(days=8), True, True)
+        ]
+        with self.db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO update_history (service_type, update_time, data_changed, user_interaction) "
+                "VALUES (?, ?, ?, ?)",
+                [(service, updated.isoformat(), changed, interaction) for service, updated, changed, interaction in history]
+            )
+
+    def test_decay_weighted_stats(self):
+        """Trọng số 0.5^tuổi (ngày): 1/8, 1/2, 1 cho ba lần cập nhật của weather"""
+        results = self.service.analyze_all_patterns()
+        self.assertEqual(sorted(results), ['news', 'weather'])
+
+        weather = results['weather']
+        self.assertEqual(weather['samples'], 3)
+        self.assertAlmostEqual(weather['data_change_rate'], (0.125 + 1) / 1.625, places=4)
+        self.assertAlmostEqual(weather['user_interaction_rate'], (0.5 + 1) / 1.625, places=4)
+        # Khoảng cách 2 ngày (trọng số 1/2) và 1 ngày (trọng số 1)
+        self.assertAlmostEqual(weather['mean_gap'], 115200, delta=2)
+        self.assertAlmostEqual(weather['gap_std'], 28800 * math.sqrt(2), delta=2)
+        # Median có trọng số là 1 ngày; đổi nhiều (x0.8) và tương tác nhiều (x0.9)
+        self.assertAlmostEqual(weather['interval'], 86400 * 0.8 * 0.9, delta=2)
+        self.assertAlmostEqual(weather['confidence'], 0.03 * (1 - 28800 * math.sqrt(2) / 10 ** 6), places=4)
+
+        news = results['news']
+        self.assertEqual((news['samples'], news['mean_gap'], news['confidence']), (1, None, 0.0))
+        self.assertEqual(news['interval'], 10 ** 6)
+
+    def test_single_service(self):
+        """Lọc theo service cho cùng kết quả với lần quét toàn bộ"""
+        single = self.service.analyze_all_patterns(service_type='weather')
+        full = self.service.analyze_all_patterns()['weather']
+        self.assertEqual(list(single), ['weather'])
+        for key, value in full.items():
+            self.assertAlmostEqual(single['weather'][key], value, places=4, msg=key)
+        self.assertEqual(self.service.analyze_update_patterns('missing'),
+                         {'interval': 10 ** 6, 'confidence': 0.0})
+
+if __name__ == '__main__':
+    unittest.main()
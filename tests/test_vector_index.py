@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from controllers.services.vector_index import VectorIndex
+
+class TestVectorIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.vectors = rng.normal(size=(500, 32)).astype(np.float32)
+        self.ids = list(range(1, 501))
+        self.labels = ['weather' if i % 2 else 'greeting' for i in self.ids]
+
+    def _brute_force(self, query, top_k, rows=None):
+        vectors = VectorIndex.normalize(self.vectors)
+        scores = vectors @ VectorIndex.normalize(query)
+        order = [i for i in np.argsort(-scores) if rows is None or i in rows]
+        return [self.ids[i] for i in order[:top_k]]
+
+    def test_flat_search_matches_brute_force(self):
+        """Tìm kiếm phẳng cho kết quả giống tính toán trực tiếp"""
+        index = VectorIndex(ivf_threshold=10 ** 6)
+        index.add(self.ids, self.vectors, self.labels)
+        query = self.vectors[7] + 0.01
+        result = [error_id for error_id, _ in index.search(query, top_k=5)]
+        self.assertEqual(result, self._brute_force(query, 5))
+        self.assertEqual(result[0], 8)
+
+    def test_label_filter(self):
+        """Lọc theo service chỉ trả về các vector cùng nhãn"""
+        index = VectorIndex(ivf_threshold=10 ** 6)
+        index.add(self.ids, self.vectors, self.labels)
+        query = self.vectors[10]
+        greeting_rows = {i for i, label in enumerate(self.labels) if label == 'greeting'}
+        result = [error_id for error_id, _ in index.search(query, top_k=3, label='greeting')]
+        self.assertEqual(result, self._brute_force(query, 3, greeting_rows))
+
+    def test_ivf_finds_exact_match(self):
+        """Chỉ mục IVF vẫn tìm thấy chính vector truy vấn"""
+        index = VectorIndex(ivf_threshold=100, n_probe=4)
+        for start in range(0, 500, 50):
+            index.add(self.ids[start:start + 50], self.vectors[start:start + 50], self.labels[start:start + 50])
+        self.assertIsNotNone(index._centroids)
+        for row in (0, 123, 499):
+            self.assertEqual(index.search(self.vectors[row], top_k=1)[0][0], self.ids[row])
+
+    def test_save_and_memmap_load(self):
+        """Chỉ mục được lưu và nạp lại bằng memory-map, vẫn thêm được vector mới"""
+        index = VectorIndex(ivf_threshold=10 ** 6)
+        index.add(self.ids[:400], self.vectors[:400], self.labels[:400])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'errors')
+            index.save(path)
+            loaded = VectorIndex.load(path, ivf_threshold=10 ** 6)
+            self.assertIsInstance(loaded._matrix, np.memmap)
+            self.assertEqual(len(loaded), 400)
+            self.assertEqual(loaded.max_id(), 400)
+            loaded.add(self.ids[400:], self.vectors[400:], self.labels[400:])
+            self.assertEqual(loaded.search(self.vectors[450], top_k=1)[0][0], 451)
+            del loaded
+
+    def test_load_rejects_incomplete_save(self):
+        """Bộ file không khớp số dòng hoặc thiếu manifest thì load trả về None"""
+        index = VectorIndex(ivf_threshold=10 ** 6)
+        index.add(self.ids[:100], self.vectors[:100], self.labels[:100])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'errors')
+            index.save(path)
+            # Giả lập lần lưu bị ngắt giữa chừng: file id đã là bản mới, ma trận vẫn là bản cũ
+            np.save(f"{path}.ids.npy", np.arange(1, 151, dtype=np.int64))
+            self.assertIsNone(VectorIndex.load(path, mmap=False))
+
+            index.save(path)
+            self.assertEqual(len(VectorIndex.load(path, mmap=False)), 100)
+            self.assertEqual(sorted(os.listdir(tmpdir)), [
+                'errors.ids.npy', 'errors.label_codes.npy', 'errors.labels.npy',
+                'errors.manifest.json', 'errors.vectors.npy'
+            ])
+
+            os.remove(f"{path}.manifest.json")
+            self.assertIsNone(VectorIndex.load(path, mmap=False))
+
+if __name__ == '__main__':
+    unittest.main()
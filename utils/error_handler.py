@@ -1,4 +1,7 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import traceback
 import sys
 from typing import Optional, Dict, Any
@@ -8,6 +11,12 @@ import os
 
 logger = logging.getLogger(__name__)
 
+# File log lỗi dạng NDJSON (mỗi dòng một lỗi), xoay vòng theo kích thước
+ERROR_LOG_FILE = os.path.join("logs", "errors.ndjson")
+ERROR_LOG_MAX_BYTES = 5 * 1024 * 1024
+ERROR_LOG_BACKUP_COUNT = 5
+TAIL_BLOCK_SIZE = 8192
+
 class AppError(Exception):
     """Base exception class for application errors"""
     def __init__(self, message: str, error_code: str = "UNKNOWN_ERROR", details: Optional[Dict[str, Any]] = None):
@@ -33,29 +42,69 @@ class SecurityError(AppError):
     """Security related errors"""
     pass
 
+class _JsonLineFormatter(logging.Formatter):
+    """Định dạng bản ghi lỗi thành một dòng JSON; traceback được dựng trên luồng ghi file"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        # RotatingFileHandler định dạng hai lần (kiểm tra kích thước rồi ghi), nên lưu lại kết quả
+        line = getattr(record, "json_line", None)
+        if line is None:
+            error_data = dict(record.error_data)
+            if record.exc_info:
+                error_data["traceback"] = "".join(traceback.format_exception(*record.exc_info))
+                record.exc_info = None
+            line = record.json_line = json.dumps(error_data, ensure_ascii=False, default=str)
+        return line
+
+class _ErrorQueueHandler(logging.handlers.QueueHandler):
+    """Đưa bản ghi vào hàng đợi nguyên trạng, không định dạng trên luồng gây lỗi"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
 class ErrorHandler:
-    def __init__(self):
-        self.error_log_file = os.path.join("logs", "errors.json")
-        os.makedirs(os.path.dirname(self.error_log_file), exist_ok=True)
+    def __init__(self, error_log_file: str = ERROR_LOG_FILE, max_bytes: int = ERROR_LOG_MAX_BYTES,
+                 backup_count: int = ERROR_LOG_BACKUP_COUNT):
+        self.error_log_file = error_log_file
+        self.backup_count = backup_count
+        os.makedirs(os.path.dirname(self.error_log_file) or ".", exist_ok=True)
+
+        # Luồng gây lỗi chỉ đẩy bản ghi vào hàng đợi; QueueListener ghi file trên luồng riêng
+        self._file_handler = logging.handlers.RotatingFileHandler(
+            self.error_log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        self._file_handler.setFormatter(_JsonLineFormatter())
+        self._queue = queue.SimpleQueue()
+        self._queue_handler = _ErrorQueueHandler(self._queue)
+        self._listener = logging.handlers.QueueListener(self._queue, self._file_handler)
+        self._listener.start()
+        atexit.register(self.close)
 
     def handle_error(self, error: Exception, context: Optional[Dict[str, Any]] = None) -> None:
-        """Xử lý và ghi log lỗi"""
+        """Xử lý và ghi log lỗi (không chặn luồng gọi)"""
         error_data = {
             "timestamp": datetime.now().isoformat(),
             "error_type": error.__class__.__name__,
             "message": str(error),
-            "traceback": traceback.format_exc(),
             "context": context or {}
         }
-        # Không ghi log lỗi ra file hoặc logger nữa
-        pass
-        # logger.error(f"Error occurred: {error_data['message']}")
-        # logger.debug(f"Error details: {json.dumps(error_data, indent=2)}")
-        # self._save_error_log(error_data)
-
-    def _save_error_log(self, error_data: Dict[str, Any]) -> None:
-        """Không lưu thông tin lỗi vào file nữa"""
-        pass
+        if isinstance(error, AppError):
+            error_data["error_code"] = error.error_code
+            error_data["details"] = error.details
+        self._save_error_log(error_data, (type(error), error, error.__traceback__))
+
+    def _save_error_log(self, error_data: Dict[str, Any], exc_info=None) -> None:
+        """Đưa thông tin lỗi vào hàng đợi ghi file"""
+        record = logging.LogRecord(__name__, logging.ERROR, __file__, 0, error_data["message"], None, exc_info)
+        record.error_data = error_data
+        # Gọi handler trực tiếp: logging toàn cục có thể đang bị tắt bằng logging.disable
+        self._queue_handler.handle(record)
+
+    def close(self) -> None:
+        """Ghi nốt các lỗi trong hàng đợi rồi đóng file"""
+        if self._listener._thread is not None:
+            self._listener.stop()
+        self._file_handler.close()
 
     def _handle_database_error(self, error: DatabaseError) -> None:
         """Xử lý lỗi database"""
@@ -82,14 +131,48 @@ class ErrorHandler:
         logger.error(f"Unknown error: {str(error)}")
         # Thêm logic xử lý lỗi không xác định ở đây
 
+    def _log_files(self) -> list:
+        """File log hiện tại cùng các file đã xoay vòng, mới trước cũ sau"""
+        files = [self.error_log_file]
+        files += [f"{self.error_log_file}.{index}" for index in range(1, self.backup_count + 1)]
+        return [path for path in files if os.path.exists(path)]
+
+    @staticmethod
+    def _tail_lines(path: str, limit: int) -> list:
+        """Đọc tối đa limit dòng cuối của file bằng cách đọc ngược từng khối"""
+        if limit <= 0:
+            # lines[-0:] là toàn bộ danh sách
+            return []
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= limit:
+                size = min(TAIL_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                data = f.read(size) + data
+        lines = [line for line in data.splitlines() if line.strip()]
+        return lines[-limit:]
+
     def get_error_logs(self, limit: int = 100) -> list:
-        """Lấy danh sách lỗi gần đây"""
-        try:
-            if os.path.exists(self.error_log_file):
-                with open(self.error_log_file, "r") as f:
-                    logs = json.load(f)
-                    return logs[-limit:]
+        """Lấy danh sách lỗi gần đây (cũ trước, mới sau) mà không đọc toàn bộ lịch sử"""
+        if limit <= 0:
             return []
+        try:
+            lines = []
+            for path in self._log_files():
+                lines = self._tail_lines(path, limit - len(lines)) + lines
+                if len(lines) >= limit:
+                    break
+            logs = []
+            for line in lines:
+                try:
+                    logs.append(json.loads(line))
+                except ValueError:
+                    # Dòng cuối có thể đang được ghi dở
+                    continue
+            return logs
         except Exception as e:
             logger.error(f"Failed to read error logs: {str(e)}")
             return []
@@ -97,8 +180,16 @@ class ErrorHandler:
     def clear_error_logs(self) -> None:
         """Xóa tất cả log lỗi"""
         try:
-            if os.path.exists(self.error_log_file):
-                os.remove(self.error_log_file)
+            self._file_handler.acquire()
+            try:
+                # Đóng file đang mở; delay=True sẽ mở lại ở lần ghi tiếp theo
+                if self._file_handler.stream:
+                    self._file_handler.stream.close()
+                    self._file_handler.stream = None
+                for path in self._log_files():
+                    os.remove(path)
+            finally:
+                self._file_handler.release()
             logger.info("Error logs cleared")
         except Exception as e:
             logger.error(f"Failed to clear error logs: {str(e)}")
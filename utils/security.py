@@ -1,18 +1,42 @@
 import os
+import io
 import base64
+import hashlib
+import hmac
+import struct
+from collections import OrderedDict
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import logging
 import json
-from typing import Dict, Any, Optional
+import threading
+from typing import BinaryIO, Dict, Any, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# Định dạng v2: header = magic, version, chunk_size, nonce prefix; sau đó là các chunk AES-GCM
+SECURE_MAGIC = b"MYS2"
+SECURE_VERSION = 2
+HEADER_FORMAT = ">4sBI8s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Mỗi chunk: độ dài ciphertext, cờ chunk cuối
+CHUNK_HEADER_FORMAT = ">IB"
+CHUNK_HEADER_SIZE = struct.calcsize(CHUNK_HEADER_FORMAT)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+PBKDF2_ITERATIONS = 100000
+DERIVED_KEY_CACHE_SIZE = 128
+
 class SecurityManager:
     def __init__(self):
         self._key = None
         self._fernet = None
+        self._aead = None
+        # Cache khóa dẫn xuất từ password trong phiên làm việc (khóa cache không chứa password gốc)
+        self._derived_keys: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._cache_secret = os.urandom(32)
+        self._cache_lock = threading.Lock()
         self._initialize()
 
     def _initialize(self):
@@ -32,13 +56,24 @@ class SecurityManager:
                     f.write(self._key)
 
             self._fernet = Fernet(self._key)
+            # Khóa AES-GCM cho định dạng v2 được dẫn xuất một lần từ khóa đã lưu
+            self._aead = AESGCM(self.derive_key(b"myai-secure-store-v2"))
             logger.info("Security manager initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize security manager: {str(e)}")
             raise
 
+    def derive_key(self, info: bytes, length: int = 32) -> bytes:
+        """Dẫn xuất khóa con từ khóa đã lưu cho một mục đích riêng (HKDF, info khác nhau cho từng mục đích)"""
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=length,
+            salt=None,
+            info=info,
+        ).derive(base64.urlsafe_b64decode(self._key))
+
     def encrypt_data(self, data: Dict[str, Any]) -> str:
-        """Mã hóa dữ liệu"""
+        """Mã hóa dữ liệu (định dạng v1, giữ lại cho tương thích)"""
         try:
             json_data = json.dumps(data)
             encrypted_data = self._fernet.encrypt(json_data.encode())
@@ -47,9 +82,11 @@ class SecurityManager:
             logger.error(f"Encryption failed: {str(e)}")
             raise
 
-    def decrypt_data(self, encrypted_data: str) -> Dict[str, Any]:
-        """Giải mã dữ liệu"""
+    def decrypt_data(self, encrypted_data: Union[str, bytes]) -> Dict[str, Any]:
+        """Giải mã dữ liệu v1 (chuỗi base64) hoặc v2 (bytes có header)"""
         try:
+            if isinstance(encrypted_data, bytes) and encrypted_data.startswith(SECURE_MAGIC):
+                return json.loads(self.decrypt_bytes(encrypted_data))
             decoded_data = base64.b64decode(encrypted_data)
             decrypted_data = self._fernet.decrypt(decoded_data)
             return json.loads(decrypted_data.decode())
@@ -57,14 +94,92 @@ class SecurityManager:
             logger.error(f"Decryption failed: {str(e)}")
             raise
 
+    def _chunk_nonce(self, prefix: bytes, index: int) -> bytes:
+        return prefix + struct.pack(">I", index)
+
+    def encrypt_stream(self, source: BinaryIO, destination: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Mã hóa luồng dữ liệu theo từng chunk (v2), trả về số byte đã đọc.
+
+        Mỗi chunk có nonce riêng (prefix + số thứ tự) và header cùng cờ chunk cuối nằm trong
+        dữ liệu xác thực, nên việc đảo thứ tự hoặc cắt bớt chunk đều bị phát hiện khi giải mã.
+        """
+        prefix = os.urandom(8)
+        header = struct.pack(HEADER_FORMAT, SECURE_MAGIC, SECURE_VERSION, chunk_size, prefix)
+        destination.write(header)
+        total = 0
+        index = 0
+        chunk = source.read(chunk_size)
+        while True:
+            next_chunk = source.read(chunk_size) if chunk else b""
+            final = 1 if not next_chunk else 0
+            ciphertext = self._aead.encrypt(self._chunk_nonce(prefix, index), chunk, header + bytes([final]))
+            destination.write(struct.pack(CHUNK_HEADER_FORMAT, len(ciphertext), final))
+            destination.write(ciphertext)
+            total += len(chunk)
+            if final:
+                return total
+            chunk = next_chunk
+            index += 1
+
+    def decrypt_stream(self, source: BinaryIO, destination: BinaryIO) -> int:
+        """Giải mã luồng v2, trả về số byte đã ghi"""
+        header = source.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("Dữ liệu mã hóa không có header hợp lệ")
+        magic, version, _, prefix = struct.unpack(HEADER_FORMAT, header)
+        if magic != SECURE_MAGIC or version != SECURE_VERSION:
+            raise ValueError(f"Không hỗ trợ định dạng mã hóa: {magic!r} v{version}")
+        total = 0
+        index = 0
+        while True:
+            chunk_header = source.read(CHUNK_HEADER_SIZE)
+            if len(chunk_header) != CHUNK_HEADER_SIZE:
+                raise ValueError("Dữ liệu mã hóa bị cắt ngắn")
+            length, final = struct.unpack(CHUNK_HEADER_FORMAT, chunk_header)
+            ciphertext = source.read(length)
+            if len(ciphertext) != length:
+                raise ValueError("Dữ liệu mã hóa bị cắt ngắn")
+            plaintext = self._aead.decrypt(self._chunk_nonce(prefix, index), ciphertext, header + bytes([final]))
+            destination.write(plaintext)
+            total += len(plaintext)
+            if final:
+                return total
+            index += 1
+
+    def encrypt_bytes(self, data: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> bytes:
+        """Mã hóa bytes sang định dạng v2 (nhị phân, không base64)"""
+        output = io.BytesIO()
+        self.encrypt_stream(io.BytesIO(data), output, chunk_size)
+        return output.getvalue()
+
+    def decrypt_bytes(self, data: bytes) -> bytes:
+        """Giải mã bytes định dạng v2"""
+        output = io.BytesIO()
+        self.decrypt_stream(io.BytesIO(data), output)
+        return output.getvalue()
+
+    def encrypt_file(self, source_path: str, destination_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Mã hóa file lớn theo từng chunk, không đọc toàn bộ vào bộ nhớ"""
+        with open(source_path, "rb") as source, open(destination_path, "wb") as destination:
+            return self.encrypt_stream(source, destination, chunk_size)
+
+    def decrypt_file(self, source_path: str, destination_path: str) -> int:
+        """Giải mã file v2 theo từng chunk"""
+        with open(source_path, "rb") as source, open(destination_path, "wb") as destination:
+            return self.decrypt_stream(source, destination)
+
+    def _storage_file(self, key: str) -> str:
+        return os.path.join("data", "security", f"{key}.enc")
+
     def secure_store(self, key: str, data: Dict[str, Any]) -> None:
-        """Lưu trữ dữ liệu an toàn"""
+        """Lưu trữ dữ liệu an toàn (định dạng v2)"""
         try:
-            storage_file = os.path.join("data", "security", f"{key}.enc")
-            encrypted_data = self.encrypt_data(data)
-            
-            with open(storage_file, "w") as f:
-                f.write(encrypted_data)
+            storage_file = self._storage_file(key)
+            temp_file = f"{storage_file}.tmp"
+            with open(temp_file, "wb") as f:
+                self.encrypt_stream(io.BytesIO(json.dumps(data).encode()), f)
+            # Ghi file tạm rồi đổi tên để không để lại file hỏng nếu bị ngắt giữa chừng
+            os.replace(temp_file, storage_file)
             
             logger.info(f"Data securely stored for key: {key}")
         except Exception as e:
@@ -72,17 +187,22 @@ class SecurityManager:
             raise
 
     def secure_retrieve(self, key: str) -> Optional[Dict[str, Any]]:
-        """Lấy dữ liệu đã được lưu trữ an toàn"""
+        """Lấy dữ liệu đã được lưu trữ an toàn (đọc được cả file v1 và v2)"""
         try:
-            storage_file = os.path.join("data", "security", f"{key}.enc")
+            storage_file = self._storage_file(key)
             
             if not os.path.exists(storage_file):
                 return None
                 
-            with open(storage_file, "r") as f:
-                encrypted_data = f.read()
-                
-            return self.decrypt_data(encrypted_data)
+            with open(storage_file, "rb") as f:
+                if f.read(len(SECURE_MAGIC)) == SECURE_MAGIC:
+                    f.seek(0)
+                    output = io.BytesIO()
+                    self.decrypt_stream(f, output)
+                    return json.loads(output.getvalue())
+                f.seek(0)
+                # File v1: Fernet token được base64 thêm một lần
+                return self.decrypt_data(f.read().decode())
         except Exception as e:
             logger.error(f"Secure retrieval failed: {str(e)}")
             raise
@@ -90,7 +210,7 @@ class SecurityManager:
     def secure_delete(self, key: str) -> None:
         """Xóa dữ liệu đã được lưu trữ an toàn"""
         try:
-            storage_file = os.path.join("data", "security", f"{key}.enc")
+            storage_file = self._storage_file(key)
             
             if os.path.exists(storage_file):
                 os.remove(storage_file)
@@ -99,33 +219,36 @@ class SecurityManager:
             logger.error(f"Secure deletion failed: {str(e)}")
             raise
 
+    def _derive_password_key(self, password: str, salt: bytes) -> bytes:
+        """PBKDF2-SHA256, kết quả được cache theo (password, salt) trong phiên làm việc"""
+        # Tiền tố độ dài salt để cặp (salt, password) khác nhau không ghép thành cùng một chuỗi
+        cache_key = hmac.new(
+            self._cache_secret, len(salt).to_bytes(4, 'big') + salt + password.encode(), hashlib.sha256
+        ).digest()
+        with self._cache_lock:
+            derived = self._derived_keys.get(cache_key)
+            if derived is not None:
+                self._derived_keys.move_to_end(cache_key)
+                return derived
+        derived = base64.urlsafe_b64encode(
+            hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITERATIONS, dklen=32)
+        )
+        with self._cache_lock:
+            self._derived_keys[cache_key] = derived
+            while len(self._derived_keys) > DERIVED_KEY_CACHE_SIZE:
+                self._derived_keys.popitem(last=False)
+        return derived
+
     def hash_password(self, password: str, salt: Optional[bytes] = None) -> tuple[bytes, bytes]:
         """Tạo hash cho password với salt"""
         if salt is None:
             salt = os.urandom(16)
-            
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return key, salt
+        return self._derive_password_key(password, salt), salt
 
     def verify_password(self, password: str, stored_key: bytes, salt: bytes) -> bool:
-        """Xác thực password"""
+        """Xác thực password (so sánh thời gian hằng)"""
         try:
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=100000,
-            )
-            
-            key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-            return key == stored_key
+            return hmac.compare_digest(self._derive_password_key(password, salt), stored_key)
         except Exception as e:
             logger.error(f"Password verification failed: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
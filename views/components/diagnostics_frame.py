@@ -0,0 +1,82 @@
+import customtkinter as ctk
+import logging
+
+from services.metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Chu kỳ làm mới bảng chẩn đoán (giây)
+DIAGNOSTICS_REFRESH_INTERVAL = 5
+
+class DiagnosticsFrame(ctk.CTkToplevel):
+    """Cửa sổ hiển thị độ trễ, số token, lỗi và cache của các lời gọi Gemini"""
+
+    def __init__(self, master, metrics: MetricsRegistry, gemini_service=None, refresh_scheduler=None):
+        super().__init__(master)
+        self.title("Chẩn đoán hiệu năng")
+        self.geometry("700x500")
+        self.metrics = metrics
+        self.gemini_service = gemini_service
+        self.refresh_scheduler = refresh_scheduler
+        # Tên job riêng cho từng cửa sổ, để mở hai bảng chẩn đoán không giẫm lên nhau
+        self._job_name = f"diagnostics-{id(self)}"
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.metrics_textbox = ctk.CTkTextbox(self, wrap="none", state="disabled", font=("Consolas", 12))
+        self.metrics_textbox.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+
+        self.refresh_button = ctk.CTkButton(
+            self,
+            text="Làm Mới",
+            command=self.refresh,
+            font=("Montserrat", 14, "bold"),
+            fg_color="#007ACC",
+            hover_color="#0056B3"
+        )
+        self.refresh_button.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 10))
+
+        if self.refresh_scheduler is not None:
+            self.refresh_scheduler.add_job(self._job_name, self.refresh, interval=DIAGNOSTICS_REFRESH_INTERVAL)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.refresh()
+
+    def refresh(self):
+        """Cập nhật nội dung từ metrics registry"""
+        try:
+            if not self.winfo_exists():
+                return
+            text = self._format_metrics()
+            self.metrics_textbox.configure(state="normal")
+            self.metrics_textbox.delete("1.0", "end")
+            self.metrics_textbox.insert("1.0", text)
+            self.metrics_textbox.configure(state="disabled")
+        except Exception as e:
+            logger.error(f"Lỗi khi cập nhật bảng chẩn đoán: {str(e)}")
+
+    def _format_metrics(self) -> str:
+        snapshot = self.metrics.snapshot('gemini.')
+        lines = ["ĐỘ TRỄ (giây)", f"{'thao tác':<16}{'trạng thái':<12}{'số lần':>8}{'tb':>8}{'p50':>8}{'p95':>8}{'max':>8}"]
+        for histogram in snapshot['histograms']:
+            labels = histogram['labels']
+            lines.append(
+                f"{labels.get('operation', ''):<16}{labels.get('status', ''):<12}{histogram['count']:>8}"
+                f"{histogram['mean'] or 0:>8.2f}{histogram['p50'] or 0:>8.2f}{histogram['p95'] or 0:>8.2f}"
+                f"{histogram['max'] or 0:>8.2f}"
+            )
+        lines += ["", "BỘ ĐẾM"]
+        for counter in snapshot['counters']:
+            labels = ', '.join(f"{key}={value}" for key, value in counter['labels'].items())
+            lines.append(f"{counter['name']:<24}{labels:<44}{counter['value']:>10.0f}")
+        if self.gemini_service is not None and hasattr(self.gemini_service, 'get_fix_cache_stats'):
+            stats = self.gemini_service.get_fix_cache_stats()
+            if stats:
+                lines += ["", f"CACHE GỢI Ý SỬA LỖI: tỉ lệ trúng {stats['hit_rate']:.0%} "
+                              f"(trùng khớp {stats['exact_hits']}, tương tự {stats['semantic_hits']}, trượt {stats['misses']})"]
+        return "\n".join(lines)
+
+    def _on_close(self):
+        if self.refresh_scheduler is not None:
+            self.refresh_scheduler.remove_job(self._job_name)
+        self.destroy()
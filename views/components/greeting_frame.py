@@ -79,7 +79,6 @@ class GreetingFrame(ctk.CTkFrame):
         logger.debug("Cập nhật lời chào và thời gian lần đầu...")
         self.update_greeting()
         self.update_time()
-        self.schedule_updates()
         logger.debug("Khởi tạo GreetingFrame hoàn tất.")
 
     def _on_enter(self, event):
@@ -144,12 +143,6 @@ class GreetingFrame(ctk.CTkFrame):
                 context="An unexpected error occurred during greeting update."
             )
 
-        # Lấy thời gian cập nhật tối ưu
-        optimal_interval = self.update_optimizer.get_optimal_interval('greeting')
-        
-        # Cập nhật sau khoảng thời gian tối ưu
-        self.after(optimal_interval * 1000, self.update_greeting)
-
     def update_time(self):
         """Cập nhật thời gian"""
         current_time = datetime.now().strftime("%H:%M:%S")
@@ -157,11 +150,14 @@ class GreetingFrame(ctk.CTkFrame):
         # Chỉ log khi thời gian thay đổi phút
         if current_time.endswith(":00"):
             self.logger.debug(f"Cập nhật time_label với text: {current_time}")
-        # Lên lịch cập nhật thời gian mỗi giây
-        self.after(1000, self.update_time)
 
-    def schedule_updates(self):
-        """Lên lịch cập nhật lời chào"""
-        self.update_greeting()
-        # Lên lịch cập nhật lời chào mỗi giờ
-        self.after(3600000, self.schedule_updates)
\ No newline at end of file
+    def register_jobs(self, scheduler):
+        """Đăng ký cập nhật đồng hồ và lời chào với RefreshScheduler dùng chung"""
+        scheduler.add_job('clock', self.update_time, interval=1, initial_delay=1)
+        scheduler.add_job(
+            'greeting',
+            self.update_greeting,
+            interval_provider=lambda: self.update_optimizer.get_optimal_interval('greeting'),
+            jitter=0.05,
+            initial_delay=self.update_optimizer.get_optimal_interval('greeting')
+        )
@@ -7,9 +7,10 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 class KnowledgeSuggestionFrame(ctk.CTkFrame):
-    def __init__(self, parent, rule_suggester, knowledge_base, refresh_callback):
+    def __init__(self, parent, rule_suggester, knowledge_base, refresh_callback, async_db=None):
         super().__init__(parent)
         self.rule_suggester = rule_suggester
+        self.async_db = async_db
         self.knowledge_base = knowledge_base
         self.refresh_callback = refresh_callback
         self.suggested_rules = []
@@ -39,10 +40,27 @@ class KnowledgeSuggestionFrame(ctk.CTkFrame):
 
     def _suggest_rules(self):
         """Gọi RuleSuggester để đề xuất quy tắc và cập nhật giao diện."""
-        self.suggested_rules = self.rule_suggester.suggest_rules()
+        if self.async_db is None:
+            self._show_suggested_rules(self.rule_suggester.suggest_rules())
+            return
+        # Đọc nhật ký tương tác trên luồng database để không chặn việc vẽ lại giao diện
+        self.suggest_button.configure(state="disabled")
+        future = self.async_db.submit(self.rule_suggester.suggest_rules)
+        self.async_db.then(future, self._show_suggested_rules, self._on_suggest_error)
+
+    def _show_suggested_rules(self, rules):
+        if not self.winfo_exists():
+            return
+        self.suggest_button.configure(state="normal")
+        self.suggested_rules = rules
         self._display_suggested_rules()
         logger.info(f"Đã tìm thấy {len(self.suggested_rules)} quy tắc được đề xuất.")
 
+    def _on_suggest_error(self, error):
+        logger.error(f"Lỗi khi đề xuất quy tắc: {str(error)}")
+        if self.winfo_exists():
+            self.suggest_button.configure(state="normal")
+
     def _display_suggested_rules(self):
         """Hiển thị các quy tắc được đề xuất trong khung."""
         # Xóa các widget cũ
@@ -34,9 +34,6 @@ class WeatherFrame(ctk.CTkFrame):
 
         # Tạo các widget
         self.create_widgets()
-        
-        # Schedule updates
-        self.schedule_weather_updates()
 
     def create_widgets(self):
         """Tạo các widget cho frame"""
@@ -391,8 +388,13 @@ class WeatherFrame(ctk.CTkFrame):
                 self.metric_values[key].configure(text="N/A")
             self.icon_label.configure(image=None, text="N/A")
 
-    def schedule_weather_updates(self):
-        """Lên lịch cập nhật thời tiết định kỳ"""
-        # Lấy thời gian cập nhật tối ưu
-        optimal_interval = self.update_optimizer.get_optimal_interval('weather')
-        self.after(optimal_interval * 1000, self.update_weather)
\ No newline at end of file
+    def register_jobs(self, scheduler):
+        """Đăng ký cập nhật thời tiết định kỳ với RefreshScheduler dùng chung"""
+        scheduler.add_job(
+            'weather',
+            self.update_weather,
+            interval_provider=lambda: self.update_optimizer.get_optimal_interval('weather'),
+            jitter=0.1,
+            # create_widgets đã cập nhật thời tiết một lần khi khởi động
+            initial_delay=self.update_optimizer.get_optimal_interval('weather')
+        )